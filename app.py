@@ -5,28 +5,257 @@ Converted from desktop Tkinter version to web interface
 Maintains exact same functionality and element IDs
 """
 
-from flask import Flask, render_template, request, jsonify, session, send_file, flash, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, send_file, flash, redirect, url_for, Response, stream_with_context
 import os
+import sys
 import uuid
 import threading
 import time
 from datetime import datetime
-import base64
-from io import BytesIO
-import json
-from utils.scraper import TrademarkScraper
-from utils.excel_generator import ExcelGenerator
+import unicodedata
+from urllib.parse import quote
+from utils.registry import ScraperError, CaptchaError, registry_breaker, registry_limiter
+from utils.browser_supervisor import browser_supervisor
+from utils import profiler
+from utils import responses
+from utils import assets
+from utils.export_cache import ExportCache, results_version
+from utils.text_exporter import EXPORT_FORMATS, PARQUET_AVAILABLE, iter_csv, iter_jsonl, generate_parquet
+from utils.image_cache import ImageVariantCache, IMAGE_SIZES, IMAGE_FORMATS
+from utils.result_store import SpilledResults, should_spill, discard_results, prune_dead_stores
+from utils.corpus import TrademarkCorpus
+from utils.watchlist import WatchStore, DIFF_COLUMNS, diff_rows
+from utils.job_queue import JobQueue
+from utils.search_runner import SearchRunner, create_scraper, decode_captcha, spill_results
+from utils.single_flight import SearchFlights, flight_key
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# orjson-backed jsonify and gzip/brotli compression of large responses
+responses.install(app)
+
+# url_for('static', ...) points at fingerprinted, pre-compressed files when build_assets.py has run
+assets.install(app)
+
+# Opt-in sampling profiler (PROFILING_ENABLED / PROFILE_SAMPLE_RATE) - nothing is installed otherwise
+profiler.install(app)
+
 # Global dictionary to store user sessions and their scrapers
 user_sessions = {}
 session_lock = threading.Lock()
 
+# 'selenium' drives the real registry; 'stub' returns synthetic results without a browser (load tests)
+SCRAPER_BACKEND = os.environ.get('SCRAPER_BACKEND', 'selenium').lower()
+
+# Browsers prepared on page load are discarded if no search claims them in time
+SPECULATIVE_TTL = int(os.environ.get('SPECULATIVE_SESSION_TTL', 120))
+speculative_reaper = None
+
+# A session's browser is kept open between searches and closed after this many idle seconds
+BROWSER_REUSE = os.environ.get('BROWSER_REUSE', 'true').lower() == 'true'
+BROWSER_IDLE_TIMEOUT = int(os.environ.get('BROWSER_IDLE_TIMEOUT', 300))
+
+# 'inline' runs browsers on threads of this process; 'queue' hands searches to scraper_worker.py
+SEARCH_EXECUTION = os.environ.get('SEARCH_EXECUTION', 'inline').lower()
+job_queue = JobQueue() if SEARCH_EXECUTION == 'queue' else None
+
+# Sessions starting a search that is already in flight follow it instead of scraping again (inline mode)
+SINGLE_FLIGHT = os.environ.get('SINGLE_FLIGHT', 'true').lower() == 'true'
+search_flights = SearchFlights()
+SHARED_RESULT_FIELDS = ('search_results', 'image_index', 'results_version', 'results_completed_at', 'export_job_id')
+
+IMAGE_CACHE_MAX_AGE = 31536000  # Versioned image URLs never change
+
+# Stores are opened on first use, so importing the app creates no database or cache directory
+export_cache = None     # Background Excel exports, cached on disk by results version
+image_cache = None      # Logo thumbnails, rendered lazily once per image hash
+corpus = None           # Every scraped row is kept in a local full-text corpus
+watch_store = None      # Saved watch searches and their run-to-run diffs
+search_runner = None    # Processes extracted rows (also used by scraper_worker.py); holds the corpus indexes
+stores_lock = threading.RLock()
+
+def get_export_cache():
+    global export_cache
+    with stores_lock:
+        if export_cache is None:
+            export_cache = ExportCache()
+        return export_cache
+
+def get_image_cache():
+    global image_cache
+    with stores_lock:
+        if image_cache is None:
+            image_cache = ImageVariantCache()
+        return image_cache
+
+def get_corpus():
+    global corpus
+    with stores_lock:
+        if corpus is None:
+            corpus = TrademarkCorpus()
+        return corpus
+
+def get_watch_store():
+    global watch_store
+    with stores_lock:
+        if watch_store is None:
+            watch_store = WatchStore()
+        return watch_store
+
+def get_search_runner():
+    global search_runner
+    with stores_lock:
+        if search_runner is None:
+            search_runner = SearchRunner(get_corpus(), get_watch_store(), get_export_cache())
+        return search_runner
+
+def get_similarity_index():
+    """Corpus similarity index, created (and NumPy imported) on first use"""
+    return get_search_runner().similarity_index()
+
+def get_logo_index():
+    """Perceptual-hash logo index, created on first use"""
+    return get_search_runner().logo_index()
+
+def warm_up():
+    """Import the heavy dependencies up front, e.g. in the gunicorn master so forked workers share them"""
+    start = time.perf_counter()
+    import utils.scraper
+    import utils.excel_generator
+    get_similarity_index()
+    get_logo_index()
+    print(f"Heavy modules pre-loaded in {time.perf_counter() - start:.2f}s")
+
+def active_scrapers():
+    """Ids of the scrapers still held by a session - the supervisor kills browsers nobody owns"""
+    with session_lock:
+        return {id(data['scraper']) for data in user_sessions.values() if data.get('scraper')}
+
+browser_supervisor.set_owner_check(active_scrapers)
+
+def claim_scraper(session_data):
+    """Scraper for the session's next search - its parked browser if it has one, otherwise a new one"""
+    scraper = session_data.get('scraper')
+    if scraper and BROWSER_REUSE and scraper.parked_at is not None:
+        return scraper
+    if scraper:
+        scraper.cleanup()
+    # Selenium is only imported when the first browser is needed
+    return create_scraper(SCRAPER_BACKEND)
+
+def record_browser_start(session_data, scraper):
+    """Count launched vs reused browsers per session"""
+    key = 'browser_reuses' if scraper.reused else 'browser_launches'
+    session_data[key] = session_data.get(key, 0) + 1
+
+def release_scraper(scraper, reusable=True):
+    """Park the browser for the session's next search, or close it"""
+    if BROWSER_REUSE and reusable and scraper.park():
+        start_speculative_reaper()
+    else:
+        scraper.cleanup()
+
+def set_captcha(session_data, captcha_data):
+    """Keep the CAPTCHA as PNG bytes - clients load it once from a versioned /captcha URL"""
+    session_data['captcha_image'], session_data['captcha_version'] = decode_captcha(captcha_data)
+
+def attachment(response, filename):
+    """Mark a streamed response as a download of filename, encoded the way send_file does it
+    Non-ASCII names (e.g. Devanagari wordmarks) get an ASCII fallback plus an RFC 5987 filename*"""
+    try:
+        filename.encode('ascii')
+        names = {'filename': filename}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='!#$&+^`|~')}"}
+    response.headers.set('Content-Disposition', 'attachment', **names)
+    return response
+
+def spill_idle_results():
+    """Spill finished result sets that have stayed in memory longer than RESULT_SPILL_AGE"""
+    current_time = time.time()
+    with session_lock:
+        # Sessions that followed one search share its result set - spill it once
+        candidates = {id(data['search_results']): (data['search_results'], data.get('image_index', {}))
+                      for data in user_sessions.values()
+                      if should_spill(data.get('search_results'), data.get('results_completed_at'), current_time)}
+    
+    for results, image_index in candidates.values():
+        try:
+            spilled, spilled_index = spill_results(results, image_index)
+        except Exception as e:
+            print(f"Result spill error: {e}")
+            continue
+        with session_lock:
+            holders = [data for data in user_sessions.values() if data.get('search_results') is results]
+            for data in holders:
+                data['search_results'] = spilled
+                data['image_index'] = spilled_index
+        # The sessions moved on while the rows were being written
+        if not holders:
+            discard_results(spilled)
+
+def release_results(results):
+    """Discard a result set a session let go of, unless a session that shared its search still shows it"""
+    if results is None:
+        return
+    with session_lock:
+        if any(data.get('search_results') is results for data in user_sessions.values()):
+            return
+    discard_results(results)
+
+def land_flight(leader_id, processed=None, error=None, key=None):
+    """Hand the outcome of a session's search to the sessions following it (call with session_lock held)
+    Returns the result sets the followers replaced, to be released once the lock is dropped"""
+    leader = user_sessions.get(leader_id, {})
+    key = key or leader.get('flight_key')
+    if key is None:
+        return []
+    if leader.get('flight_key') == key:
+        del leader['flight_key']
+    
+    replaced = []
+    for follower_id in search_flights.land(key, leader_id, processed is not None):
+        data = user_sessions.get(follower_id)
+        if not data or data.get('following') != leader_id:
+            continue
+        data['following'] = None
+        data.pop('flight_key', None)
+        if processed is not None:
+            replaced.append(data.get('search_results'))
+            # The rows are shared read-only: exports and images are keyed by the same results version
+            data.update({field: processed[field] for field in SHARED_RESULT_FIELDS})
+            data['watch_run'] = None
+            data['status'] = 'complete'
+            data['progress'] = 100
+            data['progress_message'] = f"Found {len(processed['search_results'])} results"
+        else:
+            data['status'] = 'error'
+            data['error_message'] = str(error)
+            data['error_type'] = getattr(error, 'error_type', 'error')
+    return replaced
+
+def leave_flight(session_id):
+    """Take a session out of the search it leads or follows (call with session_lock held)"""
+    data = user_sessions.get(session_id, {})
+    if data.get('following'):
+        search_flights.leave(data.pop('flight_key', None), session_id)
+        data['following'] = None
+    else:
+        land_flight(session_id, error=Exception("The search you joined was cancelled - please search again"))
+
+def land_overdue_flights():
+    """Fail the followers of searches not finished within SINGLE_FLIGHT_MAX_AGE (call with session_lock held)
+    The leader's own search carries on; its followers can search again instead of waiting for it"""
+    for key, leader_id in search_flights.overdue():
+        land_flight(leader_id, key=key,
+                    error=Exception("The search you joined did not finish in time - please search again"))
+
 def cleanup_old_sessions():
     """Clean up old sessions periodically"""
+    expired_results = []
     with session_lock:
         current_time = time.time()
         sessions_to_remove = []
@@ -39,10 +268,67 @@ def cleanup_old_sessions():
                 scraper = user_sessions[session_id].get('scraper')
                 if scraper:
                     scraper.cleanup()
+                leave_flight(session_id)
+                expired_results.append(user_sessions[session_id].get('search_results'))
                 del user_sessions[session_id]
+    
+    for results in expired_results:
+        release_results(results)
+    spill_idle_results()
+    prune_dead_stores()
+    get_export_cache().prune()
+
+def reap_speculative_sessions():
+    """Close prepared browsers that were never claimed by a search, and parked browsers left idle"""
+    with session_lock:
+        current_time = time.time()
+        expired = []
+        idle = []
+        for session_id, data in user_sessions.items():
+            scraper = data.get('scraper')
+            if data.get('speculative') and current_time - data.get('prepared_at', 0) > SPECULATIVE_TTL:
+                expired.append((session_id, scraper))
+                data['scraper'] = None
+                data['speculative'] = False
+                data['status'] = 'idle'
+            elif scraper and scraper.parked_at is not None and current_time - scraper.parked_at > BROWSER_IDLE_TIMEOUT \
+                    and data.get('status') not in ('initializing', 'captcha_ready', 'searching'):
+                idle.append((session_id, scraper))
+                data['scraper'] = None
+    
+    for session_id, scraper in expired:
+        if scraper:
+            print(f"Closing unused prepared browser for session {session_id[:8]}")
+            scraper.cleanup()
+    for session_id, scraper in idle:
+        print(f"Closing idle browser for session {session_id[:8]}")
+        scraper.cleanup()
+
+def start_speculative_reaper():
+    """Start the background sweep of unused prepared browsers (once per process)"""
+    global speculative_reaper
+    with session_lock:
+        if speculative_reaper and speculative_reaper.is_alive():
+            return
+        
+        def sweep():
+            while True:
+                time.sleep(max(5, SPECULATIVE_TTL // 4))
+                try:
+                    reap_speculative_sessions()
+                except Exception as e:
+                    print(f"Speculative reaper error: {e}")
+        
+        speculative_reaper = threading.Thread(target=sweep, name='speculative-reaper')
+        speculative_reaper.daemon = True
+        speculative_reaper.start()
 
 def get_or_create_session():
     """Get or create user session"""
+    # Started on the first request, in the serving process rather than the preloading gunicorn master,
+    # so orphans left by a crashed worker are reaped before this one launches any browser
+    browser_supervisor.start()
+    
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
     
@@ -59,8 +345,52 @@ def get_or_create_session():
         else:
             user_sessions[user_id]['last_activity'] = time.time()
     
+    if job_queue:
+        sync_queued_search(user_id)
+    
     return user_id
 
+def sync_queued_search(user_id):
+    """Mirror the session's latest queued search into user_sessions, so the routes read it as usual"""
+    search = job_queue.latest_search(user_id)
+    if not search or search['status'] == 'cancelled':
+        return
+    
+    with session_lock:
+        session_data = user_sessions[user_id]
+        need_captcha = search['captcha_version'] and search['captcha_version'] != session_data.get('captcha_version')
+        need_results = search['status'] == 'complete' and session_data.get('results_search_id') != search['id']
+    
+    # CAPTCHA bytes and results are only read when they change
+    full = job_queue.get_search(search['id']) if need_captcha or need_results else None
+    
+    previous_results = None
+    with session_lock:
+        session_data = user_sessions[user_id]
+        session_data['search_id'] = search['id']
+        session_data['status'] = 'initializing' if search['status'] == 'queued' else search['status']
+        session_data['progress'] = search['progress']
+        session_data['progress_message'] = search['message']
+        session_data['error_message'] = search['error_message']
+        session_data['error_type'] = search['error_type'] or 'error'
+        if full:
+            session_data['search_params'] = full['params']
+        if full and need_captcha:
+            session_data['captcha_image'] = full['captcha']
+            session_data['captcha_version'] = full['captcha_version']
+        if full and need_results:
+            previous_results = session_data.get('search_results')
+            session_data['search_results'] = SpilledResults(full['results_path'], full['results_count'], owned=False) \
+                if full['results_path'] else []
+            session_data['image_index'] = {app_num: (digest, None)
+                                           for app_num, digest in (full['image_index'] or {}).items()}
+            session_data['results_version'] = full['results_version']
+            session_data['results_completed_at'] = full['updated']
+            session_data['watch_run'] = full['watch_run']
+            session_data['export_job_id'] = None
+            session_data['results_search_id'] = search['id']
+    release_results(previous_results)
+
 @app.route('/')
 def index():
     """Main page"""
@@ -68,6 +398,67 @@ def index():
     user_id = get_or_create_session()
     return render_template('index.html')
 
+@app.route('/prepare_search', methods=['POST'])
+def prepare_search():
+    """Speculatively start a browser and capture the CAPTCHA before the search is known"""
+    user_id = get_or_create_session()
+    
+    if job_queue:
+        return jsonify({'success': True, 'message': 'Browsers are started by the scraper workers'})
+    
+    try:
+        registry_breaker.before_call()
+        registry_breaker.release_probe()
+    except ScraperError as e:
+        return jsonify({'success': False, 'message': str(e), 'error_type': e.error_type})
+    
+    with session_lock:
+        session_data = user_sessions[user_id]
+        if session_data['scraper'] and session_data['status'] in ('initializing', 'captcha_ready', 'searching'):
+            return jsonify({'success': True, 'message': 'Browser already active'})
+        
+        scraper = claim_scraper(session_data)
+        session_data['scraper'] = scraper
+        session_data['status'] = 'initializing'
+        session_data['speculative'] = True
+        session_data['prepared_at'] = time.time()
+        session_data['search_params'] = None
+    
+    start_speculative_reaper()
+    
+    def prepare_browser():
+        try:
+            captcha_data = scraper.initialize_browser()
+            with session_lock:
+                if user_sessions.get(user_id, {}).get('scraper') is not scraper:
+                    raise Exception("Prepared browser was discarded")
+                user_sessions[user_id]['status'] = 'captcha_ready'
+                record_browser_start(user_sessions[user_id], scraper)
+                set_captcha(user_sessions[user_id], captcha_data)
+        except Exception as e:
+            scraper.cleanup()
+            with session_lock:
+                session_data = user_sessions.get(user_id)
+                if session_data and session_data.get('scraper') is scraper:
+                    session_data['scraper'] = None
+                    if session_data.get('speculative'):
+                        session_data['speculative'] = False
+                        session_data['status'] = 'idle'
+                    else:
+                        # A search already claimed this browser - the page is waiting on it
+                        session_data['status'] = 'error'
+                        session_data['error_message'] = str(e)
+                        session_data['error_type'] = getattr(e, 'error_type', 'error')
+                        land_flight(user_id, error=e)
+            print(f"Speculative preparation failed: {e}")
+    
+    thread = threading.Thread(target=profiler.wrap(prepare_browser, 'prepare_browser',
+                                                   profiler.should_profile(request.headers)))
+    thread.daemon = True
+    thread.start()
+    
+    return jsonify({'success': True, 'message': 'Preparing browser...'})
+
 @app.route('/start_search', methods=['POST'])
 def start_search():
     """Initialize browser and load CAPTCHA"""
@@ -75,6 +466,14 @@ def start_search():
     
     try:
         data = request.get_json()
+        watch_id = data.get('watch_id')
+        if watch_id:
+            # Re-run a saved watch search with its stored parameters
+            saved = get_watch_store().get(watch_id)
+            if not saved:
+                return jsonify({'success': False, 'message': 'Saved search not found'})
+            data = {'wordmark': saved['wordmark'], 'class': saved['class'], 'filter': saved['filter']}
+        
         wordmark = data.get('wordmark', '').strip()
         trademark_class = data.get('class', '').strip()
         filter_type = data.get('filter', 'Contains')
@@ -82,15 +481,75 @@ def start_search():
         if not wordmark:
             return jsonify({'success': False, 'message': 'Wordmark is required'})
         
+        # Reject immediately while the registry is known to be down - no browser is launched
+        try:
+            registry_breaker.before_call()
+            registry_breaker.release_probe()
+        except ScraperError as e:
+            return jsonify({'success': False, 'message': str(e), 'error_type': e.error_type})
+        
+        search_params = {
+            'wordmark': wordmark,
+            'class': trademark_class,
+            'filter': filter_type,
+            'watch_id': watch_id
+        }
+        
+        if job_queue:
+            search_id = job_queue.create_search(user_id, search_params)
+            with session_lock:
+                session_data = user_sessions[user_id]
+                session_data['search_id'] = search_id
+                session_data['status'] = 'initializing'
+                session_data['search_params'] = search_params
+            return jsonify({'success': True, 'message': 'Search queued...'})
+        
+        key = flight_key(search_params) if SINGLE_FLIGHT else None
+        unused_scraper = None
         with session_lock:
-            # Clean up existing scraper if any
-            if user_sessions[user_id]['scraper']:
-                user_sessions[user_id]['scraper'].cleanup()
+            session_data = user_sessions[user_id]
+            # Searching again for the same thing keeps the session's own flight (e.g. after a wrong CAPTCHA)
+            if session_data.get('following') or session_data.get('flight_key') != key:
+                leave_flight(user_id)
             
-            # Create new scraper
-            scraper = TrademarkScraper()
+            # Follow an identical search another session already started - no browser, no CAPTCHA
+            land_overdue_flights()
+            leader_id = search_flights.join(key, user_id) if key else None
+            if leader_id:
+                if session_data.get('speculative'):
+                    unused_scraper = session_data['scraper']
+                    session_data['scraper'] = None
+                    session_data['speculative'] = False
+                session_data['status'] = 'searching'
+                session_data['progress'] = 0
+                session_data['progress_message'] = 'Joined an identical search already in progress...'
+                session_data['search_params'] = search_params
+                session_data['following'] = leader_id
+                session_data['flight_key'] = key
+        if leader_id:
+            if unused_scraper:
+                unused_scraper.cleanup()
+            return jsonify({'success': True, 'message': 'Joined an identical search...', 'shared': True})
+        
+        with session_lock:
+            session_data = user_sessions[user_id]
+            if key and session_data.get('flight_key') != key:
+                search_flights.lead(key, user_id)
+                session_data['flight_key'] = key
+            
+            # Claim a browser prepared on page load - its form is filled at submit time
+            if session_data.get('speculative') and session_data['scraper'] and \
+                    session_data['status'] in ('initializing', 'captcha_ready'):
+                session_data['speculative'] = False
+                session_data['search_params'] = dict(search_params, pending_fill=True)
+                return jsonify({'success': True, 'message': 'Using prepared browser...', 'prepared': True})
+            
+            # Reuse the session's parked browser, otherwise replace any old scraper with a new one
+            scraper = claim_scraper(session_data)
             user_sessions[user_id]['scraper'] = scraper
             user_sessions[user_id]['status'] = 'initializing'
+            user_sessions[user_id]['speculative'] = False
+            user_sessions[user_id]['search_params'] = search_params
         
         # Initialize browser in background thread
         def initialize_browser():
@@ -98,13 +557,17 @@ def start_search():
                 captcha_data = scraper.initialize_browser(wordmark, trademark_class, filter_type)
                 with session_lock:
                     user_sessions[user_id]['status'] = 'captcha_ready'
-                    user_sessions[user_id]['captcha_data'] = captcha_data
+                    record_browser_start(user_sessions[user_id], scraper)
+                    set_captcha(user_sessions[user_id], captcha_data)
             except Exception as e:
                 with session_lock:
                     user_sessions[user_id]['status'] = 'error'
                     user_sessions[user_id]['error_message'] = str(e)
+                    user_sessions[user_id]['error_type'] = getattr(e, 'error_type', 'error')
+                    land_flight(user_id, error=e)
         
-        thread = threading.Thread(target=initialize_browser)
+        thread = threading.Thread(target=profiler.wrap(initialize_browser, 'initialize_browser',
+                                                       profiler.should_profile(request.headers)))
         thread.daemon = True
         thread.start()
         
@@ -119,25 +582,61 @@ def get_status():
     user_id = get_or_create_session()
     
     with session_lock:
+        # Followers poll here, so a flight whose leader stalled is landed by them
+        if user_sessions.get(user_id, {}).get('following'):
+            land_overdue_flights()
         session_data = user_sessions.get(user_id, {})
         status = session_data.get('status', 'idle')
         
         response = {'status': status}
         
         if status == 'captcha_ready':
-            captcha_data = session_data.get('captcha_data')
-            if captcha_data:
-                response['captcha'] = captcha_data
+            captcha_version = session_data.get('captcha_version')
+            if captcha_version:
+                response['captcha_url'] = url_for('get_captcha', version=captcha_version)
         elif status == 'error':
             response['error'] = session_data.get('error_message', 'Unknown error')
+            response['error_type'] = session_data.get('error_type', 'error')
         elif status == 'searching':
             response['progress'] = session_data.get('progress', 0)
             response['message'] = session_data.get('progress_message', 'Searching...')
+            leader = user_sessions.get(session_data.get('following'))
+            if leader is not None:
+                # A follower shows the progress of the search it joined
+                response['shared'] = True
+                if leader.get('status') == 'searching':
+                    response['progress'] = leader.get('progress', 0)
+                    response['message'] = leader.get('progress_message', 'Searching...')
+                else:
+                    response['message'] = 'Waiting for the identical search you joined to start...'
         elif status == 'complete':
             response['results_count'] = len(session_data.get('search_results', []))
+            if session_data.get('watch_run'):
+                response['watch_run'] = session_data['watch_run']
+        
+        response['browser_launches'] = session_data.get('browser_launches', 0)
+        response['browser_reuses'] = session_data.get('browser_reuses', 0)
     
     return jsonify(response)
 
+@app.route('/captcha/<version>')
+def get_captcha(version):
+    """The session's current CAPTCHA as a PNG - the version in the URL changes with every new CAPTCHA"""
+    user_id = get_or_create_session()
+    
+    with session_lock:
+        session_data = user_sessions.get(user_id, {})
+        image = session_data.get('captcha_image')
+        current = session_data.get('captcha_version')
+    
+    if not image or version != current:
+        return jsonify({'success': False, 'message': 'CAPTCHA not found'}), 404
+    
+    response = app.response_class(image, mimetype='image/png')
+    response.set_etag(version)
+    response.headers['Cache-Control'] = 'private, max-age=600, immutable'
+    return response.make_conditional(request)
+
 @app.route('/submit_search', methods=['POST'])
 def submit_search():
     """Submit search with CAPTCHA"""
@@ -150,6 +649,18 @@ def submit_search():
         if not captcha:
             return jsonify({'success': False, 'message': 'CAPTCHA is required'})
         
+        if job_queue:
+            with session_lock:
+                search_id = user_sessions[user_id].get('search_id')
+            # The browser lives in the scraper worker that showed the CAPTCHA
+            if not search_id or not job_queue.submit_captcha(search_id, captcha):
+                return jsonify({'success': False, 'message': 'Please initialize search first'})
+            with session_lock:
+                user_sessions[user_id]['status'] = 'searching'
+                user_sessions[user_id]['progress'] = 0
+                user_sessions[user_id]['progress_message'] = 'Starting search...'
+            return jsonify({'success': True, 'message': 'Search started...'})
+        
         with session_lock:
             session_data = user_sessions.get(user_id, {})
             scraper = session_data.get('scraper')
@@ -157,6 +668,10 @@ def submit_search():
             if not scraper or session_data.get('status') != 'captcha_ready':
                 return jsonify({'success': False, 'message': 'Please initialize search first'})
             
+            search_params = session_data.get('search_params')
+            if not search_params:
+                return jsonify({'success': False, 'message': 'Please initialize search first'})
+            
             session_data['status'] = 'searching'
             session_data['progress'] = 0
             session_data['progress_message'] = 'Starting search...'
@@ -164,34 +679,51 @@ def submit_search():
         # Perform search in background thread
         def perform_search():
             try:
-                # Submit search
-                scraper.submit_search(captcha)
-                
-                with session_lock:
-                    user_sessions[user_id]['progress'] = 20
-                    user_sessions[user_id]['progress_message'] = 'Extracting results...'
+                # A prepared browser gets its search fields now; if that regenerated
+                # the CAPTCHA, show the new one instead of submitting a stale answer
+                if search_params.get('pending_fill'):
+                    new_captcha = scraper.fill_form(search_params['wordmark'], search_params['class'],
+                                                    search_params['filter'])
+                    search_params['pending_fill'] = False
+                    if new_captcha:
+                        with session_lock:
+                            user_sessions[user_id]['status'] = 'captcha_ready'
+                            set_captcha(user_sessions[user_id], new_captcha)
+                        return
                 
-                # Extract results with progress updates
-                def progress_callback(current, total, message):
+                def report_progress(progress, message):
                     with session_lock:
-                        progress = 20 + int((current / total) * 70)  # 20% to 90%
                         user_sessions[user_id]['progress'] = progress
                         user_sessions[user_id]['progress_message'] = message
                 
-                results = scraper.extract_results(progress_callback)
+                processed = get_search_runner().execute_search(scraper, search_params, captcha, report_progress,
+                                                               keep_alive=BROWSER_REUSE, release_scraper=release_scraper)
+                if BROWSER_REUSE:
+                    start_speculative_reaper()
                 
                 with session_lock:
-                    user_sessions[user_id]['search_results'] = results
+                    previous_results = user_sessions[user_id].get('search_results')
+                    user_sessions[user_id].update(processed)
                     user_sessions[user_id]['status'] = 'complete'
                     user_sessions[user_id]['progress'] = 100
-                    user_sessions[user_id]['progress_message'] = f'Found {len(results)} results'
+                    user_sessions[user_id]['progress_message'] = f"Found {len(processed['search_results'])} results"
+                    replaced = land_flight(user_id, processed)
+                for results in [previous_results] + replaced:
+                    release_results(results)
                     
             except Exception as e:
+                # A failed submit leaves Chrome running - keep it after a wrong CAPTCHA, otherwise close it
+                release_scraper(scraper, reusable=isinstance(e, CaptchaError))
                 with session_lock:
                     user_sessions[user_id]['status'] = 'error'
                     user_sessions[user_id]['error_message'] = str(e)
+                    user_sessions[user_id]['error_type'] = getattr(e, 'error_type', 'error')
+                    # Followers keep waiting while the CAPTCHA is retried
+                    if not isinstance(e, CaptchaError):
+                        land_flight(user_id, error=e)
         
-        thread = threading.Thread(target=perform_search)
+        thread = threading.Thread(target=profiler.wrap(perform_search, 'perform_search',
+                                                       profiler.should_profile(request.headers)))
         thread.daemon = True
         thread.start()
         
@@ -208,18 +740,30 @@ def get_results():
     with session_lock:
         session_data = user_sessions.get(user_id, {})
         results = session_data.get('search_results', [])
+        image_index = session_data.get('image_index', {})
     
     # Prepare results for display (without image data to reduce response size)
+    # url_for once rather than per row - image URLs only differ by number and hash
+    image_url_prefix = url_for('get_image', application_number='_')[:-1]
     display_results = []
-    for result in results:
+    if isinstance(results, SpilledResults):
+        rows = results.iter_without_images()
+    else:
+        rows = ((result, bool(result.get('Image_Data'))) for result in results)
+    for result, has_image in rows:
+        app_num = result.get('Application_Number', '')
         display_result = {
             'Application_Number': result.get('Application_Number', ''),
             'Wordmark': result.get('Wordmark', ''),
             'Proprietor': result.get('Proprietor', ''),
             'Class': result.get('Class', ''),
             'Status': result.get('Status', ''),
-            'has_image': bool(result.get('Image_Data'))
+            'has_image': has_image,
+            'Similarity_Score': result.get('Similarity_Score')
         }
+        if app_num in image_index:
+            # Hash in the URL makes the image immutable for browser and nginx caches
+            display_result['image_url'] = f"{image_url_prefix}{quote(app_num, safe='')}?v={image_index[app_num][0][:16]}"
         display_results.append(display_result)
     
     return jsonify({
@@ -228,23 +772,90 @@ def get_results():
         'total_count': len(display_results)
     })
 
+@app.route('/image/<application_number>')
+def get_image(application_number):
+    """Serve a trademark logo from the current results as a cached, pre-sized variant"""
+    user_id = get_or_create_session()
+    
+    size = request.args.get('size', 'thumb')
+    image_format = request.args.get('format', 'png')
+    if size not in IMAGE_SIZES or image_format not in IMAGE_FORMATS:
+        return jsonify({'success': False, 'message': 'Unsupported image size or format'}), 400
+    
+    with session_lock:
+        session_data = user_sessions.get(user_id, {})
+        entry = session_data.get('image_index', {}).get(application_number)
+        results = session_data.get('search_results')
+    
+    if not entry:
+        return jsonify({'success': False, 'message': 'Image not found'}), 404
+    
+    digest, image_data = entry
+    etag = f"{digest[:16]}-{size}-{image_format}"
+    
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        try:
+            if image_data is None:
+                # Spilled result set - the logo is only read from disk when no variant is cached yet
+                if not os.path.exists(get_image_cache().path_for(digest, size, image_format)):
+                    image_data = results.get_image(application_number)
+            path = get_image_cache().get_variant(image_data, size, image_format, digest)
+        except Exception as e:
+            return jsonify({'success': False, 'message': f'Image error: {str(e)}'}), 500
+        response = send_file(path, mimetype=IMAGE_FORMATS[image_format][1], conditional=False, etag=False)
+    
+    response.set_etag(etag)
+    if request.args.get('v') == digest[:16]:
+        response.headers['Cache-Control'] = f'public, max-age={IMAGE_CACHE_MAX_AGE}, immutable'
+    else:
+        # Resolved through this session's results - shared caches must not keep it
+        response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
 @app.route('/export_excel')
 def export_excel():
-    """Export results to Excel with embedded images"""
+    """Export results to Excel with embedded images
+    
+    Serves the cached workbook when the background export has finished,
+    otherwise returns the export job id for the client to poll.
+    """
     user_id = get_or_create_session()
     
     try:
         with session_lock:
             session_data = user_sessions.get(user_id, {})
             results = session_data.get('search_results', [])
+            version = session_data.get('results_version')
+            export_job_id = session_data.get('export_job_id')
         
         if not results:
             flash('No search results to export', 'error')
             return redirect(url_for('index'))
         
-        # Generate Excel file
-        excel_generator = ExcelGenerator()
-        excel_file = excel_generator.generate_excel(results)
+        if not version:
+            version = results_version(results)
+        
+        cached_path = get_export_cache().get_cached_path(version)
+        if not cached_path:
+            job = get_export_cache().get_job(export_job_id) if export_job_id else None
+            # A 'ready' job whose workbook was pruned is generated again
+            if not job or job['status'] in ('ready', 'error') or job['version'] != version:
+                export_job_id = get_export_cache().submit(results, version)
+                with session_lock:
+                    if user_id in user_sessions:
+                        user_sessions[user_id]['results_version'] = version
+                        user_sessions[user_id]['export_job_id'] = export_job_id
+                job = get_export_cache().get_job(export_job_id)
+            
+            if job['status'] != 'ready':
+                return jsonify({
+                    'success': True,
+                    'status': job['status'],
+                    'job_id': export_job_id
+                }), 202
+            cached_path = job['path']
         
         # Generate filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -252,7 +863,7 @@ def export_excel():
         filename = f"Trademark_Search_{wordmark}_{timestamp}.xlsx"
         
         return send_file(
-            excel_file,
+            cached_path,
             as_attachment=True,
             download_name=filename,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -262,27 +873,233 @@ def export_excel():
         flash(f'Export error: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/export_status/<job_id>')
+def export_status(job_id):
+    """Poll a background Excel export job"""
+    get_or_create_session()
+    
+    job = get_export_cache().get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Unknown export job'}), 404
+    
+    response = {'success': True, 'job_id': job_id, 'status': job['status']}
+    if job['status'] == 'error':
+        response['error'] = job['error']
+    return jsonify(response)
+
+@app.route('/export/<export_format>')
+def export_text(export_format):
+    """Export results as CSV, JSONL or Parquet - text columns only, no images"""
+    user_id = get_or_create_session()
+    
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'Unsupported export format: {export_format}'}), 400
+    if export_format == 'parquet' and not PARQUET_AVAILABLE:
+        return jsonify({'success': False, 'message': 'Parquet export is not available on this server (pyarrow is not installed)'}), 501
+    
+    with session_lock:
+        session_data = user_sessions.get(user_id, {})
+        results = session_data.get('search_results', [])
+    
+    if not results:
+        return jsonify({'success': False, 'message': 'No search results to export'}), 404
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    wordmark = results[0].get('Search_Wordmark', 'search')
+    filename = f"Trademark_Search_{wordmark}_{timestamp}.{extension}"
+    
+    if export_format == 'parquet':
+        try:
+            parquet_file = generate_parquet(results)
+        except Exception as e:
+            return jsonify({'success': False, 'message': f'Export error: {str(e)}'}), 500
+        return send_file(parquet_file, as_attachment=True, download_name=filename, mimetype=mimetype)
+    
+    # CSV and JSONL are streamed row by row as a chunked response
+    rows = iter_csv(results) if export_format == 'csv' else iter_jsonl(results)
+    return attachment(Response(stream_with_context(rows), mimetype=mimetype), filename)
+
+@app.route('/corpus/search')
+def corpus_search():
+    """Search previously scraped records - no browser or CAPTCHA needed"""
+    query = request.args.get('q', '').strip()
+    field = request.args.get('field', 'all')
+    trademark_class = request.args.get('class', '').strip() or None
+    
+    if not query:
+        return jsonify({'success': False, 'message': 'Search text is required'}), 400
+    
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        offset = max(int(request.args.get('offset', 0)), 0)
+        start = time.perf_counter()
+        results = get_corpus().search(query, field, trademark_class, limit, offset)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+    
+    return jsonify({
+        'success': True,
+        'results': results,
+        'total_count': len(results),
+        'query_ms': round(elapsed_ms, 2)
+    })
+
+@app.route('/similar')
+def similar_marks():
+    """Rank every mark in the local corpus by phonetic/fuzzy similarity to a query"""
+    query = request.args.get('q', '').strip()
+    trademark_class = request.args.get('class', '').strip() or None
+    
+    if not query:
+        return jsonify({'success': False, 'message': 'Search text is required'}), 400
+    
+    similarity_index = get_similarity_index()
+    if not similarity_index.ensure_built():
+        return jsonify({
+            'success': True,
+            'status': similarity_index.state,
+            'message': 'Similarity index is being built, please retry shortly'
+        }), 202
+    
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        min_score = float(request.args.get('min_score', 0))
+        start = time.perf_counter()
+        matches = similarity_index.index.rank(query, limit, trademark_class, min_score)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'results': [{
+            'Application_Number': match['id'],
+            'Wordmark': match['mark'],
+            'Similarity_Score': match['score'],
+            'Ngram_Score': match['ngram_score'],
+            'Phonetic_Score': match['phonetic_score'],
+            'Edit_Score': match['edit_score']
+        } for match in matches],
+        'total_count': len(matches),
+        'indexed_marks': len(similarity_index.index),
+        'query_ms': round(elapsed_ms, 2)
+    })
+
+@app.route('/similar_logos/<application_number>')
+def similar_logos(application_number):
+    """Near-duplicate logos for a mark, by perceptual-hash Hamming distance"""
+    from utils.logo_hash import DEFAULT_RADIUS
+    try:
+        radius = min(int(request.args.get('radius', DEFAULT_RADIUS)), 32)
+        limit = min(int(request.args.get('limit', 50)), 500)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'radius and limit must be integers'}), 400
+    
+    matches = get_logo_index().find_similar(application_number, radius, limit)
+    if matches is None:
+        return jsonify({'success': False, 'message': 'No logo indexed for this application number'}), 404
+    
+    return jsonify({
+        'success': True,
+        'results': matches,
+        'total_count': len(matches),
+        'radius': radius
+    })
+
+@app.route('/watch', methods=['GET', 'POST'])
+def watch_searches():
+    """List saved watch searches, or save one (defaults to the current search parameters)"""
+    user_id = get_or_create_session()
+    
+    if request.method == 'GET':
+        return jsonify({'success': True, 'watches': get_watch_store().list()})
+    
+    try:
+        data = request.get_json() or {}
+        with session_lock:
+            current = dict(user_sessions.get(user_id, {}).get('search_params') or {})
+        
+        wordmark = (data.get('wordmark') or current.get('wordmark', '')).strip()
+        trademark_class = (data.get('class') or current.get('class', '')).strip()
+        filter_type = data.get('filter') or current.get('filter', 'Contains')
+        name = (data.get('name') or wordmark).strip()
+        
+        if not wordmark:
+            return jsonify({'success': False, 'message': 'Wordmark is required'})
+        
+        watch_id = get_watch_store().create(name, wordmark, trademark_class, filter_type)
+        return jsonify({'success': True, 'watch_id': watch_id, 'message': f'Saved search "{name}"'})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@app.route('/watch/<int:watch_id>', methods=['DELETE'])
+def delete_watch(watch_id):
+    """Delete a saved watch search and its history"""
+    if not get_watch_store().delete(watch_id):
+        return jsonify({'success': False, 'message': 'Saved search not found'}), 404
+    return jsonify({'success': True, 'message': 'Saved search deleted'})
+
+@app.route('/watch/<int:watch_id>/diff')
+def watch_diff(watch_id):
+    """Changes found by the latest (or a given) run of a saved search"""
+    run = get_watch_store().get_diff(watch_id, request.args.get('run_id', type=int))
+    if not run:
+        return jsonify({'success': False, 'message': 'No runs recorded for this search'}), 404
+    return jsonify({'success': True, 'run': run})
+
+@app.route('/watch/<int:watch_id>/diff/export')
+def export_watch_diff(watch_id):
+    """Export a run's changes as CSV or JSONL"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        return jsonify({'success': False, 'message': f'Unsupported export format: {export_format}'}), 400
+    
+    run = get_watch_store().get_diff(watch_id, request.args.get('run_id', type=int))
+    if not run:
+        return jsonify({'success': False, 'message': 'No runs recorded for this search'}), 404
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"Watch_{watch_id}_Run_{run['id']}.{extension}"
+    rows = diff_rows(run['diff'])
+    rows = iter_csv(rows, DIFF_COLUMNS) if export_format == 'csv' else iter_jsonl(rows, DIFF_COLUMNS)
+    return attachment(Response(stream_with_context(rows), mimetype=mimetype), filename)
+
 @app.route('/reset_search', methods=['POST'])
 def reset_search():
     """Reset current search session"""
     user_id = get_or_create_session()
     
     try:
+        if job_queue:
+            job_queue.cancel_session(user_id)
+        
         with session_lock:
             session_data = user_sessions.get(user_id, {})
             scraper = session_data.get('scraper')
+            previous_results = session_data.get('search_results')
             
-            if scraper:
+            # A parked browser survives the reset - the next search reuses it
+            if scraper and scraper.parked_at is None:
                 scraper.cleanup()
+                scraper = None
+            leave_flight(user_id)
             
             # Reset session data
             user_sessions[user_id] = {
-                'scraper': None,
+                'scraper': scraper,
                 'last_activity': time.time(),
                 'search_results': [],
-                'status': 'idle'
+                'status': 'idle',
+                'browser_launches': session_data.get('browser_launches', 0),
+                'browser_reuses': session_data.get('browser_reuses', 0)
             }
         
+        release_results(previous_results)
         return jsonify({'success': True, 'message': 'Search reset successfully'})
         
     except Exception as e:
@@ -291,12 +1108,39 @@ def reset_search():
 @app.route('/health')
 def health_check():
     """Health check endpoint for monitoring"""
+    with session_lock:
+        sessions = list(user_sessions.values())
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'active_sessions': len(user_sessions)
+        'active_sessions': len(user_sessions),
+        'registry': registry_breaker.snapshot(),
+        'rate_limit': registry_limiter.snapshot(),
+        'browsers': {key: value for key, value in browser_supervisor.snapshot().items() if key != 'browsers'},
+        'browser_reuse': {
+            'enabled': BROWSER_REUSE,
+            'launches': sum(data.get('browser_launches', 0) for data in sessions),
+            'reuses': sum(data.get('browser_reuses', 0) for data in sessions),
+            'parked': sum(1 for data in sessions if data.get('scraper') and data['scraper'].parked_at is not None)
+        },
+        'search_execution': SEARCH_EXECUTION,
+        'single_flight': dict(search_flights.snapshot(), enabled=SINGLE_FLIGHT and not job_queue),
+        'queue': job_queue.snapshot() if job_queue else None
     })
 
+@app.route('/metrics/browsers')
+def browser_metrics():
+    """Per-browser RSS/CPU/age as sampled by the browser supervisor, plus shared-browser contexts and grid endpoints"""
+    metrics = browser_supervisor.snapshot()
+    # The pool and grid modules (and Selenium) are only loaded once a real scraper has been created
+    browser_pool_module = sys.modules.get('utils.browser_pool')
+    if browser_pool_module and browser_pool_module.browser_pool.enabled:
+        metrics['pool'] = browser_pool_module.browser_pool.snapshot()
+    browser_grid_module = sys.modules.get('utils.browser_grid')
+    if browser_grid_module and browser_grid_module.browser_grid.enabled:
+        metrics['grid'] = browser_grid_module.browser_grid.snapshot()
+    return jsonify(metrics)
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('404.html'), 404
@@ -305,6 +1149,10 @@ def not_found(error):
 def internal_error(error):
     return render_template('500.html'), 500
 
+# With gunicorn --preload this runs once in the master, before workers are forked
+if os.environ.get('PRELOAD_HEAVY_MODULES', 'false').lower() == 'true':
+    warm_up()
+
 if __name__ == '__main__':
     # For development only
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Memory per concurrent search: one Chrome per search versus browser contexts in shared Chromes
+Opens the same page for N simulated searches in each mode and sums the PSS of every Chrome and
+ChromeDriver process started (PSS splits shared pages between processes, so nothing is counted twice)
+Requires Chrome and Linux /proc
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+
+from utils.browser_supervisor import list_processes, descendants, is_browser_process
+from utils.browser_pool import BrowserPool
+from utils.scraper import SEARCH_URL, new_user_data_dir, launch_chrome
+
+
+def pss_bytes(pid):
+    """Proportional set size from smaps_rollup, falling back to RSS"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    process = list_processes().get(pid)
+    return process['rss'] if process else 0
+
+
+def browser_memory():
+    """Total PSS and process count of the browsers below this process"""
+    processes = list_processes()
+    pids = [pid for pid in descendants(os.getpid(), processes)
+            if pid != os.getpid() and is_browser_process(processes[pid])]
+    return sum(pss_bytes(pid) for pid in pids), len(pids)
+
+
+def settle(seconds):
+    time.sleep(seconds)
+    return browser_memory()
+
+
+def run_processes(users, url, wait):
+    drivers = []
+    try:
+        for _ in range(users):
+            user_data_dir = new_user_data_dir()
+            driver = launch_chrome(user_data_dir)
+            drivers.append((driver, user_data_dir))
+            driver.get(url)
+        return settle(wait)
+    finally:
+        for driver, user_data_dir in drivers:
+            driver.quit()
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+
+
+def run_contexts(users, contexts_per_browser, url, wait):
+    pool = BrowserPool(contexts_per_browser=contexts_per_browser)
+    contexts = []
+    try:
+        for _ in range(users):
+            context = pool.open_context()
+            contexts.append(context)
+            context.get(url)
+        return settle(wait)
+    finally:
+        for context in contexts:
+            context.quit()
+        for browser in list(pool.browsers):
+            browser.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8, help='concurrent searches to simulate')
+    parser.add_argument('--contexts', type=int, default=8, help='contexts per shared browser')
+    parser.add_argument('--url', default=SEARCH_URL, help='page each search opens')
+    parser.add_argument('--wait', type=float, default=5.0, help='seconds to let pages settle before measuring')
+    args = parser.parse_args()
+
+    if not os.path.isdir('/proc'):
+        sys.exit("Linux /proc is required to measure browser memory")
+
+    print(f"=== Browser memory: {args.users} concurrent searches, {args.url} ===\n")
+    rows = [('one Chrome per search', run_processes(args.users, args.url, args.wait)),
+            (f'{args.contexts} contexts per Chrome', run_contexts(args.users, args.contexts, args.url, args.wait))]
+
+    print(f"\n{'Mode':<28}{'processes':>10}{'total MB':>12}{'MB/search':>12}")
+    for name, (total, count) in rows:
+        print(f"{name:<28}{count:>10}{total / 1048576:>12.0f}{total / 1048576 / args.users:>12.1f}")
+
+    baseline, shared = rows[0][1][0], rows[1][1][0]
+    if baseline:
+        print(f"\nMemory per concurrent search reduced by {100 * (1 - shared / baseline):.0f}%")
+
+
+if __name__ == '__main__':
+    main()
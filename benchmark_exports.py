@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the export formats
+Compares the image-embedded Excel path against the text-only CSV/JSONL/Parquet exports
+"""
+
+import sys
+import time
+from io import BytesIO
+
+from utils.text_exporter import iter_csv, iter_jsonl, generate_parquet
+
+
+def make_results(count, with_images=True):
+    """Build synthetic result rows shaped like TrademarkScraper.extract_results output"""
+    image_bytes = None
+    if with_images:
+        from PIL import Image as PILImage
+        img_buffer = BytesIO()
+        PILImage.new('RGB', (120, 60), (54, 96, 146)).save(img_buffer, format='PNG')
+        image_bytes = img_buffer.getvalue()
+
+    return [{
+        'Application_Number': str(1000000 + i),
+        'Wordmark': f'MARK {i}',
+        'Proprietor': f'PROPRIETOR {i % 500} PRIVATE LIMITED',
+        'Class': str(i % 45 + 1),
+        'Status': 'Registered' if i % 3 else 'Objected',
+        'Image_Data': image_bytes,
+        'Search_Date': '2025-01-01 00:00:00'
+    } for i in range(count)]
+
+
+def run_excel(results):
+    from utils.excel_generator import ExcelGenerator
+    return len(ExcelGenerator().generate_excel(results).getvalue())
+
+
+def run_csv(results):
+    return sum(len(chunk) for chunk in iter_csv(results))
+
+
+def run_jsonl(results):
+    return sum(len(chunk) for chunk in iter_jsonl(results))
+
+
+def run_parquet(results):
+    return len(generate_parquet(results).getvalue())
+
+
+def benchmark(name, func, results):
+    """Time one export and print rows/second"""
+    try:
+        start = time.perf_counter()
+        size = func(results)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        print(f"   {name:8s} SKIPPED: {e}")
+        return None
+
+    rate = len(results) / elapsed if elapsed else float('inf')
+    print(f"   {name:8s} {elapsed * 1000:9.1f} ms  {rate:12,.0f} rows/s  {size / 1024:10.1f} KB")
+    return rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"=== Export throughput benchmark ({count} rows) ===")
+
+    results = make_results(count)
+    rates = {}
+    for name, func in [('excel', run_excel), ('csv', run_csv),
+                       ('jsonl', run_jsonl), ('parquet', run_parquet)]:
+        rates[name] = benchmark(name, func, results)
+
+    if rates.get('excel'):
+        print()
+        for name in ('csv', 'jsonl', 'parquet'):
+            if rates.get(name):
+                print(f"   {name:8s} is {rates[name] / rates['excel']:6.1f}x faster than excel")
+
+
+if __name__ == "__main__":
+    main()
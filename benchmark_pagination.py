@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Result extraction time: sequential versus pipelined pagination
+Serves a local copy of the registry's results grid whose "Load More..." link appends a page of rows
+after a configurable delay, and times TrademarkScraper's two extractors on it in a real Chrome
+Requires Chrome
+"""
+
+import os
+import sys
+import time
+import base64
+import shutil
+import argparse
+import threading
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The benchmark measures the page, not the registry pacing
+os.environ.setdefault('REGISTRY_RATE_LIMIT', '0')
+
+from utils.scraper import TrademarkScraper, new_user_data_dir, launch_chrome
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><body>
+<table id="ContentPlaceHolder1_MGVSearchResult"><tr><th>#</th><th>Details</th><th>Logo</th></tr></table>
+<a href="#" id="more">Load More...</a>
+<script>
+var pageSize = %(page_size)d, pages = %(pages)d, delay = %(delay)d, loaded = 0;
+var logo = "data:image/png;base64,%(logo)s";
+function addPage() {
+    var grid = document.getElementById('ContentPlaceHolder1_MGVSearchResult');
+    for (var i = 0; i < pageSize; i++) {
+        var n = loaded * pageSize + i, row = grid.insertRow(-1);
+        row.insertCell(0).innerText = n + 1;
+        row.insertCell(1).innerHTML =
+            '<span id="lblsimiliarmark_' + n + '">MARK ' + n + '</span>' +
+            '<span id="LblVProprietorName_' + n + '">PROPRIETOR ' + n + '</span>' +
+            '<span id="lblapplicationnumber_' + n + '">' + (1000000 + n) + '</span>' +
+            '<span id="lblsearchclass_' + n + '">' + (n %% 45 + 1) + '</span>' +
+            '<span id="Label6_' + n + '">Registered</span>';
+        row.insertCell(2).innerHTML = '<img src="' + logo + '">';
+    }
+    loaded++;
+    if (loaded >= pages) { document.getElementById('more').style.display = 'none'; }
+}
+document.getElementById('more').onclick = function (event) {
+    event.preventDefault();
+    setTimeout(addPage, delay);
+};
+addPage();
+</script>
+</body></html>
+"""
+
+
+def make_logo():
+    from PIL import Image as PILImage
+    buffer = BytesIO()
+    PILImage.new('RGB', (120, 60), (54, 96, 146)).save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def serve(page):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = page.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/'
+
+
+def time_extraction(driver, url, extract):
+    driver.get(url)
+    scraper = TrademarkScraper()
+    scraper.driver = driver
+    start = time.perf_counter()
+    results = getattr(scraper, extract)()
+    return time.perf_counter() - start, len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=6, help='pages of results, including the first')
+    parser.add_argument('--page-size', type=int, default=50, help='rows per page')
+    parser.add_argument('--delay', type=int, default=1500, help='milliseconds before Load More adds a page')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    server, url = serve(PAGE_TEMPLATE % {'page_size': args.page_size, 'pages': args.pages,
+                                         'delay': args.delay, 'logo': make_logo()})
+    user_data_dir = new_user_data_dir()
+    driver = launch_chrome(user_data_dir)
+    print(f"=== Extraction: {args.pages} pages x {args.page_size} rows, {args.delay} ms per Load More ===\n")
+    try:
+        timings = {}
+        for name, extract in (('sequential', '_extract_sequential'), ('pipelined', '_extract_pipelined')):
+            runs = [time_extraction(driver, url, extract) for _ in range(args.runs)]
+            timings[name] = min(seconds for seconds, _ in runs)
+            print(f"{name:<12} best {timings[name]:6.2f}s of {args.runs} runs, {runs[0][1]} rows")
+    finally:
+        driver.quit()
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+        server.shutdown()
+
+    if timings['sequential']:
+        print(f"\nPipelined pagination saves {timings['sequential'] - timings['pipelined']:.2f}s "
+              f"({100 * (1 - timings['pipelined'] / timings['sequential']):.0f}%) per search")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
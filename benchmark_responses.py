@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the JSON response layer for a large result set
+Compares Flask's default encoder with the orjson provider, bytes on the wire with and without
+gzip/brotli, and the CAPTCHA polled inline as base64 versus served once from a URL
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import tempfile
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils import responses
+from utils.responses import FastJSONProvider, compress
+
+
+def make_display_rows(count):
+    """Rows shaped like the /get_results payload"""
+    return [{
+        'Application_Number': str(1000000 + i),
+        'Wordmark': f'MARK {i}',
+        'Proprietor': f'PROPRIETOR {i % 500} PRIVATE LIMITED',
+        'Class': str(i % 45 + 1),
+        'Status': 'Registered' if i % 3 else 'Objected',
+        'has_image': bool(i % 5),
+        'Similarity_Score': round(100 - (i % 1000) / 10, 1),
+        'image_url': f'/image/{1000000 + i}?v={i:016x}' if i % 5 else None
+    } for i in range(count)]
+
+
+def timed(func, repeat=5):
+    """Best of repeat runs, in milliseconds, and the last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def bench_serialization(rows):
+    app = Flask(__name__)
+    payload = {'success': True, 'results': rows, 'total_count': len(rows)}
+    providers = [('flask default', DefaultJSONProvider(app)), ('fast provider', FastJSONProvider(app))]
+
+    print(f"{'Encoder':<22}{'serialize ms':>14}{'bytes':>12}")
+    bodies = {}
+    for name, provider in providers:
+        with app.app_context():
+            elapsed, response = timed(lambda: provider.response(payload))
+        body = response.get_data()
+        bodies[name] = body
+        print(f"{name:<22}{elapsed:>14.2f}{len(body):>12,}")
+    if responses.orjson is None:
+        print("(orjson not installed - the fast provider falls back to the stdlib encoder)")
+    return bodies['fast provider']
+
+
+def bench_compression(body):
+    print(f"\n{'Content-Encoding':<22}{'compress ms':>14}{'bytes':>12}{'ratio':>10}")
+    print(f"{'identity':<22}{0:>14.2f}{len(body):>12,}{1:>10.2f}")
+    encodings = ['gzip'] + (['br'] if responses.brotli is not None else [])
+    for encoding in encodings:
+        elapsed, compressed = timed(lambda: compress(body, encoding))
+        print(f"{encoding:<22}{elapsed:>14.2f}{len(compressed):>12,}{len(body) / len(compressed):>10.2f}")
+    if responses.brotli is None:
+        print("(brotli not installed - br is not offered)")
+
+
+def bench_endpoint(count):
+    """Time /get_results end to end through the app with a synthetic session"""
+    os.environ.setdefault('CORPUS_DB_PATH', os.path.join(tempfile.mkdtemp(), 'corpus.db'))
+    import app as web
+
+    results = [{
+        'Application_Number': str(1000000 + i),
+        'Wordmark': f'MARK {i}',
+        'Proprietor': f'PROPRIETOR {i % 500} PRIVATE LIMITED',
+        'Class': str(i % 45 + 1),
+        'Status': 'Registered' if i % 3 else 'Objected',
+        'Image_Data': None,
+        'Similarity_Score': 50.0
+    } for i in range(count)]
+    image_index = {str(1000000 + i): (f'{i:064x}', b'') for i in range(0, count, 5)}
+
+    client = web.app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = 'benchmark'
+    web.user_sessions['benchmark'] = {'scraper': None, 'status': 'complete', 'last_activity': time.time(),
+                                      'search_results': results, 'image_index': image_index}
+
+    print(f"\n{'GET /get_results':<22}{'ms':>14}{'wire bytes':>12}")
+    for label, headers in [('identity', {}), ('gzip', {'Accept-Encoding': 'gzip'}),
+                           ('br, gzip', {'Accept-Encoding': 'br, gzip'})]:
+        elapsed, response = timed(lambda: client.get('/get_results', headers=headers))
+        print(f"{label:<22}{elapsed:>14.2f}{len(response.get_data()):>12,}"
+              f"  {response.headers.get('Content-Encoding', '')}")
+
+
+def bench_captcha(polls=30):
+    """Bytes sent while a user reads the CAPTCHA, polling /get_status once a second"""
+    from PIL import Image as PILImage
+    from io import BytesIO
+
+    buffer = BytesIO()
+    PILImage.effect_noise((150, 40), 64).convert('RGB').save(buffer, format='PNG')
+    png = buffer.getvalue()
+
+    inline = len(json.dumps({'status': 'captcha_ready', 'captcha': base64.b64encode(png).decode('ascii')}))
+    by_url = len(json.dumps({'status': 'captcha_ready', 'captcha_url': '/captcha/0123456789abcdef'}))
+    print(f"\nCAPTCHA over {polls} status polls")
+    print(f"{'inline base64':<22}{inline * polls:>12,} bytes")
+    print(f"{'versioned URL':<22}{by_url * polls + len(png):>12,} bytes (image fetched once)")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"=== Response benchmark: {count} rows ===\n")
+    body = bench_serialization(make_display_rows(count))
+    bench_compression(body)
+    bench_endpoint(count)
+    bench_captcha()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted static assets
+Writes minified, content-hashed copies of static/ to static/dist with .gz (and .br when the brotli
+package is installed) siblings and static/dist/manifest.json, which the app reads at startup
+"""
+
+import os
+
+from utils.assets import build_assets
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+if __name__ == '__main__':
+    manifest = build_assets(STATIC_DIR)
+    for filename, dist_name in sorted(manifest.items()):
+        source_size = os.path.getsize(os.path.join(STATIC_DIR, filename))
+        dist_path = os.path.join(STATIC_DIR, dist_name)
+        sizes = [f"{os.path.getsize(dist_path):,} B min"]
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(dist_path + suffix):
+                sizes.append(f"{os.path.getsize(dist_path + suffix):,} B {suffix[1:]}")
+        print(f"{filename} ({source_size:,} B) -> {dist_name} ({', '.join(sizes)})")
+    print(f"Manifest: {len(manifest)} assets")
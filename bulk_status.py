@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Current registry status for a list of application numbers
+Reads numbers (one per line, or the first column of a CSV), answers those refreshed in the local
+corpus within --fresh-hours from it, and looks the rest up on the registry by application number
+across several browsers. CAPTCHAs are saved as PNGs and asked for here. Writes a status table CSV.
+
+    python bulk_status.py numbers.txt --output status.csv --browsers 4
+"""
+
+import os
+import sys
+import csv
+import argparse
+
+from utils.corpus import TrademarkCorpus
+from utils.crawler import solve_captchas
+from utils.search_runner import create_scraper
+from utils.bulk_lookup import BulkLookup, FRESH_HOURS, STATUS_COLUMNS, read_application_numbers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('numbers', help="file of application numbers ('-' for stdin)")
+    parser.add_argument('--output', default='status.csv', help='status table to write')
+    parser.add_argument('--browsers', type=int, default=2, help='browsers looking numbers up in parallel')
+    parser.add_argument('--fresh-hours', type=float, default=FRESH_HOURS,
+                        help='numbers refreshed in the corpus within this many hours are not looked up again')
+    parser.add_argument('--captcha-dir', default=os.path.join('tmp', 'lookup_captchas'))
+    args = parser.parse_args()
+
+    if args.numbers == '-':
+        numbers = read_application_numbers(sys.stdin)
+        # CAPTCHA answers are read from the terminal, not from the list
+        sys.stdin = open('/dev/tty')
+    else:
+        with open(args.numbers) as f:
+            numbers = read_application_numbers(f)
+    if not numbers:
+        sys.exit("No application numbers found")
+
+    lookup = BulkLookup(TrademarkCorpus(), create_scraper, browsers=args.browsers, fresh_hours=args.fresh_hours)
+    to_look_up = lookup.plan(numbers)
+    print(f"{len(numbers)} application numbers: {len(numbers) - to_look_up} fresh in the corpus, "
+          f"{to_look_up} to look up")
+
+    lookup.start()
+    try:
+        solve_captchas(lookup, args.captcha_dir)
+    except (KeyboardInterrupt, EOFError):
+        print("\nStopping - numbers not reached are marked as skipped")
+        lookup.stop()
+    for thread in lookup.threads:
+        thread.join()
+
+    table = lookup.table()
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=STATUS_COLUMNS)
+        writer.writeheader()
+        writer.writerows(table)
+
+    stats = lookup.snapshot()
+    print(f"\n{stats['looked_up']} looked up in {stats['seconds']}s ({stats['lookups_per_minute']} lookups/minute), "
+          f"{stats['fresh']} from the corpus, {stats['not_found']} not found, {stats['failed']} failed, "
+          f"{stats['wrong_captchas']} wrong CAPTCHAs")
+    print(f"Status table written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
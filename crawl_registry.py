@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Crawl the registry by wordmark prefix into the local corpus (searchable offline at /corpus/search)
+Runs "Start With" searches for every prefix and class, splitting prefixes whose results hit the
+registry's limit. Progress is checkpointed in the corpus database: stop with Ctrl+C and run the same
+command again to resume. Each search needs a CAPTCHA - they are saved as PNGs and asked for here,
+while the other browsers prepare the next ones.
+
+    python crawl_registry.py --seed-length 1 --classes 1-45 --browsers 2
+    python crawl_registry.py --status
+"""
+
+import os
+import sys
+import argparse
+
+from utils.corpus import TrademarkCorpus
+from utils.crawler import (CrawlState, RegistryCrawler, ALPHABET, MAX_PREFIX_LENGTH, seed_prefixes, parse_classes,
+                           solve_captchas)
+from utils.search_runner import create_scraper
+
+
+def print_summary(summary):
+    print(f"Prefixes: {summary['done']} done, {summary['split']} split, {summary['pending']} pending, "
+          f"{summary['running']} interrupted, {summary['failed']} failed - {summary['rows_seen']} rows seen")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed-length', type=int, default=1, help='length of the starting prefixes (1 = A..Z, 2 = AA..ZZ)')
+    parser.add_argument('--classes', default='1-45', help="classes to sweep, e.g. '1-45' or '9,35' ('' for all at once)")
+    parser.add_argument('--alphabet', default=ALPHABET, help='characters prefixes are built from')
+    parser.add_argument('--browsers', type=int, default=2, help='browsers preparing CAPTCHAs in parallel')
+    parser.add_argument('--result-cap', type=int, default=0,
+                        help='also split a prefix with at least this many rows (the "Load More" limit is always detected)')
+    parser.add_argument('--max-prefix-length', type=int, default=MAX_PREFIX_LENGTH)
+    parser.add_argument('--captcha-dir', default=os.path.join('tmp', 'crawl_captchas'))
+    parser.add_argument('--status', action='store_true', help='print crawl progress and exit')
+    args = parser.parse_args()
+
+    state = CrawlState()
+    if args.status:
+        print_summary(state.progress())
+        return 0
+
+    added = state.seed(seed_prefixes(args.seed_length, args.alphabet), parse_classes(args.classes))
+    print(f"{added} new prefix/class searches queued")
+    print_summary(state.progress())
+
+    # Registry pacing comes from the scraper's shared rate limiter (REGISTRY_RATE_LIMIT)
+    crawler = RegistryCrawler(state, TrademarkCorpus(), create_scraper, browsers=args.browsers,
+                              result_cap=args.result_cap, alphabet=args.alphabet,
+                              max_prefix_length=args.max_prefix_length)
+    crawler.start()
+    try:
+        solve_captchas(crawler, args.captcha_dir)
+    except (KeyboardInterrupt, EOFError):
+        print("\nStopping - unfinished searches resume on the next run")
+        crawler.stop()
+    for thread in crawler.threads:
+        thread.join()
+
+    stats = crawler.snapshot()
+    print(f"\n{stats['searches']} searches ({stats['searches_per_hour']}/hour), {stats['rows']} rows stored, "
+          f"{stats['splits']} prefixes split, {stats['wrong_captchas']} wrong CAPTCHAs, {stats['failures']} failures")
+    print_summary(stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
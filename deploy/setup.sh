@@ -71,6 +71,10 @@ sudo -u tmapp /opt/trademark-search/venv/bin/pip install --upgrade pip
 echo "📦 Installing Python dependencies..."
 sudo -u tmapp /opt/trademark-search/venv/bin/pip install -r requirements.txt
 
+# Fingerprinted, pre-compressed static assets
+echo "🗜️ Building static assets..."
+sudo -u tmapp /opt/trademark-search/venv/bin/python build_assets.py
+
 # Create environment file
 echo "⚙️ Creating environment configuration..."
 sudo tee /opt/trademark-search/.env > /dev/null <<EOF
@@ -126,10 +130,15 @@ server {
         proxy_read_timeout 300s;
     }
 
+    location /static/dist/ {
+        alias /opt/trademark-search/static/dist/;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        gzip_static on;
+    }
+
     location /static {
         alias /opt/trademark-search/static;
-        expires 30d;
-        add_header Cache-Control "public, immutable";
+        add_header Cache-Control "public, no-cache";
     }
 
     location /health {
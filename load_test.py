@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Load test: N simulated users run the full search flow concurrently
+/start_search -> /get_status -> /submit_search -> /get_status -> /get_results -> /export_excel
+
+By default a gunicorn server is started with the stub scraper backend (SCRAPER_BACKEND=stub), so no
+Chrome or registry is involved; pass --url to test a server that is already running.
+Reports latency percentiles per endpoint, throughput, errors and server memory growth.
+
+    python load_test.py --users 20 --iterations 3
+    python load_test.py --users 20 --gunicorn "--workers 1 --threads 16"
+    python load_test.py --users 20 --gunicorn "--workers 1 --worker-class gthread --threads 32" --json gthread.json
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.cookiejar
+import urllib.error
+import urllib.request
+
+from utils.browser_supervisor import list_processes, descendants
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}     # endpoint -> [seconds]
+        self.errors = {}        # endpoint -> count
+        self.flow_errors = {}   # message -> count
+        self.flows_completed = 0
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def flow_done(self, error=None):
+        with self.lock:
+            if error:
+                self.flow_errors[error] = self.flow_errors.get(error, 0) + 1
+            else:
+                self.flows_completed += 1
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class SimulatedUser:
+    """One browser session: its own cookie jar, running the flow the web UI runs"""
+
+    def __init__(self, base_url, stats, args, user_number):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.args = args
+        self.user_number = user_number
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def call(self, method, path, payload=None, label=None):
+        """Timed request; returns (status, body bytes, headers)"""
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.args.timeout) as response:
+                status, body, headers = response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            status, body, headers = e.code, e.read(), e.headers
+        except (urllib.error.URLError, socket.timeout, ConnectionError) as e:
+            self.stats.record(label or path, time.perf_counter() - start, False)
+            raise Exception(f"{label or path}: {e}")
+
+        ok = status < 400
+        if ok and headers.get('Content-Type', '').startswith('application/json'):
+            ok = json.loads(body or b'{}').get('success', True) is not False
+        self.stats.record(label or path, time.perf_counter() - start, ok)
+        return status, body, headers
+
+    def json_call(self, method, path, payload=None, label=None):
+        status, body, _ = self.call(method, path, payload, label)
+        return status, json.loads(body or b'{}')
+
+    def wait_for_status(self, wanted, deadline):
+        while time.time() < deadline:
+            _, status = self.json_call('GET', '/get_status')
+            if status.get('status') in wanted:
+                return status
+            if status.get('status') == 'error':
+                raise Exception(f"search error ({status.get('error_type', 'error')})")
+            time.sleep(self.args.poll_interval)
+        raise Exception(f"timed out waiting for {'/'.join(wanted)}")
+
+    def run_flow(self, iteration):
+        deadline = time.time() + self.args.flow_timeout
+        wordmark = f'{self.args.wordmark}{(self.user_number + iteration) % self.args.distinct_searches}'
+
+        _, started = self.json_call('POST', '/start_search', {'wordmark': wordmark, 'class': self.args.trademark_class,
+                                                              'filter': 'Contains'})
+        if not started.get('success'):
+            raise Exception(f"start_search: {started.get('message')}")
+
+        # A session that joined an identical search in flight gets no CAPTCHA - it only waits for the results
+        if not started.get('shared'):
+            self.wait_for_status(('captcha_ready',), deadline)
+
+            _, submitted = self.json_call('POST', '/submit_search', {'captcha': 'STUB01'})
+            if not submitted.get('success'):
+                raise Exception(f"submit_search: {submitted.get('message')}")
+        self.wait_for_status(('complete',), deadline)
+
+        _, results = self.json_call('GET', '/get_results')
+        if not results.get('success', True):
+            raise Exception("get_results failed")
+
+        if not self.args.skip_export:
+            while time.time() < deadline:
+                status, _, _ = self.call('GET', '/export_excel')
+                if status == 200:
+                    break
+                if status != 202:
+                    raise Exception(f"export_excel returned {status}")
+                time.sleep(self.args.poll_interval)
+            else:
+                raise Exception("timed out waiting for export")
+
+        self.call('POST', '/reset_search', {})
+
+    def run(self):
+        for iteration in range(self.args.iterations):
+            try:
+                self.run_flow(iteration)
+                self.stats.flow_done()
+            except Exception as e:
+                self.stats.flow_done(str(e)[:120])
+            if self.args.think_time:
+                time.sleep(self.args.think_time)
+
+
+class MemoryMonitor:
+    """Samples the total RSS of the server process tree"""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='memory-monitor')
+        self.thread.daemon = True
+
+    def rss_mb(self):
+        processes = list_processes()
+        return sum(processes[pid]['rss'] for pid in descendants(self.pid, processes)) / 1048576
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.samples.append(self.rss_mb())
+            self.stopped.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.samples.append(self.rss_mb())
+
+
+def start_server(args, work_dir):
+    """Launch gunicorn with the stub backend on a free port; returns (process, url)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    env = dict(os.environ,
+               SCRAPER_BACKEND='stub',
+               STUB_SCRAPER_LATENCY=str(args.stub_latency),
+               STUB_SCRAPER_RESULTS=str(args.stub_results),
+               CORPUS_DB_PATH=os.path.join(work_dir, 'corpus.db'),
+               EXPORT_CACHE_DIR=os.path.join(work_dir, 'exports'),
+               IMAGE_CACHE_DIR=os.path.join(work_dir, 'images'),
+               RESULT_STORE_DIR=os.path.join(work_dir, 'results'),
+               REGISTRY_RATE_FILE=os.path.join(work_dir, 'registry_rate'))
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'] \
+        + shlex.split(args.gunicorn) + ['app:app']
+    print(f"Starting: {' '.join(command)}")
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"gunicorn exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(url + '/health', timeout=1).read()
+            return process, url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+    process.terminate()
+    raise Exception("gunicorn did not become healthy within 30s")
+
+
+def fetch_rate_limit(url):
+    """Registry rate limiter metrics of whichever worker answers /health"""
+    try:
+        with urllib.request.urlopen(url + '/health', timeout=5) as response:
+            return json.loads(response.read()).get('rate_limit')
+    except (urllib.error.URLError, ConnectionError, socket.timeout, ValueError):
+        return None
+
+
+def report(stats, elapsed, memory, args, rate_limit=None):
+    print(f"\n{'Endpoint':<18}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}")
+    endpoints = {}
+    total_requests = 0
+    for endpoint, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        total_requests += len(values)
+        endpoints[endpoint] = {
+            'count': len(values),
+            'errors': stats.errors.get(endpoint, 0),
+            'p50_ms': percentile(values, 0.5) * 1000,
+            'p90_ms': percentile(values, 0.9) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000
+        }
+        row = endpoints[endpoint]
+        print(f"{endpoint:<18}{row['count']:>8}{row['errors']:>8}{row['p50_ms']:>10.1f}{row['p90_ms']:>10.1f}"
+              f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+
+    flows_failed = sum(stats.flow_errors.values())
+    summary = {
+        'users': args.users,
+        'iterations': args.iterations,
+        'gunicorn': None if args.url else args.gunicorn,
+        'elapsed_s': elapsed,
+        'flows_completed': stats.flows_completed,
+        'flows_failed': flows_failed,
+        'flows_per_s': stats.flows_completed / elapsed if elapsed else 0,
+        'requests_per_s': total_requests / elapsed if elapsed else 0,
+        'flow_errors': stats.flow_errors,
+        'endpoints': endpoints
+    }
+    print(f"\nFlows: {stats.flows_completed} completed, {flows_failed} failed in {elapsed:.1f}s "
+          f"({summary['flows_per_s']:.2f} flows/s, {summary['requests_per_s']:.1f} requests/s)")
+    for error, count in sorted(stats.flow_errors.items(), key=lambda item: -item[1]):
+        print(f"  {count:>5} x {error}")
+
+    if memory and memory.samples:
+        summary['memory_mb'] = {'start': memory.samples[0], 'peak': max(memory.samples), 'end': memory.samples[-1],
+                                'growth': memory.samples[-1] - memory.samples[0]}
+        print(f"Server RSS: {memory.samples[0]:.1f} MB at start, {max(memory.samples):.1f} MB peak, "
+              f"{memory.samples[-1]:.1f} MB at end ({summary['memory_mb']['growth']:+.1f} MB)")
+
+    if rate_limit and rate_limit.get('enabled'):
+        summary['rate_limit'] = rate_limit
+        print(f"Registry rate limit ({rate_limit['rate_per_second']}/s, burst {rate_limit['burst']}, one worker): "
+              f"{rate_limit['granted']} granted, {rate_limit['delayed']} queued "
+              f"(avg {rate_limit['avg_wait_ms']:.0f} ms, max {rate_limit['max_wait_ms']:.0f} ms), "
+              f"{rate_limit['rejected']} rejected")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10, help='concurrent simulated users')
+    parser.add_argument('--iterations', type=int, default=2, help='searches per user')
+    parser.add_argument('--ramp-up', type=float, default=2.0, help='seconds over which users start')
+    parser.add_argument('--think-time', type=float, default=0.0, help='pause between a user\'s searches')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='status/export polling interval')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout')
+    parser.add_argument('--flow-timeout', type=float, default=120.0, help='per-search timeout')
+    parser.add_argument('--wordmark', default='LOADTEST')
+    parser.add_argument('--trademark-class', default='9')
+    parser.add_argument('--distinct-searches', type=int, default=1000,
+                        help='number of different wordmarks (lower it to exercise caches)')
+    parser.add_argument('--skip-export', action='store_true', help='stop after /get_results')
+    parser.add_argument('--url', help='test an already running server instead of starting gunicorn')
+    parser.add_argument('--pid', type=int, help='server PID to sample memory from when using --url')
+    parser.add_argument('--gunicorn', default='--workers 1 --threads 8',
+                        help='extra gunicorn arguments for the local server')
+    parser.add_argument('--stub-latency', type=float, default=0.2, help='STUB_SCRAPER_LATENCY for the local server')
+    parser.add_argument('--stub-results', type=int, default=50, help='STUB_SCRAPER_RESULTS for the local server')
+    parser.add_argument('--json', help='write the summary to this file (to compare configurations)')
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory() as work_dir:
+        try:
+            if args.url:
+                url, server_pid = args.url, args.pid
+            else:
+                server, url = start_server(args, work_dir)
+                server_pid = server.pid
+
+            memory = MemoryMonitor(server_pid).start() if server_pid and os.path.isdir('/proc') else None
+            stats = Stats()
+            users = [SimulatedUser(url, stats, args, n) for n in range(args.users)]
+            threads = [threading.Thread(target=user.run, name=f'user-{n}') for n, user in enumerate(users)]
+
+            print(f"Running {args.users} users x {args.iterations} searches against {url}")
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+                time.sleep(args.ramp_up / max(1, args.users))
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            if memory:
+                memory.stop()
+            summary = report(stats, elapsed, memory, args, fetch_rate_limit(url))
+            if args.json:
+                with open(args.json, 'w') as f:
+                    json.dump(summary, f, indent=2)
+                print(f"Summary written to {args.json}")
+            return 0 if not summary['flows_failed'] else 1
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the web app
+Runs `python -X importtime -c "import app"` in a fresh interpreter and reports the slowest modules
+"""
+
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_imports(target='app'):
+    """Return [(module, self_us, cumulative_us)] in import order for a fresh `import target`"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"import {target} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def top_level_packages(rows):
+    """Total self time per top-level package"""
+    totals = {}
+    for module, self_us, _ in rows:
+        package = module.strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else 'app'
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    rows = profile_imports(target)
+
+    total_us = sum(self_us for _, self_us, _ in rows)
+    print(f"import {target}: {total_us / 1000:.1f} ms across {len(rows)} modules\n")
+
+    print(f"{'Package':<30}{'ms':>10}{'share':>10}")
+    for package, self_us in top_level_packages(rows)[:limit]:
+        print(f"{package:<30}{self_us / 1000:>10.1f}{self_us / total_us:>10.1%}")
+
+    print(f"\n{'Slowest modules (cumulative)':<50}{'ms':>10}")
+    for module, _, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:limit]:
+        print(f"{module:<50}{cumulative_us / 1000:>10.1f}")
+
+    heavy = [name for name in ('selenium', 'openpyxl', 'numpy', 'PIL', 'pyarrow')
+             if any(module.strip() == name for module, _, _ in rows)]
+    print(f"\nHeavy packages loaded at import: {', '.join(heavy) if heavy else 'none'}")
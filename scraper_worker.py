@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Scraper worker for SEARCH_EXECUTION=queue
+Takes search jobs from the durable job queue, launches the browser and publishes its CAPTCHA, then
+holds the browser until the CAPTCHA submit job for that search arrives. Results are processed here
+and written to RESULT_STORE_DIR/queue, where the web processes read them.
+
+    python scraper_worker.py --concurrency 4
+"""
+
+import os
+import time
+import signal
+import socket
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.corpus import TrademarkCorpus
+from utils.watchlist import WatchStore
+from utils.job_queue import JobQueue
+from utils.search_runner import SearchRunner, create_scraper, decode_captcha
+from utils.result_store import RESULT_STORE_DIR
+from utils.browser_supervisor import browser_supervisor
+
+# Results published by workers - must be storage every web process can read
+QUEUE_RESULTS_DIR = os.path.join(RESULT_STORE_DIR, 'queue')
+
+POLL_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 5
+PRUNE_INTERVAL = 300
+# Finished searches (and their result files) are kept as long as a web session is
+SEARCH_RETENTION = 3600
+# A browser waiting for its CAPTCHA answer is closed after this many seconds
+CAPTCHA_TIMEOUT = int(os.environ.get('SCRAPER_CAPTCHA_TIMEOUT', 600))
+
+
+class ScraperWorker:
+    def __init__(self, queue, concurrency, worker_id=None, runner=None):
+        self.queue = queue
+        # Workbooks are generated by the web tier on first download, where its cache is pruned
+        self.runner = runner or SearchRunner(TrademarkCorpus(), WatchStore())
+        self.concurrency = concurrency
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.scrapers = {}          # search_id -> scraper, for every browser this worker holds
+        self.captcha_since = {}     # search_id -> time its CAPTCHA was published, while awaiting the answer
+        self.running = 0
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='scraper-job')
+
+    def active(self):
+        """Browsers held, running or awaiting a CAPTCHA - each counts against the concurrency"""
+        with self.lock:
+            return self.running + len(self.captcha_since)
+
+    def owned_scrapers(self):
+        with self.lock:
+            return {id(scraper) for scraper in self.scrapers.values()}
+
+    def run(self):
+        browser_supervisor.set_owner_check(self.owned_scrapers)
+        # Reap browsers a previous worker on this host left behind before launching any of ours
+        browser_supervisor.start()
+        os.makedirs(QUEUE_RESULTS_DIR, exist_ok=True)
+        signal.signal(signal.SIGTERM, lambda *args: self.stopping.set())
+        signal.signal(signal.SIGINT, lambda *args: self.stopping.set())
+        print(f"Scraper worker {self.worker_id} started with {self.concurrency} browser(s)")
+
+        last_heartbeat = 0
+        last_prune = 0
+        while not self.stopping.is_set():
+            now = time.time()
+            if now - last_heartbeat >= HEARTBEAT_INTERVAL:
+                self.queue.heartbeat(self.worker_id, self.concurrency, self.active())
+                self.queue.recover()
+                self.expire_held()
+                last_heartbeat = now
+            if now - last_prune >= PRUNE_INTERVAL:
+                self.prune()
+                last_prune = now
+
+            # CAPTCHA answers for browsers held here are always taken; new searches only with room
+            job = self.queue.claim(self.worker_id, accept_new=self.active() < self.concurrency)
+            if job is None:
+                self.stopping.wait(POLL_INTERVAL)
+                continue
+            with self.lock:
+                self.running += 1
+            self.executor.submit(self.run_job, job)
+
+        self.shutdown()
+
+    def run_job(self, job):
+        try:
+            if job['kind'] == 'start':
+                self.start_search(job['search_id'])
+            else:
+                self.submit_search(job['search_id'], job['payload']['captcha'])
+            self.queue.finish_job(job['id'])
+        except Exception as e:
+            print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            self.queue.finish_job(job['id'], 'failed')
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def start_search(self, search_id):
+        search = self.queue.get_search(search_id)
+        if not search or search['status'] == 'cancelled':
+            return
+        params = search['params']
+
+        scraper = create_scraper()
+        with self.lock:
+            self.scrapers[search_id] = scraper
+        try:
+            captcha_data = scraper.initialize_browser(params['wordmark'], params['class'], params['filter'])
+        except Exception as e:
+            with self.lock:
+                self.scrapers.pop(search_id, None)
+            self.queue.update_search(search_id, status='error', error_message=str(e),
+                                     error_type=getattr(e, 'error_type', 'error'))
+            return
+
+        image, version = decode_captcha(captcha_data)
+        with self.lock:
+            self.captcha_since[search_id] = time.time()
+        if not self.queue.update_search(search_id, status='captcha_ready', captcha=image, captcha_version=version,
+                                        message='Enter the CAPTCHA'):
+            self.close_held(search_id)  # Cancelled while the browser was starting
+
+    def submit_search(self, search_id, captcha):
+        with self.lock:
+            self.captcha_since.pop(search_id, None)
+            scraper = self.scrapers.get(search_id)
+        if scraper is None:
+            self.queue.update_search(search_id, status='error', error_type='worker_lost',
+                                     error_message='The browser for this search was closed - please search again')
+            return
+        search = self.queue.get_search(search_id)
+
+        last_progress = [None]
+
+        def report_progress(progress, message):
+            # One write per progress step, not per row
+            if progress != last_progress[0]:
+                last_progress[0] = progress
+                self.queue.update_search(search_id, progress=progress, message=message)
+
+        try:
+            processed = self.runner.execute_search(scraper, search['params'], captcha, report_progress,
+                                                   store_dir=QUEUE_RESULTS_DIR)
+        except Exception as e:
+            scraper.cleanup()
+            self.queue.update_search(search_id, status='error', error_message=str(e),
+                                     error_type=getattr(e, 'error_type', 'error'))
+            return
+        finally:
+            with self.lock:
+                self.scrapers.pop(search_id, None)
+
+        results = processed['search_results']
+        published = self.queue.update_search(
+            search_id, status='complete', progress=100, message=f'Found {len(results)} results',
+            results_path=results.path if results else None, results_count=len(results),
+            results_version=processed['results_version'], watch_run=processed['watch_run'],
+            image_index={app_num: digest for app_num, (digest, _) in processed['image_index'].items()})
+        if not published and results:
+            results.delete()  # Cancelled while it ran
+
+    def close_held(self, search_id):
+        with self.lock:
+            self.captcha_since.pop(search_id, None)
+            scraper = self.scrapers.pop(search_id, None)
+        if scraper:
+            scraper.cleanup()
+
+    def expire_held(self):
+        """Close browsers whose search was cancelled or whose CAPTCHA was never answered"""
+        with self.lock:
+            held = dict(self.captcha_since)
+        if not held:
+            return
+        statuses = self.queue.search_statuses(held)
+        now = time.time()
+        for search_id, since in held.items():
+            status = statuses.get(search_id)
+            if status in (None, 'cancelled'):
+                self.close_held(search_id)
+            elif status == 'captcha_ready' and now - since > CAPTCHA_TIMEOUT:
+                self.close_held(search_id)
+                self.queue.update_search(search_id, status='error', error_type='captcha_timeout',
+                                         error_message='The CAPTCHA expired - please search again')
+
+    def prune(self):
+        try:
+            for path in self.queue.prune(SEARCH_RETENTION):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        except Exception as e:
+            print(f"Job queue prune error: {e}")
+
+    def shutdown(self):
+        """Finish running searches, close held browsers and hand what is left back to the queue"""
+        print(f"Scraper worker {self.worker_id} stopping")
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            held = list(self.scrapers)
+        for search_id in held:
+            self.close_held(search_id)
+        self.queue.retire(self.worker_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('SCRAPER_WORKER_CONCURRENCY', 2)),
+                        help='browsers this worker runs at once')
+    parser.add_argument('--worker-id', help='defaults to <hostname>-<pid>')
+    args = parser.parse_args()
+
+    ScraperWorker(JobQueue(), args.concurrency, args.worker_id).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -20,26 +20,31 @@ ls -la
 
 echo ""
 echo "Checking Python packages..."
-python -c "import flask; print('✓ Flask: OK')" || { echo "✗ Flask: FAILED"; exit 1; }
-python -c "import gunicorn; print('✓ Gunicorn: OK')" || { echo "✗ Gunicorn: FAILED"; exit 1; }
-
-echo ""
-echo "Checking optional packages..."
-python -c "import selenium; print('✓ Selenium: OK')" || echo "⚠ Selenium: Not available"
-python -c "import openpyxl; print('✓ OpenPyXL: OK')" || echo "⚠ OpenPyXL: Not available"  
-python -c "import PIL; print('✓ Pillow: OK')" || echo "⚠ Pillow: Not available"
+# One interpreter, and find_spec locates packages without importing them
+python - <<'EOF' || exit 1
+import sys
+from importlib.util import find_spec
+
+for name, label in [('flask', 'Flask'), ('gunicorn', 'Gunicorn')]:
+    if find_spec(name) is None:
+        print(f"✗ {label}: FAILED")
+        sys.exit(1)
+    print(f"✓ {label}: OK")
+
+for name, label, note in [('selenium', 'Selenium', ''), ('openpyxl', 'OpenPyXL', ''), ('PIL', 'Pillow', ''),
+                          ('numpy', 'NumPy', ''), ('pyarrow', 'PyArrow', ' (Parquet export disabled)'),
+                          ('orjson', 'orjson', ' (stdlib JSON encoder used)'), ('brotli', 'Brotli', ' (gzip only)')]:
+    print(f"✓ {label}: OK" if find_spec(name) else f"⚠ {label}: Not available{note}")
+EOF
 
 echo ""
 echo "Checking Chrome..."
 google-chrome --version || echo "⚠ Chrome: Not available"
 
 echo ""
-echo "Testing Flask app import..."
-python -c "from app import app; print('✓ Flask app imported successfully')" || { echo "✗ Flask app import FAILED"; exit 1; }
-
-echo ""
+# --preload imports the app once in the master (failing fast on import errors) before forking workers
 echo "Starting Gunicorn server on port $PORT..."
-echo "Gunicorn command: gunicorn --bind 0.0.0.0:$PORT --workers 1 --timeout 300 app:app"
+echo "Gunicorn command: gunicorn --bind 0.0.0.0:$PORT --workers 1 --timeout 300 --preload app:app"
 echo ""
 
-exec gunicorn --bind "0.0.0.0:$PORT" --workers 1 --timeout 300 --log-level debug app:app
\ No newline at end of file
+exec gunicorn --bind "0.0.0.0:$PORT" --workers 1 --timeout 300 --preload --log-level debug app:app
@@ -19,31 +19,21 @@ export RAILWAY_ENVIRONMENT=true
 export PRODUCTION=true
 export HEADLESS=true
 
+# Import Selenium/openpyxl/NumPy in the gunicorn master so workers start warm
+export PRELOAD_HEAVY_MODULES=${PRELOAD_HEAVY_MODULES:-true}
+
 echo ""
-echo "Testing Python imports..."
+echo "Checking Python packages..."
+# find_spec locates packages without importing them - gunicorn --preload does the real import once
 python -c "
 import sys
+from importlib.util import find_spec
 print(f'Python version: {sys.version}')
-try:
-    from app import app
-    print('✓ Flask app imported successfully')
-except Exception as e:
-    print(f'✗ Flask app import failed: {e}')
-    sys.exit(1)
-
-try:
-    import gunicorn
-    print('✓ Gunicorn imported successfully')
-except Exception as e:
-    print(f'✗ Gunicorn import failed: {e}')
-    sys.exit(1)
-
-try:
-    import selenium
-    print('✓ Selenium imported successfully')
-except Exception as e:
-    print(f'✗ Selenium import failed: {e}')
+missing = [name for name in ('flask', 'gunicorn', 'selenium') if find_spec(name) is None]
+if missing:
+    print('✗ Missing packages: ' + ', '.join(missing))
     sys.exit(1)
+print('✓ Flask, Gunicorn and Selenium available')
 "
 
 echo ""
@@ -53,7 +43,8 @@ exec gunicorn \
     --workers 2 \
     --threads 4 \
     --timeout 120 \
+    --preload \
     --access-logfile - \
     --error-logfile - \
     --log-level info \
-    app:app
\ No newline at end of file
+    app:app
@@ -5,9 +5,18 @@ class TrademarkSearchApp {
         this.statusCheckInterval = null;
         this.currentStatus = 'idle';
         this.initializeEventListeners();
+        this.prepareBrowser();
         this.showAlert('Application loaded successfully', 'success');
     }
 
+    prepareBrowser() {
+        // Start the browser and CAPTCHA while the user is still typing;
+        // /start_search claims it if it is still fresh
+        fetch('/prepare_search', { method: 'POST' }).catch(error => {
+            console.error('Prepare error:', error);
+        });
+    }
+
     initializeEventListeners() {
         // Search form submission
         document.getElementById('searchForm').addEventListener('submit', (e) => {
@@ -119,7 +128,7 @@ class TrademarkSearchApp {
         switch (status) {
             case 'captcha_ready':
                 this.stopStatusPolling();
-                this.showCaptcha(data.captcha);
+                this.showCaptcha(data.captcha_url);
                 break;
             
             case 'searching':
@@ -139,12 +148,13 @@ class TrademarkSearchApp {
         }
     }
 
-    showCaptcha(captchaData) {
+    showCaptcha(captchaUrl) {
         this.hideAllSections();
         this.showSection('captchaSection');
         
+        // Versioned URL - the image is only downloaded when the CAPTCHA changes
         const captchaImage = document.getElementById('captchaImage');
-        captchaImage.src = 'data:image/png;base64,' + captchaData;
+        captchaImage.src = captchaUrl;
         
         // Focus on CAPTCHA input
         document.getElementById('captchaInput').focus();
@@ -180,6 +190,8 @@ class TrademarkSearchApp {
             
             if (data.success) {
                 this.hideLoading();
+                // A refreshed CAPTCHA can come back as captcha_ready again
+                this.currentStatus = 'submitting';
                 this.startStatusPolling();
             } else {
                 this.hideLoading();
@@ -251,10 +263,13 @@ class TrademarkSearchApp {
                 <td>${this.escapeHtml(result.Proprietor || '')}</td>
                 <td>${this.escapeHtml(result.Class || '')}</td>
                 <td>${this.escapeHtml(result.Status || '')}</td>
+                <td>${result.Similarity_Score ?? ''}</td>
                 <td>
-                    <span class="image-indicator ${result.has_image ? 'has-image' : 'no-image'}">
-                        ${result.has_image ? '✓ Image' : '✗ No Image'}
-                    </span>
+                    ${result.image_url
+                        ? `<img src="${this.escapeHtml(result.image_url)}" alt="Logo" class="result-thumb" loading="lazy">`
+                        : `<span class="image-indicator ${result.has_image ? 'has-image' : 'no-image'}">
+                               ${result.has_image ? '✓ Image' : '✗ No Image'}
+                           </span>`}
                 </td>
             `;
             tbody.appendChild(row);
@@ -265,8 +280,8 @@ class TrademarkSearchApp {
         this.showLoading();
         
         try {
-            const response = await fetch('/export_excel');
-            
+            const response = await this.fetchExport();
+
             if (response.ok) {
                 const blob = await response.blob();
                 const url = window.URL.createObjectURL(blob);
@@ -300,6 +315,35 @@ class TrademarkSearchApp {
         }
     }
 
+    async fetchExport() {
+        // The workbook is generated in the background when the search completes;
+        // a 202 means it is still being built, so poll the job until it is ready
+        let response = await fetch('/export_excel');
+
+        while (response.status === 202) {
+            const job = await response.json();
+            const jobStatus = await this.waitForExportJob(job.job_id);
+            if (jobStatus.status === 'error') {
+                throw new Error(jobStatus.error || 'Export job failed');
+            }
+            response = await fetch('/export_excel');
+        }
+
+        return response;
+    }
+
+    async waitForExportJob(jobId) {
+        while (true) {
+            const response = await fetch('/export_status/' + encodeURIComponent(jobId));
+            const data = await response.json();
+
+            if (!data.success || data.status === 'ready' || data.status === 'error') {
+                return data;
+            }
+            await new Promise(resolve => setTimeout(resolve, 500));
+        }
+    }
+
     async resetSearch() {
         this.showLoading();
         
@@ -339,6 +383,7 @@ class TrademarkSearchApp {
         document.getElementById('exportBtn').style.display = 'none';
         document.getElementById('resultsTableBody').innerHTML = '';
         
+        this.prepareBrowser();
         this.showAlert('Ready for new search', 'info');
     }
 
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Browser supervisor tests with fake scrapers - no Chrome is launched
+Checks that the age limit never kills a browser from the sampling thread and is only reported to
+the scraper about to reuse it, and that orphan reaping only touches trees running our profiles
+(the process table is faked, nothing is killed).
+"""
+
+import os
+
+import utils.browser_supervisor as supervisor_module
+from utils.browser_supervisor import BrowserSupervisor
+
+
+class FakeProcess:
+    def __init__(self, pid):
+        self.pid = pid
+
+
+class FakeService:
+    def __init__(self, pid):
+        self.process = FakeProcess(pid)
+
+
+class FakeDriver:
+    def __init__(self, pid):
+        self.service = FakeService(pid)
+
+
+class FakeScraper:
+    def __init__(self, pid):
+        self.driver = FakeDriver(pid)
+        self.user_data_dir = None
+        self.cleaned = False
+
+    def cleanup(self):
+        self.cleaned = True
+
+
+def new_supervisor():
+    supervisor = BrowserSupervisor(max_age=60)
+    supervisor.start = lambda: None     # no sampling thread or orphan reaping in tests
+    return supervisor
+
+
+def test_age_limit_only_on_reuse():
+    print("=== Browser supervisor: age limit ===")
+    supervisor = new_supervisor()
+    searching, shared = FakeScraper(999991), FakeScraper(999992)
+    supervisor.register(searching)
+    supervisor.register(shared, managed=True)
+    for browser in supervisor.browsers.values():
+        browser['launched'] -= 61
+
+    assert supervisor.enforce() == 0 and not searching.cleaned, "an old browser is not killed mid-search"
+    assert not supervisor.expired(shared), "pool browsers are retired by the pool"
+    assert supervisor.expired(searching), "the owner is told before reusing it"
+    assert not supervisor.expired(FakeScraper(999993)), "untracked browsers have no age"
+    assert supervisor.snapshot()['killed']['age'] == 1
+    print("PASS: old browsers are only replaced by their owner")
+
+
+def process(pid, ppid, name):
+    return {'pid': pid, 'ppid': ppid, 'name': name, 'state': 'S', 'rss': 0, 'cpu_ticks': 0}
+
+
+def test_reap_only_our_orphans():
+    print("=== Browser supervisor: orphan reaping ===")
+    profile = '--user-data-dir=/tmp/chrome_user_data_4242_ab12'
+    processes = {p['pid']: p for p in [
+        process(1, 0, 'init'),
+        process(100, 1, 'chromedriver'), process(101, 100, 'chrome'), process(102, 101, 'chrome'),
+        process(200, 1, 'chromedriver'), process(201, 200, 'chrome'),    # another app's ChromeDriver
+        process(300, 1, 'chrome'),                                          # a desktop Chrome
+        process(400, 1, 'chrome'),                                          # our Chrome, driver gone
+        process(500, os.getpid(), 'chromedriver'), process(501, 500, 'chrome'),  # our own live browser
+    ]}
+    cmdlines = {101: f'chrome {profile}', 102: 'chrome --type=renderer', 201: 'chrome --headless',
+                300: 'chrome --user-data-dir=/home/user/.config/chrome', 400: f'chrome {profile}',
+                501: f'chrome {profile}'}
+    killed = []
+    saved = supervisor_module.list_processes, supervisor_module.read_cmdline, supervisor_module.kill_pids
+    supervisor_module.list_processes = lambda: processes
+    supervisor_module.read_cmdline = lambda pid: cmdlines.get(pid, '')
+    supervisor_module.kill_pids = lambda pids: killed.extend(pids) or len(pids)
+    try:
+        supervisor = new_supervisor()
+        supervisor.enabled = True
+        assert supervisor.reap_orphans() == 4
+    finally:
+        supervisor_module.list_processes, supervisor_module.read_cmdline, supervisor_module.kill_pids = saved
+    assert sorted(killed) == [100, 101, 102, 400], killed
+    print("PASS: only orphaned trees with a chrome_user_data_ profile are reaped")
+
+
+if __name__ == "__main__":
+    test_age_limit_only_on_reuse()
+    test_reap_only_our_orphans()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Bulk status lookup tests with the stub scraper and a temporary corpus
+Numbers refreshed within the freshness window must be answered from the corpus without a search;
+the rest are looked up, written back, and counted in the lookups-per-minute figure.
+"""
+
+import os
+import queue
+import tempfile
+from datetime import datetime, timedelta
+
+import utils.stub_scraper as stub_scraper
+from utils.bulk_lookup import BulkLookup, read_application_numbers
+from utils.corpus import TrademarkCorpus
+from utils.registry import TokenBucket
+from utils.stub_scraper import StubScraper
+
+# 1000157 is one of the numbers the stub reports as not found
+FRESH, STALE, UNKNOWN, MISSING = '1000101', '1000102', '1000103', '1000157'
+
+
+def timestamp(hours_ago):
+    return (datetime.now() - timedelta(hours=hours_ago)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def new_lookup():
+    corpus = TrademarkCorpus(os.path.join(tempfile.mkdtemp(), 'corpus.db'))
+    corpus.upsert_results([{'Application_Number': FRESH, 'Wordmark': 'FRESH MARK', 'Status': 'Registered'}],
+                          timestamp(1))
+    corpus.upsert_results([{'Application_Number': STALE, 'Wordmark': 'STALE MARK', 'Status': 'Objected'}],
+                          timestamp(48))
+    return BulkLookup(corpus, StubScraper, browsers=2, fresh_hours=24)
+
+
+def run(lookup):
+    """Answer every CAPTCHA until the lookup ends; returns the numbers searched on the registry"""
+    asked = []
+    while lookup.running() or not lookup.captchas.empty():
+        try:
+            request = lookup.captchas.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        asked.append(request.label.split()[-1])
+        request.answer('STUB01')
+    return sorted(asked)
+
+
+def test_fresh_numbers_skip_the_registry():
+    print("=== Bulk lookup: freshness window ===")
+    numbers = read_application_numbers([f'{FRESH},tea\n', f' "{STALE}"\n', 'header,line\n', f'{UNKNOWN}\n',
+                                        f'{FRESH}\n', f'{MISSING}\n'])
+    assert numbers == [FRESH, STALE, UNKNOWN, MISSING], "duplicates and non-numbers dropped, order kept"
+
+    saved = stub_scraper.STUB_LATENCY, stub_scraper.registry_limiter
+    stub_scraper.STUB_LATENCY = 0
+    stub_scraper.registry_limiter = TokenBucket(rate=1000, burst=1000, path=os.path.join(tempfile.mkdtemp(), 'rate'))
+    try:
+        lookup = new_lookup()
+        assert lookup.plan(numbers) == 3
+        lookup.start()
+        assert run(lookup) == [STALE, UNKNOWN, MISSING], "the fresh number is never searched"
+    finally:
+        stub_scraper.STUB_LATENCY, stub_scraper.registry_limiter = saved
+
+    rows = {row['Application_Number']: row for row in lookup.table()}
+    assert list(rows) == numbers
+    assert (rows[FRESH]['Source'], rows[FRESH]['Wordmark']) == ('corpus', 'FRESH MARK')
+    assert rows[STALE]['Source'] == 'registry' and rows[STALE]['Wordmark'] == f'STUB MARK {STALE}'
+    assert rows[UNKNOWN]['Source'] == 'registry' and rows[MISSING]['Source'] == 'not found'
+
+    # Looked-up rows are written back, so a second run answers them from the corpus
+    again = BulkLookup(lookup.corpus, StubScraper, fresh_hours=24)
+    assert again.plan(numbers) == 1, "only the number the registry did not know is searched again"
+    print("PASS: fresh numbers answered from the corpus, the rest looked up and stored")
+
+
+def test_lookup_accounting():
+    print("=== Bulk lookup: lookups per minute ===")
+    saved = stub_scraper.STUB_LATENCY, stub_scraper.registry_limiter
+    stub_scraper.STUB_LATENCY = 0
+    stub_scraper.registry_limiter = TokenBucket(rate=1000, burst=1000, path=os.path.join(tempfile.mkdtemp(), 'rate'))
+    try:
+        lookup = new_lookup()
+        lookup.plan([FRESH, STALE, UNKNOWN, MISSING])
+        lookup.start()
+        run(lookup)
+    finally:
+        stub_scraper.STUB_LATENCY, stub_scraper.registry_limiter = saved
+
+    stats = lookup.snapshot()
+    assert (stats['fresh'], stats['looked_up'], stats['not_found'], stats['failed']) == (1, 3, 1, 0), stats
+
+    # Only registry lookups count towards the rate, over the time since start()
+    lookup.started -= 90
+    stats = lookup.snapshot()
+    assert 89 <= stats['seconds'] <= 100
+    assert abs(stats['lookups_per_minute'] - 3 * 60 / stats['seconds']) < 0.1, stats
+    assert BulkLookup(lookup.corpus, StubScraper).snapshot()['lookups_per_minute'] == 0, "not started yet"
+    print("PASS: fresh answers are not counted as lookups")
+
+
+if __name__ == "__main__":
+    test_fresh_numbers_skip_the_registry()
+    test_lookup_accounting()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Local trademark corpus tests against a temporary database
+Upserts must refresh a row in place (keeping first_seen) and the FTS index must follow updates
+through its trigger; match queries are prefix queries, optionally on one field and one class.
+"""
+
+import os
+import tempfile
+
+from utils.corpus import TrademarkCorpus, build_match_query
+
+
+def row(app_num, wordmark, proprietor, trademark_class='30', status='Registered'):
+    return {'Application_Number': app_num, 'Wordmark': wordmark, 'Proprietor': proprietor,
+            'Class': trademark_class, 'Status': status}
+
+
+def numbers(records):
+    return sorted(record['Application_Number'] for record in records)
+
+
+def test_build_match_query():
+    print("=== Corpus: match queries ===")
+    assert build_match_query('tata steel') == '"tata"* AND "steel"*'
+    assert build_match_query('Tata-Steel!', 'wordmark') == 'wordmark : ("Tata"* AND "Steel"*)'
+    assert build_match_query('  ,.  ') is None
+    assert build_match_query('O"Reilly') == '"O"* AND "Reilly"*', "quotes never reach the FTS syntax"
+    print("PASS: free text becomes a quoted prefix query")
+
+
+def test_upsert_refresh_and_fts():
+    print("=== Corpus: upsert and full-text search ===")
+    corpus = TrademarkCorpus(os.path.join(tempfile.mkdtemp(), 'corpus.db'))
+    assert corpus.upsert_results([
+        row('1001', 'TATA STEEL', 'TATA SONS'),
+        row('1002', 'TATA TEA', 'TATA CONSUMER', '30'),
+        row('1003', 'TATA TEA', 'TATA CONSUMER', '32'),
+        row('1004', 'STEELCO', 'ACME LTD', '6'),
+        {'Wordmark': 'NO NUMBER'},
+    ], refreshed_at='2024-01-01 00:00:00') == 4
+    assert corpus.count() == 4
+
+    # Prefix matching, field restriction and class filtering
+    assert numbers(corpus.search('tat')) == ['1001', '1002', '1003']
+    assert numbers(corpus.search('steel')) == ['1001', '1004']
+    assert numbers(corpus.search('tata', field='proprietor')) == ['1001', '1002', '1003']
+    assert numbers(corpus.search('sons', field='wordmark')) == []
+    assert numbers(corpus.search('tata tea', trademark_class='32')) == ['1003']
+    assert numbers(corpus.search('téa')) == ['1002', '1003'], "diacritics are folded"
+    try:
+        corpus.search('tata', field='status')
+        raise AssertionError("unknown fields are rejected")
+    except ValueError:
+        pass
+
+    # A refresh updates the row in place and the trigger re-indexes it
+    corpus.upsert_results([row('1001', 'NEW HORIZON', 'HORIZON LTD', status='Opposed')],
+                          refreshed_at='2024-02-01 00:00:00')
+    assert corpus.count() == 4
+    assert numbers(corpus.search('steel')) == ['1004'], "the old wordmark is gone from the index"
+    refreshed = corpus.search('horizon')
+    assert numbers(refreshed) == ['1001']
+    assert refreshed[0]['Status'] == 'Opposed'
+    assert (refreshed[0]['First_Seen'], refreshed[0]['Last_Refreshed']) == ('2024-01-01 00:00:00', '2024-02-01 00:00:00')
+    assert corpus.get_records(['1001', '9999']) == {'1001': {
+        'Application_Number': '1001', 'Wordmark': 'NEW HORIZON', 'Proprietor': 'HORIZON LTD', 'Class': '30',
+        'Status': 'Opposed', 'Last_Refreshed': '2024-02-01 00:00:00'}}
+    print("PASS: rows refreshed in place, FTS follows the update")
+
+
+if __name__ == "__main__":
+    test_build_match_query()
+    test_upsert_refresh_and_fts()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Registry crawler tests with the stub scraper and a temporary database
+CAPTCHAs are answered from the crawler's queue by the test, as crawl_registry.py's terminal prompt
+would; covers resuming an interrupted crawl, splitting capped prefixes, wrong CAPTCHA answers and
+stopping with CAPTCHAs still queued.
+"""
+
+import os
+import time
+import queue
+import tempfile
+import threading
+
+import utils.stub_scraper as stub_scraper
+from utils.corpus import TrademarkCorpus
+from utils.crawler import CrawlState, RegistryCrawler
+from utils.registry import CaptchaError, TokenBucket
+from utils.stub_scraper import StubScraper
+
+SAVED = []     # stub settings replaced for the duration of the module
+
+
+class CappedStub(StubScraper):
+    """Reports "Load More..." still offered for one-character prefixes"""
+
+    def extract_results(self, progress_callback=None, keep_alive=False):
+        results = super().extract_results(progress_callback, keep_alive)
+        self.more_available = len(self.search[0]) < 2
+        return results
+
+
+class PickyStub(StubScraper):
+    """Only accepts the CAPTCHA answer RIGHT"""
+
+    def submit_search(self, captcha_text):
+        if captcha_text != 'RIGHT':
+            raise CaptchaError("Invalid CAPTCHA - please try again")
+        return super().submit_search(captcha_text)
+
+
+def new_crawler(scraper_factory=StubScraper, **kwargs):
+    db_path = os.path.join(tempfile.mkdtemp(), 'corpus.db')
+    return RegistryCrawler(CrawlState(db_path), TrademarkCorpus(db_path), scraper_factory, **kwargs)
+
+
+def answer_captchas(crawler, answers=None, timeout=30):
+    """Answer queued CAPTCHAs until the crawl ends (STUB01 unless answers lists others); returns the labels asked"""
+    answers = answers or {}
+    labels = []
+    watchdog = threading.Timer(timeout, crawler.stop)
+    watchdog.start()
+    while crawler.running() or not crawler.captchas.empty():
+        try:
+            request = crawler.captchas.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        labels.append(request.label)
+        request.answer(answers[request.label].pop(0) if request.label in answers else 'STUB01')
+    watchdog.cancel()
+    for thread in crawler.threads:
+        thread.join()
+    return labels
+
+
+def setup_module(module=None):
+    SAVED[:] = [stub_scraper.STUB_LATENCY, stub_scraper.registry_limiter]
+    stub_scraper.STUB_LATENCY = 0
+    # A private, generous budget instead of the registry's shared state file
+    stub_scraper.registry_limiter = TokenBucket(rate=1000, burst=1000,
+                                                path=os.path.join(tempfile.mkdtemp(), 'rate'))
+
+
+def teardown_module(module=None):
+    stub_scraper.STUB_LATENCY, stub_scraper.registry_limiter = SAVED
+
+
+def test_resume_after_interrupt():
+    print("=== Crawler: resume ===")
+    crawler = new_crawler()
+    crawler.state.seed(['A', 'B'], ['30'])
+    # An earlier crawl died while searching 'A'
+    assert crawler.state.claim() == ('A', '30')
+    assert crawler.state.progress()['running'] == 1
+
+    crawler.start()
+    assert answer_captchas(crawler) == ["'A' class 30", "'B' class 30"]
+    progress = crawler.state.progress()
+    assert (progress['done'], progress['running'], progress['pending']) == (2, 0, 0), progress
+    assert progress['rows_seen'] == 2 * stub_scraper.STUB_RESULTS
+    assert crawler.corpus.count() == crawler.snapshot()['rows'] == 2 * stub_scraper.STUB_RESULTS
+    print("PASS: the interrupted prefix was searched again and the crawl finished")
+
+
+def test_split_capped_prefixes():
+    print("=== Crawler: split on result cap and Load More ===")
+    crawler = new_crawler(result_cap=stub_scraper.STUB_RESULTS, alphabet='AB', max_prefix_length=2)
+    crawler.state.seed(['A'], ['30'])
+    crawler.start()
+    labels = answer_captchas(crawler)
+    assert labels == ["'A' class 30", "'AA' class 30", "'AB' class 30"], labels
+    progress = crawler.state.progress()
+    assert (progress['split'], progress['done']) == (1, 2), "capped at max_prefix_length, not split again"
+    assert crawler.snapshot()['splits'] == 1
+
+    crawler = new_crawler(CappedStub, alphabet='XY')
+    crawler.state.seed(['K'], [''])
+    crawler.start()
+    assert answer_captchas(crawler) == ["'K' class all", "'KX' class all", "'KY' class all"]
+    assert crawler.state.progress()['split'] == 1
+    print("PASS: capped prefixes split into longer ones")
+
+
+def test_captcha_queue():
+    print("=== Crawler: CAPTCHA answers and stop ===")
+    crawler = new_crawler(PickyStub)
+    crawler.state.seed(['A', 'B'], ['9'])
+    crawler.start()
+    labels = answer_captchas(crawler, {"'A' class 9": ['WRONG', 'RIGHT'], "'B' class 9": ['RIGHT']})
+    assert labels == ["'A' class 9", "'A' class 9", "'B' class 9"], labels
+    assert crawler.snapshot()['wrong_captchas'] == 1 and crawler.state.progress()['done'] == 2
+
+    # Three wrong answers fail the attempt; the prefix goes back to pending until MAX_ATTEMPTS
+    crawler = new_crawler(PickyStub)
+    crawler.state.seed(['C'], ['9'])
+    crawler.start()
+    for _ in range(3):
+        crawler.captchas.get(timeout=5).answer('WRONG')
+    # Stopping with a CAPTCHA still queued hands the prefix back instead of failing it
+    deadline = time.time() + 5
+    while crawler.captchas.empty() and time.time() < deadline:
+        time.sleep(0.01)
+    assert crawler.captchas.qsize() == 1
+    crawler.stop()
+    assert crawler.captchas.empty()
+    for thread in crawler.threads:
+        thread.join(5)
+    assert not crawler.running()
+    progress = crawler.state.progress()
+    assert (progress['pending'], progress['failed']) == (1, 0), progress
+    assert crawler.snapshot()['failures'] == 1
+    print("PASS: wrong answers retried, queued CAPTCHAs released on stop")
+
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        test_resume_after_interrupt()
+        test_split_capped_prefixes()
+        test_captcha_queue()
+    finally:
+        teardown_module()
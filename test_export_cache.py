@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Excel export cache tests against temporary cache directories
+Workbooks are built in the cache's process pool; the tests check reuse by results version, the
+202-then-poll flow through the web app, and pruning of expired jobs and files.
+"""
+
+import os
+import time
+import tempfile
+from io import BytesIO
+
+# The web app must not touch the real corpus or the shared temp dirs - set before `import app`
+TEST_DIR = tempfile.mkdtemp()
+os.environ['CORPUS_DB_PATH'] = os.path.join(TEST_DIR, 'corpus.db')
+for name in ('EXPORT_CACHE_DIR', 'RESULT_STORE_DIR', 'IMAGE_CACHE_DIR'):
+    os.environ[name] = os.path.join(TEST_DIR, name.lower())
+
+from openpyxl import load_workbook
+from PIL import Image
+
+from utils.export_cache import ExportCache, results_version
+
+
+def logo(color):
+    buffer = BytesIO()
+    Image.new('RGB', (16, 16), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def results(proprietor='ACME LTD'):
+    return [
+        {'Application_Number': '1001', 'Wordmark': 'ACME', 'Proprietor': proprietor, 'Class': '30',
+         'Status': 'Registered', 'Search_Wordmark': 'ACME', 'Image_Data': logo('red')},
+        {'Application_Number': '1002', 'Wordmark': 'ACME TEA', 'Proprietor': proprietor, 'Class': '30',
+         'Status': 'Objected', 'Search_Wordmark': 'ACME', 'Image_Data': None},
+    ]
+
+
+def wait_ready(cache, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = cache.get_job(job_id)
+        if job['status'] in ('ready', 'error'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"export job {job_id} did not finish")
+
+
+def test_version_cache_hit():
+    print("=== Export cache: reuse by results version ===")
+    cache = ExportCache(tempfile.mkdtemp())
+    first = cache.submit(results())
+    assert cache.submit(results()) == first, "an identical result set joins the running job"
+    job = wait_ready(cache, first)
+    assert job['status'] == 'ready', job
+    assert job['path'] == cache.get_cached_path(results_version(results()))
+    assert load_workbook(job['path']).active.max_row >= 3, "header plus two rows"
+
+    built = os.path.getmtime(job['path'])
+    assert cache.submit(results()) == first, "a finished workbook is served again, not rebuilt"
+    assert os.path.getmtime(job['path']) >= built
+
+    changed = cache.submit(results(proprietor='ACME HOLDINGS'))
+    assert changed != first and wait_ready(cache, changed)['path'] != job['path']
+
+    # A workbook removed from disk is built again under a new job
+    os.remove(job['path'])
+    rebuilt = cache.submit(results())
+    assert rebuilt != first and wait_ready(cache, rebuilt)['status'] == 'ready'
+    assert os.path.exists(job['path'])
+    print("PASS: same version reused, changed results and missing files rebuilt")
+
+
+def test_export_polling_flow():
+    print("=== Export cache: 202 and polling through the web app ===")
+    import app as web
+    saved = web.export_cache
+    web.export_cache = ExportCache(tempfile.mkdtemp())
+    try:
+        client = web.app.test_client()
+        with client.session_transaction() as flask_session:
+            flask_session['user_id'] = 'export-test'
+        client.get('/get_status')
+        with web.session_lock:
+            web.user_sessions['export-test']['search_results'] = results()
+
+        pending = client.get('/export_excel')
+        assert pending.status_code == 202, pending.status_code
+        job_id = pending.get_json()['job_id']
+        assert client.get('/export_excel').get_json()['job_id'] == job_id, "a second click does not queue again"
+
+        deadline = time.time() + 60
+        while client.get(f'/export_status/{job_id}').get_json()['status'] != 'ready':
+            assert time.time() < deadline, "export did not finish"
+            time.sleep(0.05)
+
+        download = client.get('/export_excel')
+        assert download.status_code == 200
+        assert download.headers['Content-Disposition'].startswith('attachment')
+        assert load_workbook(BytesIO(download.data)).active['A1'].value
+        assert client.get('/export_status/unknown').status_code == 404
+    finally:
+        web.export_cache = saved
+    print("PASS: 202 with a job id, polled to ready, then the workbook is served")
+
+
+def test_prune():
+    print("=== Export cache: prune ===")
+    cache = ExportCache(tempfile.mkdtemp(), ttl=60)
+    old, fresh = cache.submit(results()), cache.submit(results(proprietor='NEW'))
+    old_path, fresh_path = wait_ready(cache, old)['path'], wait_ready(cache, fresh)['path']
+
+    past = time.time() - 120
+    cache.jobs[old]['created'] = past
+    os.utime(old_path, (past, past))
+    cache.prune()
+
+    assert cache.get_job(old) is None and not os.path.exists(old_path)
+    assert cache.get_job(fresh)['status'] == 'ready' and os.path.exists(fresh_path)
+    assert cache.submit(results()) != old, "a pruned version is built again"
+    print("PASS: expired jobs and workbooks dropped, fresh ones kept")
+
+
+if __name__ == "__main__":
+    test_version_cache_hit()
+    test_export_polling_flow()
+    test_prune()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+WebDriver grid client test against locally started nodes
+Each fake node speaks just enough of the WebDriver protocol (/status, new session, delete session)
+for the grid client to lease and release browsers, so least-loaded selection, health checks and
+failover can be checked without Chrome. Point WEBDRIVER_GRID_URLS at real nodes
+(e.g. `chromedriver --port=9515`) to exercise the full scraper instead.
+"""
+
+import json
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.browser_grid import BrowserGrid
+
+
+class FakeNode(ThreadingHTTPServer):
+    def __init__(self, ready=True, fail_sessions=False):
+        super().__init__(('127.0.0.1', 0), FakeNodeHandler)
+        self.ready = ready
+        self.fail_sessions = fail_sessions
+        self.sessions = set()
+        self.url = f'http://127.0.0.1:{self.server_address[1]}'
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class FakeNodeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, value):
+        body = json.dumps({'value': value}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._reply(200, {'ready': self.server.ready, 'message': 'fake node'})
+        else:
+            self._reply(404, {'error': 'unknown command', 'message': self.path})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path != '/session':
+            self._reply(404, {'error': 'unknown command', 'message': self.path})
+        elif self.server.fail_sessions:
+            self._reply(500, {'error': 'session not created', 'message': 'Chrome failed to start'})
+        else:
+            session_id = uuid.uuid4().hex
+            self.server.sessions.add(session_id)
+            self._reply(200, {'sessionId': session_id, 'capabilities': {'browserName': 'chrome'}})
+
+    def do_DELETE(self):
+        self.server.sessions.discard(self.path.rsplit('/', 1)[-1])
+        self._reply(200, None)
+
+
+def test_least_loaded_selection():
+    print("=== Grid: least-loaded selection ===")
+    nodes = [FakeNode(), FakeNode()]
+    grid = BrowserGrid([node.url for node in nodes], capacity=2)
+    drivers = [grid.lease() for _ in range(4)]
+    assert [len(node.sessions) for node in nodes] == [2, 2], "sessions should be spread evenly"
+
+    drivers.pop(0).quit()
+    assert sum(len(node.sessions) for node in nodes) == 3
+    # The freed slot is the only one left, so the next lease must land on that node
+    drivers.append(grid.lease())
+    assert [len(node.sessions) for node in nodes] == [2, 2]
+    for driver in drivers:
+        driver.quit()
+    assert all(endpoint['leased'] == 0 for endpoint in grid.snapshot()['endpoints'])
+    print("PASS: browsers spread across nodes and slots returned on quit")
+
+
+def test_failover_and_health():
+    print("=== Grid: failover and health checks ===")
+    broken, unready, good = FakeNode(fail_sessions=True), FakeNode(ready=False), FakeNode()
+    grid = BrowserGrid([broken.url, unready.url, good.url], capacity=4, health_interval=0)
+
+    driver = grid.lease()
+    assert driver.endpoint.url == good.url
+    endpoints = {endpoint['url']: endpoint for endpoint in grid.snapshot()['endpoints']}
+    assert not endpoints[unready.url]['healthy'], "a node that is not ready must not get sessions"
+    assert endpoints[broken.url]['failures'] == 1, "a node that cannot start sessions is failed over"
+    driver.quit()
+
+    # Once every node is down the lease fails instead of hanging
+    good.ready = False
+    try:
+        grid.lease()
+        raise AssertionError("lease should fail with no healthy node")
+    except Exception as e:
+        assert 'grid endpoint' in str(e), e
+
+    # A node that recovers is used again at its next health check
+    unready.ready = True
+    driver = grid.lease()
+    assert driver.endpoint.url == unready.url
+    driver.quit()
+    print("PASS: unhealthy and failing nodes skipped, recovered nodes reused")
+
+
+if __name__ == "__main__":
+    test_least_loaded_selection()
+    test_failover_and_health()
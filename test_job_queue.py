@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Durable job queue tests against a temporary database and the stub scraper
+Covers claiming, recovery after a scraper worker dies (requeued start jobs, lost browsers), the
+attempt limit, pruning, and one search run end to end by a ScraperWorker without a browser.
+"""
+
+import os
+import time
+import tempfile
+
+import scraper_worker
+import utils.stub_scraper as stub_scraper
+from utils.corpus import TrademarkCorpus
+from utils.watchlist import WatchStore
+from utils.job_queue import JobQueue, JOB_MAX_ATTEMPTS
+from utils.search_runner import SearchRunner
+
+PARAMS = {'wordmark': 'ACME', 'class': '30', 'filter': 'Contains', 'watch_id': None}
+
+
+def new_queue():
+    return JobQueue(os.path.join(tempfile.mkdtemp(), 'queue.db'))
+
+
+def run(worker, job):
+    """Run a claimed job the way ScraperWorker.run() does"""
+    with worker.lock:
+        worker.running += 1
+    worker.run_job(job)
+
+
+def kill_worker(queue, worker_id):
+    """Age a worker's heartbeat as if its process had died"""
+    conn = queue._connect()
+    with conn:
+        conn.execute("UPDATE workers SET heartbeat = ? WHERE id = ?", (time.time() - 3600, worker_id))
+
+
+def test_claim_and_recover():
+    print("=== Job queue: claim and recovery from a dead worker ===")
+    queue = new_queue()
+    queue.heartbeat('w1', 2, 0)
+    queue.heartbeat('w2', 2, 0)
+    held = queue.create_search('session-a', PARAMS)
+    starting = queue.create_search('session-b', PARAMS)
+
+    job = queue.claim('w1')
+    assert (job['kind'], job['search_id']) == ('start', held)
+    assert queue.get_search(held)['status'] == 'initializing'
+    queue.update_search(held, status='captcha_ready', captcha=b'png', captcha_version='v1')
+    queue.finish_job(job['id'])
+
+    # The CAPTCHA answer goes to the worker holding the browser, even one without room for new searches
+    assert queue.submit_captcha(held, 'ABC123')
+    assert not queue.submit_captcha(held, 'ABC123'), "a search is only submitted once"
+    assert queue.claim('w2', accept_new=False) is None
+    assert queue.claim('w2')['search_id'] == starting
+
+    # w2 dies while starting a browser: the start job runs again elsewhere
+    kill_worker(queue, 'w2')
+    assert queue.recover() == 1
+    assert queue.get_search(starting)['status'] == 'queued'
+    retried = queue.claim('w3')
+    assert retried['search_id'] == starting and retried['attempts'] == 2
+
+    # w1 dies holding a browser: its submit job needs that browser, so the search is lost
+    kill_worker(queue, 'w1')
+    queue.heartbeat('w3', 2, 1)
+    assert queue.recover() == 1
+    lost = queue.get_search(held)
+    assert (lost['status'], lost['error_type']) == ('error', 'worker_lost')
+    assert queue.claim('w3') is None, "the dead worker's submit job is not handed to anyone else"
+    assert queue.snapshot()['workers'] == 1
+    print("PASS: start jobs requeued, held searches failed as worker_lost")
+
+
+def test_attempt_limit_and_prune():
+    print("=== Job queue: attempt limit and prune ===")
+    queue = new_queue()
+    search_id = queue.create_search('session-a', PARAMS)
+    for attempt in range(JOB_MAX_ATTEMPTS):
+        worker_id = f'crashing-{attempt}'
+        queue.heartbeat(worker_id, 1, 0)
+        assert queue.claim(worker_id)['attempts'] == attempt + 1
+        kill_worker(queue, worker_id)
+        queue.recover()
+    assert queue.get_search(search_id)['status'] == 'error', "a search that keeps killing workers is given up"
+    assert queue.claim('healthy') is None
+
+    # A new search cancels the session's previous one; prune only drops searches past the age
+    queue.update_search(search_id, results_path='/tmp/results.db')
+    replacement = queue.create_search('session-a', PARAMS)
+    assert queue.update_search(replacement, status='captcha_ready')
+    queue.cancel_session('session-a')
+    assert not queue.update_search(replacement, status='complete'), "a cancelled search stays cancelled"
+    assert queue.prune(3600) == []
+    assert queue.prune(-1) == ['/tmp/results.db']
+    assert queue.get_search(search_id) is None and queue.latest_search('session-a') is None
+    print("PASS: attempts bounded, cancelled searches stay cancelled, old searches pruned")
+
+
+def test_worker_runs_search_with_stub():
+    print("=== Job queue: stub search through a scraper worker ===")
+    directory = tempfile.mkdtemp()
+    saved = os.environ.get('SCRAPER_BACKEND'), stub_scraper.STUB_LATENCY, scraper_worker.QUEUE_RESULTS_DIR
+    os.environ['SCRAPER_BACKEND'] = 'stub'
+    stub_scraper.STUB_LATENCY = 0
+    scraper_worker.QUEUE_RESULTS_DIR = os.path.join(directory, 'results')
+    try:
+        queue = new_queue()
+        db_path = os.path.join(directory, 'corpus.db')
+        runner = SearchRunner(TrademarkCorpus(db_path), WatchStore(db_path))
+        worker = scraper_worker.ScraperWorker(queue, 1, 'stub-worker', runner=runner)
+        queue.heartbeat(worker.worker_id, 1, 0)
+
+        search_id = queue.create_search('session-a', PARAMS)
+        run(worker, queue.claim(worker.worker_id))
+        assert queue.get_search(search_id)['status'] == 'captcha_ready'
+        assert worker.active() == 1, "the browser is held until the CAPTCHA answer arrives"
+
+        assert queue.submit_captcha(search_id, 'STUB01')
+        run(worker, queue.claim(worker.worker_id, accept_new=False))
+        search = queue.get_search(search_id)
+        assert search['status'] == 'complete' and search['results_count'] > 0, search
+        assert os.path.exists(search['results_path'])
+        assert worker.active() == 0 and worker.scrapers == {}
+    finally:
+        if saved[0] is None:
+            os.environ.pop('SCRAPER_BACKEND', None)
+        else:
+            os.environ['SCRAPER_BACKEND'] = saved[0]
+        stub_scraper.STUB_LATENCY, scraper_worker.QUEUE_RESULTS_DIR = saved[1], saved[2]
+    print("PASS: worker published the CAPTCHA, then the results file")
+
+
+if __name__ == "__main__":
+    test_claim_and_recover()
+    test_attempt_limit_and_prune()
+    test_worker_runs_search_with_stub()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Logo perceptual-hash tests against a temporary corpus
+A re-encoded, resized and brightened copy of a logo must be found within the default radius and a
+different logo must not; the BK-tree is checked against a full scan, and the process-pool batch
+path must hash exactly as the inline one.
+"""
+
+import os
+import random
+import tempfile
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageEnhance
+
+import utils.logo_hash as logo_hash
+from utils.corpus import TrademarkCorpus
+from utils.logo_hash import BKTree, LogoIndex, compute_hashes, hamming, DEFAULT_RADIUS
+
+
+def draw_logo(shape):
+    image = Image.new('RGB', (128, 128), 'white')
+    draw = ImageDraw.Draw(image)
+    if shape == 'circle':
+        draw.ellipse((20, 20, 108, 108), fill='navy')
+        draw.rectangle((55, 10, 73, 118), fill='gold')
+    elif shape == 'triangle':
+        draw.polygon([(64, 8), (120, 120), (8, 120)], fill='darkred')
+        draw.rectangle((0, 0, 40, 40), fill='black')
+    else:
+        draw.rectangle((10, 50, 118, 78), fill='green')
+    return image
+
+
+def encode(image, image_format='PNG', **options):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def modified(image):
+    """The same logo resized, brightened and saved as a lossy JPEG"""
+    return encode(ImageEnhance.Brightness(image.resize((100, 100))).enhance(1.1), 'JPEG', quality=70)
+
+
+def row(app_num, image_data):
+    return {'Application_Number': app_num, 'Wordmark': 'LOGO', 'Class': '30', 'Image_Data': image_data}
+
+
+def new_index(**kwargs):
+    return LogoIndex(TrademarkCorpus(os.path.join(tempfile.mkdtemp(), 'corpus.db')), **kwargs)
+
+
+def test_bktree_matches_full_scan():
+    print("=== Logo hash: BK-tree search ===")
+    rng = random.Random(3)
+    base = rng.getrandbits(64)
+    values = [base ^ rng.getrandbits(64) if i % 2 else base ^ (1 << rng.randrange(64)) for i in range(400)]
+    tree = BKTree()
+    for item_id, value in enumerate(values):
+        tree.add(value, item_id)
+    for radius in (0, 1, 8, 20):
+        expected = sorted((hamming(base, value), item_id) for item_id, value in enumerate(values)
+                          if hamming(base, value) <= radius)
+        assert sorted(tree.search(base, radius)) == expected, radius
+    print("PASS: BK-tree returns exactly the entries within the radius")
+
+
+def test_near_duplicate_found():
+    print("=== Logo hash: near duplicates ===")
+    original, other = draw_logo('circle'), draw_logo('triangle')
+    hashes, copy_hashes = compute_hashes(encode(original)), compute_hashes(modified(original))
+    assert hamming(hashes[2], copy_hashes[2]) <= DEFAULT_RADIUS
+    assert hamming(hashes[1], copy_hashes[1]) <= DEFAULT_RADIUS
+
+    index = new_index(max_workers=1)
+    index.add_results([row('1001', encode(original)), row('1002', modified(original)),
+                       row('1003', encode(other)), row('1004', encode(original))])
+    matches = {match['Application_Number']: match for match in index.find_similar('1001')}
+    assert set(matches) == {'1002', '1004'}, matches
+    assert matches['1004']['phash_distance'] == 0, "an identical image is hashed once and shared"
+    assert matches['1002']['phash_distance'] > 0
+    assert index.find_similar('1003') == []
+    assert index.find_similar('9999') is None
+
+    # A fresh index over the same corpus loads the stored hashes instead of hashing again
+    reloaded = LogoIndex(index.corpus, max_workers=1)
+    assert {match['Application_Number'] for match in reloaded.find_similar('1001')} == {'1002', '1004'}
+    print("PASS: modified copy found within the radius, different logo not")
+
+
+def test_batch_hashing_in_process_pool():
+    print("=== Logo hash: process-pool batch ===")
+    images = [encode(draw_logo(shape)) for shape in ('circle', 'triangle', 'bar')] + [modified(draw_logo('bar'))]
+    saved = logo_hash.PARALLEL_THRESHOLD
+    logo_hash.PARALLEL_THRESHOLD = 2
+    try:
+        index = new_index(max_workers=2)
+        assert index._hash_batch(images) == [compute_hashes(image_data) for image_data in images]
+        assert index.pool is not None, "the batch went through the pool"
+        assert index._hash_batch([b'not an image', images[0]]) == [None, compute_hashes(images[0])]
+        index.pool.shutdown()
+    finally:
+        logo_hash.PARALLEL_THRESHOLD = saved
+    print("PASS: pool hashes match inline hashes, bad images are skipped")
+
+
+if __name__ == "__main__":
+    test_bktree_matches_full_scan()
+    test_near_duplicate_found()
+    test_batch_hashing_in_process_pool()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Registry rate limiter test against a temporary state file
+The token bucket is driven with explicit timestamps, so refill, queueing and rejection are checked
+without sleeping; two buckets on one file stand in for two gunicorn workers.
+"""
+
+import os
+import time
+import tempfile
+
+from utils.registry import TokenBucket, RateLimitedError
+
+
+def new_bucket(path, **kwargs):
+    return TokenBucket(**dict({'rate': 2.0, 'burst': 3, 'path': path, 'max_wait': 5}, **kwargs))
+
+
+def test_refill_and_wait():
+    print("=== Rate limit: refill and wait ===")
+    path = os.path.join(tempfile.mkdtemp(), 'rate')
+    bucket = new_bucket(path)
+    now = 1000.0
+
+    # The burst is free, then callers queue half a second apart (2/s) in arrival order
+    assert [bucket._reserve(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket._reserve(now) == 0.5
+    assert bucket._reserve(now) == 1.0
+
+    # Two seconds refill four tokens: the two owed ones plus a burst of two
+    later = now + 2
+    assert bucket._reserve(later) == 0.0
+    assert bucket._reserve(later) == 0.0
+    assert bucket._reserve(later) == 0.5
+
+    # Refill is capped at the burst, however long the bucket was idle
+    idle = later + 3600
+    assert [bucket._reserve(idle) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket._reserve(idle) == 0.5
+    print("PASS: burst, queueing and capped refill")
+
+
+def test_shared_budget_and_rejection():
+    print("=== Rate limit: shared budget and rejection ===")
+    path = os.path.join(tempfile.mkdtemp(), 'rate')
+    worker_a, worker_b = new_bucket(path, max_wait=1), new_bucket(path, max_wait=1)
+    if worker_a.shared:
+        now = 1000.0
+        assert worker_a._reserve(now) == 0.0 and worker_a._reserve(now) == 0.0
+        assert worker_b._reserve(now) == 0.0, "the second worker sees the first one's tokens"
+        assert worker_b._reserve(now) == 0.5
+        assert worker_a._reserve(now) == 1.0
+        assert worker_b._reserve(now) is None, "a wait over max_wait is refused, not queued"
+
+    # acquire() sleeps for its slot and rejects once the queue is longer than max_wait
+    bucket = new_bucket(os.path.join(tempfile.mkdtemp(), 'rate'), rate=20.0, burst=1, max_wait=0.2)
+    start = time.time()
+    assert bucket.acquire() == 0.0
+    waited = bucket.acquire('search')
+    assert 0 < waited <= 0.06 and time.time() - start >= waited
+    # Callers that queued ahead (other threads) push the next slot past max_wait
+    while bucket._reserve(time.time()) is not None:
+        pass
+    try:
+        bucket.acquire()
+        raise AssertionError("acquire should reject once the wait exceeds max_wait")
+    except RateLimitedError:
+        pass
+    stats = bucket.snapshot()
+    assert stats['rejected'] == 1 and stats['by_kind']['search'] == 1 and stats['delayed'] >= 1, stats
+    print("PASS: workers share one budget, long queues are rejected")
+
+
+if __name__ == "__main__":
+    test_refill_and_wait()
+    test_shared_budget_and_rejection()
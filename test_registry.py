@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Registry resilience tests: circuit breaker state transitions and postback classification
+classify_page is run against a fake driver that serves a canned alert, result grid or page text,
+so each outcome can be checked without Chrome.
+"""
+
+from selenium.common.exceptions import NoAlertPresentException
+
+from utils.registry import CircuitBreaker, CircuitOpenError
+from utils.scraper import classify_page
+
+
+class FakeAlert:
+    def __init__(self, text):
+        self.text = text
+        self.accepted = False
+
+    def accept(self):
+        self.accepted = True
+
+
+class FakeSwitchTo:
+    def __init__(self, alert_text):
+        self._alert = FakeAlert(alert_text) if alert_text is not None else None
+
+    @property
+    def alert(self):
+        if self._alert is None:
+            raise NoAlertPresentException()
+        return self._alert
+
+
+class FakeDriver:
+    def __init__(self, body='', title='', alert=None, results_grid=False):
+        self.body = body
+        self.title = title
+        self.results_grid = results_grid
+        self.switch_to = FakeSwitchTo(alert)
+
+    def find_elements(self, by, value):
+        return ['grid'] if self.results_grid and value == 'ContentPlaceHolder1_MGVSearchResult' else []
+
+    def execute_script(self, script):
+        return self.body
+
+
+def rejected(breaker):
+    try:
+        breaker.before_call()
+        return False
+    except CircuitOpenError:
+        return True
+
+
+def test_circuit_breaker_transitions():
+    print("=== Registry: circuit breaker ===")
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == 'closed', "below the threshold the breaker stays closed"
+
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'closed', "a success resets the failure count"
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert rejected(breaker), "an open breaker rejects calls without trying"
+
+    # After the cool-down exactly one probe goes through
+    breaker.opened_at -= 60
+    assert breaker.state == 'half_open'
+    breaker.before_call()
+    assert rejected(breaker), "only one probe at a time while half-open"
+
+    # A failed probe reopens at once; a probe without a verdict lets the next one in
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    breaker.opened_at -= 60
+    breaker.before_call()
+    breaker.release_probe()
+    breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.snapshot() == {'state': 'closed', 'failures': 0}
+    breaker.before_call()
+    print("PASS: closed -> open -> half-open probe -> open/closed")
+
+
+def test_classify_page():
+    print("=== Registry: postback classification ===")
+    cases = [
+        (FakeDriver(alert='Invalid Captcha Code'), 'captcha'),
+        (FakeDriver(alert='No Record Found'), 'no_results'),
+        (FakeDriver(results_grid=True), 'results'),
+        (FakeDriver(body='Please enter the valid security code'), 'captcha'),
+        (FakeDriver(body="Server Error in '/' Application."), 'site_down'),
+        (FakeDriver(title='502 Bad Gateway'), 'site_down'),
+        (FakeDriver(body='No data found for the given criteria'), 'no_results'),
+        (FakeDriver(body='Trade Mark Search'), None),
+    ]
+    for driver, expected in cases:
+        assert classify_page(driver) == expected, (driver.body, driver.title, expected)
+
+    # An alert is dismissed even when the page itself decides the outcome
+    driver = FakeDriver(alert='Session refreshed', results_grid=True)
+    assert classify_page(driver) == 'results' and driver.switch_to.alert.accepted
+    print("PASS: alerts, result grid and page text classified")
+
+
+if __name__ == "__main__":
+    test_circuit_breaker_transitions()
+    test_classify_page()
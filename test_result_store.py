@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Spilled result store tests against temporary directories
+A result list is written to disk and read back page by page, and store directories of dead worker
+processes on this host are pruned while live ones and other hosts' are kept.
+"""
+
+import os
+import sys
+import socket
+import tempfile
+import subprocess
+
+import utils.result_store as result_store
+from utils.result_store import SpilledResults, should_spill, discard_results, prune_dead_stores
+
+
+def make_results(count):
+    return [{'Application_Number': str(1000 + i), 'Wordmark': f'MARK {i}', 'Class': '30',
+             'Similarity_Score': i / 10, 'Image_Data': bytes([i % 256]) * 10 if i % 3 else None}
+            for i in range(count)]
+
+
+def test_spill_and_page_round_trip():
+    print("=== Result store: spill and page ===")
+    results = make_results(1203)   # more than two read batches
+    spilled = SpilledResults.create(results, tempfile.mkdtemp())
+    assert len(spilled) == 1203 and spilled and os.path.exists(spilled.path)
+
+    assert list(spilled) == results
+    assert spilled[0] == results[0] and spilled[-1] == results[-1]
+    assert spilled[500:510] == results[500:510], "a page spans the batch boundary"
+    assert spilled[1200:1300] == results[1200:]
+    try:
+        spilled[1203]
+        raise AssertionError("reading past the end should fail")
+    except IndexError:
+        pass
+
+    without_images = list(spilled.iter_without_images())
+    assert [row for row, _ in without_images] == [{k: v for k, v in r.items() if k != 'Image_Data'} for r in results]
+    assert [has_logo for _, has_logo in without_images] == [bool(r['Image_Data']) for r in results]
+    assert spilled.get_image('1001') == results[1]['Image_Data'] and spilled.get_image('1000') is None
+
+    # Spilled lists are never spilled again; small fresh ones wait for RESULT_SPILL_AGE
+    assert not should_spill(spilled, 0, 10 ** 9)
+    assert not should_spill(results[:2], 100, 101)
+    assert should_spill(results[:2], 100, 100 + result_store.RESULT_SPILL_AGE + 1)
+
+    # Stores published through the job queue belong to it; owned ones go with their session
+    discard_results(SpilledResults(spilled.path, spilled.count, owned=False))
+    assert os.path.exists(spilled.path)
+    discard_results(spilled)
+    assert not os.path.exists(spilled.path)
+    try:
+        list(spilled)
+        raise AssertionError("a deleted store should report expired results")
+    except Exception as e:
+        assert 'expired' in str(e)
+    print("PASS: rows, pages, images and ownership round-trip through the store")
+
+
+def test_prune_dead_stores():
+    print("=== Result store: dead worker directories ===")
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    host = socket.gethostname()
+    names = {
+        'dead': f'{host}-{dead.pid}',
+        'self': f'{host}-{os.getpid()}',
+        'parent': f'{host}-{os.getppid()}',
+        'longer_host': f'{host}-elsewhere-{dead.pid}',    # a host whose name starts with ours
+        'unrelated': 'notes',
+    }
+    directory = tempfile.mkdtemp()
+    for name in names.values():
+        os.makedirs(os.path.join(directory, name))
+
+    saved = result_store.RESULT_STORE_DIR
+    result_store.RESULT_STORE_DIR = directory
+    try:
+        prune_dead_stores()
+    finally:
+        result_store.RESULT_STORE_DIR = saved
+    remaining = set(os.listdir(directory))
+    assert remaining == set(names.values()) - {names['dead']}, remaining
+    print("PASS: only this host's dead worker directories removed")
+
+
+if __name__ == "__main__":
+    test_spill_and_page_round_trip()
+    test_prune_dead_stores()
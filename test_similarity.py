@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Similarity ranking tests on an in-memory index
+A sound-alike query must rank its match above unrelated marks, only the signature shortlist is
+re-ranked by edit distance, and a class filter keeps other classes out of the results.
+"""
+
+import random
+
+import utils.similarity as similarity
+from utils.similarity import SimilarityIndex, phonetic_key, edit_similarity, NGRAM_WEIGHT, PHONETIC_WEIGHT, \
+    EDIT_WEIGHT
+
+
+def build_index():
+    rng = random.Random(7)
+    filler = [(f'filler-{i}', ''.join(rng.choice('ABDEFGLMNOPRSTUVXYZ') for _ in range(6)), '30')
+              for i in range(300)]
+    index = SimilarityIndex()
+    index.add([('quick-30', 'QUICK', '30'), ('quick-32', 'QUICK', '32'), ('acme', 'ACME', '30'),
+               ('zebra', 'ZEBRA', '30'), ('kleen', 'KWIK KLEEN', '30')] + filler)
+    return index
+
+
+def test_sound_alike_ranking():
+    print("=== Similarity: shortlist and edit-distance re-rank ===")
+    assert phonetic_key('KWIK') == phonetic_key('QUICK')
+    index = build_index()
+
+    # Only the shortlist is re-ranked: edit distance runs on max(SHORTLIST_SIZE, limit * 10) marks
+    calls = []
+    saved = similarity.SHORTLIST_SIZE, similarity.edit_similarity
+    similarity.SHORTLIST_SIZE = 5
+    similarity.edit_similarity = lambda a, b: calls.append(b) or saved[1](a, b)
+    try:
+        ranked = index.rank('KWIK', limit=3)
+    finally:
+        similarity.SHORTLIST_SIZE, similarity.edit_similarity = saved
+    assert len(calls) == 30 and len(index) == 305, len(calls)
+
+    assert [match['mark'] for match in ranked[:2]] == ['QUICK', 'QUICK'], ranked
+    assert ranked[0]['phonetic_score'] == 100.0
+    assert all(match['score'] < ranked[0]['score'] for match in ranked[2:])
+    unrelated = {match['id']: match for match in index.rank('KWIK', limit=305)}
+    assert unrelated['acme']['score'] < ranked[0]['score'] and unrelated['zebra']['score'] < ranked[0]['score']
+
+    # The final score folds the exact edit similarity into the signature scores
+    top = ranked[0]
+    expected = (NGRAM_WEIGHT * top['ngram_score'] + PHONETIC_WEIGHT * top['phonetic_score']
+                + EDIT_WEIGHT * edit_similarity('KWIK', 'QUICK') * 100)
+    assert abs(top['score'] - expected) < 0.2 and top['edit_score'] == 40.0, top
+    print("PASS: QUICK ranked first for KWIK, only the shortlist re-ranked")
+
+
+def test_class_filter():
+    print("=== Similarity: class filter ===")
+    index = build_index()
+    assert [match['id'] for match in index.rank('KWIK', limit=5, trademark_class='32')] == ['quick-32']
+    assert {match['id'] for match in index.rank('KWIK', limit=2, trademark_class=' ')} == {'quick-30', 'quick-32'}
+
+    # Re-indexing an id moves it to its new class
+    index.add([('quick-32', 'QUICK', '30')])
+    assert index.rank('KWIK', trademark_class='32') == []
+    assert len(index) == 305
+    print("PASS: class filter applied before ranking")
+
+
+if __name__ == "__main__":
+    test_sound_alike_ranking()
+    test_class_filter()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Single-flight search tests
+The registry itself is checked directly (join, lead, land, leave, overdue flights); the web flow is
+run through the Flask test client with the stub scraper: a follower shares the leader's results, and
+gets an error when the leader is reset or stalls.
+"""
+
+import os
+import time
+import tempfile
+
+# The web app must not touch the real corpus or the shared temp dirs - set before `import app`
+TEST_DIR = tempfile.mkdtemp()
+os.environ['CORPUS_DB_PATH'] = os.path.join(TEST_DIR, 'corpus.db')
+for name in ('EXPORT_CACHE_DIR', 'RESULT_STORE_DIR', 'IMAGE_CACHE_DIR'):
+    os.environ[name] = os.path.join(TEST_DIR, name.lower())
+
+import utils.stub_scraper as stub_scraper
+import utils.result_store as result_store
+from utils.single_flight import SearchFlights, flight_key
+
+SEARCH = {'wordmark': 'Acme  Tea', 'class': '030', 'filter': 'Contains'}
+
+
+def test_flight_registry():
+    print("=== Single flight: join, land and leave ===")
+    assert flight_key(SEARCH) == flight_key({'wordmark': ' acme tea', 'class': '30', 'filter': 'Contains'})
+    assert flight_key(SEARCH) != flight_key(dict(SEARCH, filter='Start With'))
+    assert flight_key(dict(SEARCH, watch_id=3)) is None, "watch runs record their own diff"
+
+    flights = SearchFlights(max_age=60)
+    key = flight_key(SEARCH)
+    assert flights.join(key, 'b') is None, "nothing to join yet"
+    flights.lead(key, 'a')
+    assert flights.join(key, 'a') is None, "a leader does not follow itself"
+    assert flights.join(key, 'b') == 'a' and flights.join(key, 'c') == 'a'
+    flights.leave(key, 'c')
+    assert flights.land(key, 'b', True) == set(), "only the leader lands its flight"
+    assert flights.land(key, 'a', True) == {'b'}
+    assert flights.join(key, 'd') is None, "a landed flight takes no followers"
+
+    # A failed flight hands back its followers without counting a saved scrape
+    flights.lead(key, 'e')
+    flights.join(key, 'f')
+    assert flights.land(key, 'e', False) == {'f'}
+    stats = flights.snapshot()
+    assert (stats['led'], stats['joined'], stats['scrapes_saved'], stats['in_flight']) == (2, 3, 1, 0), stats
+
+    # Past max_age a flight is reported overdue and takes no new followers
+    flights.lead(key, 'g')
+    flights.flights[key]['started'] -= 61
+    assert flights.overdue() == [(key, 'g')]
+    assert flights.join(key, 'h') is None
+    print("PASS: followers join, leave and land with their leader")
+
+
+def wait_for(client, statuses, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get('/get_status').get_json()
+        if status['status'] in statuses:
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"timed out waiting for {statuses}")
+
+
+def test_shared_search_flow():
+    print("=== Single flight: shared search through the web app ===")
+    import app as web
+    saved = web.SCRAPER_BACKEND, web.search_flights, stub_scraper.STUB_LATENCY, result_store.RESULT_STORE_DIR
+    web.SCRAPER_BACKEND = 'stub'
+    web.search_flights = SearchFlights(max_age=60)
+    stub_scraper.STUB_LATENCY = 0
+    # Another test may have imported result_store before the environment above was set
+    result_store.RESULT_STORE_DIR = os.environ['RESULT_STORE_DIR']
+    try:
+        leader, follower = web.app.test_client(), web.app.test_client()
+        assert leader.post('/start_search', json=SEARCH).get_json()['success']
+        wait_for(leader, ('captcha_ready',))
+
+        joined = follower.post('/start_search', json=dict(SEARCH, wordmark='ACME TEA')).get_json()
+        assert joined['shared'], joined
+        status = follower.get('/get_status').get_json()
+        assert status['status'] == 'searching' and status['shared']
+
+        assert leader.post('/submit_search', json={'captcha': 'STUB01'}).get_json()['success']
+        done = wait_for(leader, ('complete',))
+        shared = wait_for(follower, ('complete',))
+        assert shared['results_count'] == done['results_count'] > 0
+        assert shared['browser_launches'] == 0, "the follower never started a browser"
+        assert follower.get('/get_results').get_json()['total_count'] == done['results_count']
+
+        # Resetting the follower must not discard the rows the leader still shows
+        follower.post('/reset_search', json={})
+        assert leader.get('/get_results').get_json()['total_count'] == done['results_count']
+        assert web.search_flights.snapshot()['scrapes_saved'] == 1
+
+        # A reset leader fails its followers instead of leaving them waiting
+        leader.post('/reset_search', json={})
+        leader.post('/start_search', json=SEARCH)
+        wait_for(leader, ('captcha_ready',))
+        assert follower.post('/start_search', json=SEARCH).get_json()['shared']
+        leader.post('/reset_search', json={})
+        cancelled = follower.get('/get_status').get_json()
+        assert cancelled['status'] == 'error' and 'cancelled' in cancelled['error'], cancelled
+
+        # So does a leader that never answers its CAPTCHA within SINGLE_FLIGHT_MAX_AGE
+        leader.post('/start_search', json=SEARCH)
+        wait_for(leader, ('captcha_ready',))
+        assert follower.post('/start_search', json=SEARCH).get_json()['shared']
+        for flight in web.search_flights.flights.values():
+            flight['started'] -= 61
+        stalled = follower.get('/get_status').get_json()
+        assert stalled['status'] == 'error' and 'in time' in stalled['error'], stalled
+        assert web.search_flights.snapshot()['in_flight'] == 0
+        leader.post('/reset_search', json={})
+    finally:
+        web.SCRAPER_BACKEND, web.search_flights, stub_scraper.STUB_LATENCY, result_store.RESULT_STORE_DIR = saved
+    print("PASS: follower shared the leader's results and was failed on reset and stall")
+
+
+if __name__ == "__main__":
+    test_flight_registry()
+    test_shared_search_flow()
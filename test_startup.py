@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget for the web app
+Fails if `import app` in a fresh interpreter takes longer or uses more memory than the budget,
+or if it pulls in Selenium/openpyxl/NumPy, which should only load on first use
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 1.0))
+STARTUP_BUDGET_MB = float(os.environ.get('STARTUP_BUDGET_MB', 64))
+LAZY_MODULES = ('selenium', 'openpyxl', 'numpy', 'PIL', 'pyarrow')
+
+MEASURE = """
+import sys, time, json, resource
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+try:
+    # ru_maxrss survives exec, so it would report the (larger) test runner that spawned us
+    with open('/proc/self/status') as f:
+        max_rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+except OSError:
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'seconds': elapsed,
+    'max_rss_mb': max_rss_kb / 1024,
+    'loaded': [name for name in %r if name in sys.modules]
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_import():
+    """Import the app in a fresh interpreter (with a throwaway corpus) and return its measurements"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ, CORPUS_DB_PATH=os.path.join(tmp_dir, 'corpus.db'), PRELOAD_HEAVY_MODULES='false')
+        result = subprocess.run([sys.executable, '-c', MEASURE], cwd=ROOT, env=env,
+                                capture_output=True, text=True)
+    assert result.returncode == 0, f"import app failed:\n{result.stderr[-2000:]}"
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_startup_budget():
+    print("=== Startup Budget Test ===")
+    # Best of three runs, so a busy machine does not fail the budget on one slow sample
+    runs = [measure_import() for _ in range(3)]
+    seconds = min(run['seconds'] for run in runs)
+    max_rss_mb = min(run['max_rss_mb'] for run in runs)
+    loaded = runs[0]['loaded']
+
+    print(f"import app: {seconds:.3f}s (budget {STARTUP_BUDGET_SECONDS}s), "
+          f"max RSS {max_rss_mb:.1f} MB (budget {STARTUP_BUDGET_MB} MB)")
+    print(f"Heavy modules loaded at import: {', '.join(loaded) if loaded else 'none'}")
+
+    assert not loaded, f"Heavy modules imported eagerly: {', '.join(loaded)}"
+    assert seconds <= STARTUP_BUDGET_SECONDS, f"import app took {seconds:.3f}s"
+    assert max_rss_mb <= STARTUP_BUDGET_MB, f"import app used {max_rss_mb:.1f} MB"
+    print("PASS: app imports within budget")
+
+
+if __name__ == "__main__":
+    try:
+        test_startup_budget()
+    except AssertionError as e:
+        print(f"FAIL: {e}")
+        sys.exit(1)
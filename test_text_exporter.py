@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Text export round-trip tests
+Rows are exported as CSV, JSONL and Parquet and read back with the matching reader; values with
+commas, quotes, newlines and non-ASCII text must survive, and images must never be exported.
+"""
+
+import csv
+import json
+from io import BytesIO, StringIO
+
+from utils.text_exporter import TEXT_COLUMNS, PARQUET_AVAILABLE, iter_csv, iter_jsonl, generate_parquet
+
+RESULTS = [
+    {'Application_Number': '1001', 'Wordmark': 'ACME', 'Proprietor': 'ACME, LTD "Tea"',
+     'Class': '30', 'Status': 'Registered', 'Image_Data': b'logo'},
+    {'Application_Number': '1002', 'Wordmark': 'ÇAY\nHOUSE', 'Proprietor': 'चाय कंपनी',
+     'Class': '30', 'Status': 'Objected'},
+    {'Application_Number': '1003', 'Wordmark': 'BLANK', 'Proprietor': None, 'Class': '32'},
+]
+
+EXPECTED = [{column: str(result.get(column) or '') for column in TEXT_COLUMNS} for result in RESULTS]
+
+
+def test_csv_round_trip():
+    print("=== Text export: CSV ===")
+    text = b''.join(iter_csv(RESULTS)).decode('utf-8')
+    rows = list(csv.DictReader(StringIO(text)))
+    assert list(rows[0].keys()) == TEXT_COLUMNS
+    assert rows == EXPECTED, rows
+    print("PASS: CSV rows read back unchanged")
+
+
+def test_jsonl_round_trip():
+    print("=== Text export: JSONL ===")
+    lines = b''.join(iter_jsonl(RESULTS)).decode('utf-8').splitlines()
+    assert len(lines) == len(RESULTS), "embedded newlines stay escaped"
+    rows = [json.loads(line) for line in lines]
+    assert [row['Proprietor'] for row in rows] == ['ACME, LTD "Tea"', 'चाय कंपनी', None]
+    assert [{column: str(row[column] or '') for column in TEXT_COLUMNS} for row in rows] == EXPECTED
+    assert all('Image_Data' not in row for row in rows)
+    print("PASS: JSONL rows read back unchanged")
+
+
+def test_parquet_round_trip():
+    print("=== Text export: Parquet ===")
+    if not PARQUET_AVAILABLE:
+        print("SKIP: pyarrow is not installed")
+        return
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(BytesIO(generate_parquet(RESULTS).getvalue()))
+    assert table.column_names == TEXT_COLUMNS
+    assert table.to_pylist() == EXPECTED
+    print("PASS: Parquet rows read back unchanged")
+
+
+if __name__ == "__main__":
+    test_csv_round_trip()
+    test_jsonl_round_trip()
+    test_parquet_round_trip()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Watch search diff test against a temporary database
+Two runs of a saved search are recorded and the stored diff is checked for new, removed,
+status-changed and otherwise-changed rows.
+"""
+
+import os
+import tempfile
+
+from utils.watchlist import WatchStore, diff_rows
+
+
+def row(app_num, status='Registered', proprietor='ACME LTD'):
+    return {'Application_Number': app_num, 'Wordmark': 'ACME', 'Proprietor': proprietor,
+            'Class': '30', 'Status': status, 'Image_Data': b'logo'}
+
+
+def test_run_to_run_diff():
+    print("=== Watchlist: run-to-run diff ===")
+    store = WatchStore(os.path.join(tempfile.mkdtemp(), 'watch.db'))
+    watch_id = store.create('Acme tea', 'ACME', '30')
+
+    first = store.record_run(watch_id, [row('1001'), row('1002'), row('1003'), row('1004')])
+    assert first['first_run'] and first['new'] == 4 and first['total'] == 4
+
+    # 1001 unchanged, 1002 changes status, 1003 changes proprietor, 1004 disappears, 1005 is new
+    second = store.record_run(watch_id, [row('1001'), row('1002', status='Opposed'),
+                                         row('1003', proprietor='ACME HOLDINGS'), row('1005'), row('1005')])
+    assert not second['first_run']
+    assert (second['new'], second['removed'], second['status_changed'], second['changed']) == (1, 1, 1, 1), second
+    assert second['total'] == 4, "duplicate rows count once"
+
+    diff = store.get_diff(watch_id)['diff']
+    assert [r['Application_Number'] for r in diff['new']] == ['1005']
+    assert [r['Application_Number'] for r in diff['removed']] == ['1004']
+    assert diff['status_changed'][0]['Status'] == 'Opposed'
+    assert diff['status_changed'][0]['Previous_Status'] == 'Registered'
+    assert diff['changed'][0]['Proprietor'] == 'ACME HOLDINGS'
+    assert {r['Change'] for r in diff_rows(diff)} == {'new', 'removed', 'status_changed', 'changed'}
+
+    # A third identical run has nothing to report, and the first run is still readable by id
+    third = store.record_run(watch_id, [row('1001'), row('1002', status='Opposed'),
+                                        row('1003', proprietor='ACME HOLDINGS'), row('1005')])
+    assert (third['new'], third['removed'], third['status_changed'], third['changed']) == (0, 0, 0, 0)
+    assert len(store.get_diff(watch_id, first['run_id'])['diff']['new']) == 4
+    print("PASS: new, removed, status-changed and changed rows detected")
+
+
+if __name__ == "__main__":
+    test_run_to_run_diff()
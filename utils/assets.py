@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Fingerprinted static assets
+build_assets() writes minified, content-hashed copies of static files to static/dist with .gz/.br
+siblings and a manifest; install() makes url_for('static', ...) use them and serves them with
+far-future cache headers (and the pre-compressed sibling) when nginx is not in front
+"""
+
+import os
+import re
+import json
+import gzip
+import shutil
+import hashlib
+import mimetypes
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.svg', '.html', '.json', '.txt', '.ico')
+
+
+def minify_css(text):
+    """Drop comments and collapse whitespace (selectors and values are left alone)"""
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip() + '\n'
+
+
+def minify_js(text):
+    """Line-based and conservative: trims indentation and drops blank and comment-only lines
+
+    Line breaks are kept so automatic semicolon insertion behaves exactly as before, and lines
+    inside multi-line template literals are kept verbatim.
+    """
+    lines = []
+    in_template = False
+    in_comment = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if in_template:
+            lines.append(line)
+        elif in_comment:
+            in_comment = '*/' not in stripped
+            continue
+        elif stripped.startswith('/*'):
+            in_comment = '*/' not in stripped
+            continue
+        elif stripped and not stripped.startswith('//'):
+            lines.append(stripped)
+        # An odd number of unescaped backticks opens or closes a template literal
+        if len(re.findall(r'(?<!\\)`', line)) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _write_compressed(path, data):
+    """Write .gz (and .br when available) siblings if they are actually smaller"""
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(f'{path}.gz', 'wb') as f:
+            f.write(compressed)
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(f'{path}.br', 'wb') as f:
+                f.write(compressed)
+
+
+def build_assets(static_dir):
+    """Rebuild static/dist and its manifest; returns the manifest {filename: dist filename}"""
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            filename = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            stem, extension = os.path.splitext(filename)
+
+            with open(source, 'rb') as f:
+                data = f.read()
+            minifier = MINIFIERS.get(extension.lower())
+            if minifier:
+                data = minifier(data.decode('utf-8')).encode('utf-8')
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            dist_name = f'{DIST_DIR}/{stem}.{digest}{extension}'
+            target = os.path.join(static_dir, dist_name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            if extension.lower() in COMPRESSIBLE_EXTENSIONS:
+                _write_compressed(target, data)
+            manifest[filename] = dist_name
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_dir):
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def install(app):
+    """Point url_for('static', ...) at fingerprinted files and serve them as immutable"""
+    from flask import request, send_from_directory
+    from utils.responses import choose_encoding
+
+    manifest = load_manifest(app.static_folder)
+    if not manifest:
+        print("No static asset manifest - serving unfingerprinted files (run build_assets.py)")
+    app.config['ASSET_MANIFEST'] = manifest
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static_view(filename):
+        if not filename.startswith(f'{DIST_DIR}/'):
+            return app.send_static_file(filename)
+
+        # Fingerprinted: the content behind a URL never changes, so browsers need not revalidate
+        path = os.path.join(app.static_folder, filename)
+        encoding = choose_encoding(request.accept_encodings) if filename.endswith(COMPRESSIBLE_EXTENSIONS) else None
+        if encoding == 'br' and not os.path.exists(f'{path}.br'):
+            encoding = 'gzip' if request.accept_encodings['gzip'] else None
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding)
+
+        if suffix and os.path.exists(path + suffix):
+            response = send_from_directory(app.static_folder, filename + suffix, max_age=31536000,
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(app.static_folder, filename, max_age=31536000)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static_view
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Browsers leased from remote WebDriver endpoints (Selenium Grid hubs or nodes, or plain ChromeDriver servers)
+With WEBDRIVER_GRID_URLS set, scrapers start their Chrome through webdriver.Remote on the least-loaded
+healthy endpoint instead of on this machine, failing over to the next endpoint if a session cannot start
+"""
+
+import os
+import json
+import time
+import threading
+import urllib.request
+
+from selenium import webdriver
+
+# Comma-separated endpoints, e.g. http://grid-1:4444,http://grid-2:4444 (empty runs Chrome locally)
+GRID_URLS = [url.strip().rstrip('/') for url in os.environ.get('WEBDRIVER_GRID_URLS', '').split(',') if url.strip()]
+# Browsers one endpoint is trusted with at once
+GRID_NODE_CAPACITY = int(os.environ.get('WEBDRIVER_GRID_NODE_CAPACITY', 4))
+GRID_HEADLESS = os.environ.get('WEBDRIVER_GRID_HEADLESS', 'true').lower() == 'true'
+# Seconds between /status checks of an endpoint (sooner after a failure is not retried)
+GRID_HEALTH_INTERVAL = int(os.environ.get('WEBDRIVER_GRID_HEALTH_INTERVAL', 30))
+GRID_HEALTH_TIMEOUT = 3
+
+
+class GridDriver(webdriver.Remote):
+    """Remote Chrome that gives its endpoint slot back when it quits"""
+
+    def __init__(self, grid, endpoint, **kwargs):
+        self.grid = grid
+        self.endpoint = endpoint
+        self.released = False
+        super().__init__(**kwargs)
+
+    def quit(self):
+        try:
+            super().quit()
+        finally:
+            self.grid.release(self)
+
+
+class GridEndpoint:
+    def __init__(self, url, capacity):
+        self.url = url
+        self.capacity = capacity
+        self.leased = 0
+        self.healthy = True
+        self.checked_at = 0
+        self.started = 0
+        self.failures = 0
+        self.last_error = None
+
+    def check(self):
+        """Ask the endpoint's /status whether it can take new sessions"""
+        try:
+            with urllib.request.urlopen(f'{self.url}/status', timeout=GRID_HEALTH_TIMEOUT) as response:
+                status = json.loads(response.read().decode('utf-8')).get('value', {})
+            ready = bool(status.get('ready'))
+            error = None if ready else status.get('message', 'endpoint not ready')
+        except Exception as e:
+            ready, error = False, str(e)
+        if ready != self.healthy:
+            print(f"Grid endpoint {self.url} is {'healthy again' if ready else f'unhealthy: {error}'}")
+        self.healthy = ready
+        self.last_error = error
+        self.checked_at = time.time()
+
+    def load(self):
+        return self.leased / self.capacity
+
+
+class BrowserGrid:
+    def __init__(self, urls=GRID_URLS, capacity=GRID_NODE_CAPACITY, health_interval=GRID_HEALTH_INTERVAL):
+        self.endpoints = [GridEndpoint(url, capacity) for url in urls]
+        self.enabled = bool(self.endpoints)
+        self.health_interval = health_interval
+        self.lock = threading.Lock()
+
+    def _refresh_health(self):
+        """Re-check endpoints whose last check is older than the health interval"""
+        now = time.time()
+        for endpoint in self.endpoints:
+            if now - endpoint.checked_at >= self.health_interval:
+                endpoint.check()
+
+    def _reserve(self, tried):
+        """Take a slot on the least-loaded healthy endpoint not tried yet"""
+        with self.lock:
+            candidates = [endpoint for endpoint in self.endpoints
+                          if endpoint.healthy and endpoint.url not in tried and endpoint.leased < endpoint.capacity]
+            if not candidates:
+                return None
+            endpoint = min(candidates, key=lambda candidate: (candidate.load(), candidate.leased))
+            endpoint.leased += 1
+            return endpoint
+
+    def lease(self):
+        """Start a Chrome on the grid and return its driver"""
+        from utils.scraper import chrome_options
+
+        self._refresh_health()
+        tried = set()
+        errors = []
+        while True:
+            endpoint = self._reserve(tried)
+            if endpoint is None:
+                break
+            tried.add(endpoint.url)
+            try:
+                driver = GridDriver(self, endpoint, command_executor=endpoint.url,
+                                    options=chrome_options(headless=GRID_HEADLESS))
+            except Exception as e:
+                # Fail over: this endpoint is skipped until its next health check passes
+                with self.lock:
+                    endpoint.leased -= 1
+                    endpoint.failures += 1
+                    endpoint.healthy = False
+                    endpoint.last_error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                    endpoint.checked_at = time.time()
+                errors.append(f"{endpoint.url}: {endpoint.last_error}")
+                print(f"Grid endpoint {endpoint.url} could not start a browser - trying the next one")
+                continue
+            with self.lock:
+                endpoint.started += 1
+            print(f"Leased browser from {endpoint.url} ({endpoint.leased}/{endpoint.capacity} in use)")
+            return driver
+
+        if errors:
+            raise Exception(f"No WebDriver grid endpoint could start a browser ({'; '.join(errors)})")
+        raise Exception("Every WebDriver grid endpoint is busy or unhealthy - please try again shortly")
+
+    def release(self, driver):
+        with self.lock:
+            if not driver.released:
+                driver.released = True
+                driver.endpoint.leased -= 1
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            return {
+                'endpoints': [{
+                    'url': endpoint.url,
+                    'healthy': endpoint.healthy,
+                    'leased': endpoint.leased,
+                    'capacity': endpoint.capacity,
+                    'started': endpoint.started,
+                    'failures': endpoint.failures,
+                    'last_error': endpoint.last_error,
+                    'checked_seconds_ago': int(now - endpoint.checked_at) if endpoint.checked_at else None
+                } for endpoint in self.endpoints]
+            }
+
+
+# One grid client per process, shared by every session's scraper
+browser_grid = BrowserGrid()
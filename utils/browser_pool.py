@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Shared Chrome instances hosting many searches in isolated browser contexts
+With BROWSER_CONTEXTS_PER_BROWSER > 0 a scraper gets a context (its own cookies, storage and
+ASP.NET session, like an incognito window) in a long-lived Chrome instead of a Chrome of its own
+"""
+
+import os
+import time
+import shutil
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.switch_to import SwitchTo
+
+from utils.browser_supervisor import browser_supervisor, MAX_AGE
+
+# 0 keeps one Chrome process per search
+CONTEXTS_PER_BROWSER = int(os.environ.get('BROWSER_CONTEXTS_PER_BROWSER', 0))
+
+# Shared browsers stop taking new contexts at this age and close when their last context does
+POOL_BROWSER_MAX_AGE = int(os.environ.get('POOL_BROWSER_MAX_AGE', MAX_AGE))
+
+HANDLE_TIMEOUT = 5
+
+
+class ContextDriver(webdriver.Chrome):
+    """WebDriver for one browser context of a shared Chrome
+
+    Shares the browser's WebDriver session rather than starting one. ChromeDriver has a single
+    current window per session, so every command - including those sent by WebElements found
+    through this driver - switches to the context's window under the browser lock first.
+    """
+
+    def __init__(self, browser, context_id, handle):
+        self.__dict__.update(browser.driver.__dict__)
+        self._switch_to = SwitchTo(self)
+        self.browser = browser
+        self.context_id = context_id
+        self.handle = handle
+
+    def execute(self, driver_command, params=None):
+        with self.browser.lock:
+            self.browser.switch_window(self.handle)
+            return super().execute(driver_command, params)
+
+    def quit(self):
+        """Dispose of this context only - the browser keeps serving the others"""
+        self.browser.pool.close_context(self)
+
+
+class SharedBrowser:
+    def __init__(self, pool):
+        from utils.scraper import new_user_data_dir, launch_chrome
+
+        self.pool = pool
+        self.user_data_dir = new_user_data_dir()
+        # 'eager' returns from navigations at DOMContentLoaded, so one context's slow page load
+        # holds the shared WebDriver session for as short a time as possible
+        self.driver = launch_chrome(self.user_data_dir, page_load_strategy='eager')
+        self.lock = threading.RLock()
+        self.home_handle = self.driver.current_window_handle
+        self.current_handle = self.home_handle
+        self.contexts = {}      # window handle -> browser context id
+        self.launched = time.time()
+        self.retired = False
+        browser_supervisor.register(self, managed=True)
+
+    def switch_window(self, handle):
+        """Make handle ChromeDriver's current window (call with the lock held)"""
+        if self.current_handle != handle:
+            webdriver.Chrome.execute(self.driver, Command.SWITCH_TO_WINDOW, {'handle': handle})
+            self.current_handle = handle
+
+    def is_alive(self):
+        try:
+            with self.lock:
+                self.switch_window(self.home_handle)
+                self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def open_context(self):
+        """Create a browser context with one 1920x1080 page and return its driver"""
+        with self.lock:
+            self.switch_window(self.home_handle)
+            before = set(self.driver.window_handles)
+            context_id = self.driver.execute_cdp_cmd(
+                'Target.createBrowserContext', {'disposeOnDetach': False})['browserContextId']
+            target_id = self.driver.execute_cdp_cmd('Target.createTarget', {
+                'url': 'about:blank', 'browserContextId': context_id, 'width': 1920, 'height': 1080
+            })['targetId']
+
+            # ChromeDriver names windows by target id; fall back to whichever window is new
+            deadline = time.time() + HANDLE_TIMEOUT
+            handle = None
+            while handle is None:
+                new_handles = set(self.driver.window_handles) - before
+                if target_id in new_handles:
+                    handle = target_id
+                elif len(new_handles) == 1:
+                    handle = new_handles.pop()
+                elif time.time() > deadline:
+                    self.driver.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context_id})
+                    raise Exception("New browser context did not appear as a window")
+                else:
+                    time.sleep(0.1)
+
+            self.contexts[handle] = context_id
+            return ContextDriver(self, context_id, handle)
+
+    def close_context(self, context):
+        with self.lock:
+            self.contexts.pop(context.handle, None)
+            try:
+                self.switch_window(self.home_handle)
+                self.driver.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context.context_id})
+            except Exception as e:
+                print(f"Browser context cleanup error: {e}")
+
+    def cleanup(self):
+        """Quit the shared Chrome - every context in it goes with it"""
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"Shared browser cleanup error: {e}")
+        finally:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            browser_supervisor.release(self)
+            self.pool.discard(self)
+
+
+class BrowserPool:
+    def __init__(self, contexts_per_browser=CONTEXTS_PER_BROWSER, max_age=POOL_BROWSER_MAX_AGE):
+        self.contexts_per_browser = contexts_per_browser
+        self.max_age = max_age
+        self.enabled = contexts_per_browser > 0
+        self.browsers = []
+        self.launched = 0
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def open_context(self):
+        """Driver for a new context in a shared browser with room, launching a browser if none has"""
+        with self.lock:
+            now = time.time()
+            for browser in self.browsers:
+                browser.retired = browser.retired or now - browser.launched > self.max_age
+
+            candidates = [browser for browser in self.browsers
+                          if not browser.retired and len(browser.contexts) < self.contexts_per_browser]
+            browser = None
+            for candidate in candidates:
+                if candidate.is_alive():
+                    browser = candidate
+                    break
+                print("Shared browser stopped responding - retiring it")
+                candidate.retired = True
+
+            if browser is None:
+                browser = SharedBrowser(self)
+                self.browsers.append(browser)
+                self.launched += 1
+                print(f"Launched shared browser {self.launched} "
+                      f"({self.contexts_per_browser} contexts per browser)")
+
+            context = browser.open_context()
+            self.opened += 1
+
+        self._close_idle()
+        return context
+
+    def close_context(self, context):
+        context.browser.close_context(context)
+        self._close_idle()
+
+    def _close_idle(self):
+        """Quit retired browsers that no longer host a context, and any spare empty browser"""
+        with self.lock:
+            doomed = [browser for browser in self.browsers if not browser.contexts and browser.retired]
+            empty = [browser for browser in self.browsers if not browser.contexts and not browser.retired]
+            # Keep one empty browser warm for the next search
+            doomed.extend(empty[1:])
+            for browser in doomed:
+                self.browsers.remove(browser)
+        for browser in doomed:
+            browser.cleanup()
+
+    def discard(self, browser):
+        with self.lock:
+            if browser in self.browsers:
+                self.browsers.remove(browser)
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            return {
+                'contexts_per_browser': self.contexts_per_browser,
+                'browsers_launched': self.launched,
+                'contexts_opened': self.opened,
+                'browsers': [{
+                    'contexts': len(browser.contexts),
+                    'age_seconds': int(now - browser.launched),
+                    'retired': browser.retired
+                } for browser in self.browsers]
+            }
+
+
+# One pool per process, shared by every session's scraper
+browser_pool = BrowserPool()
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+Supervisor for the Chrome/ChromeDriver processes launched by scrapers
+Tracks the process tree of every driver, samples its RSS/CPU, kills browsers that are too big,
+no longer owned by a session or parked past their age limit, and reaps orphans left behind by
+earlier workers
+Linux only (reads /proc); elsewhere it only keeps the registry of browsers
+"""
+
+import os
+import re
+import time
+import shutil
+import signal
+import threading
+
+MAX_RSS_MB = int(os.environ.get('BROWSER_MAX_RSS_MB', 1024))
+MAX_AGE = int(os.environ.get('BROWSER_MAX_AGE', 1800))
+SAMPLE_INTERVAL = int(os.environ.get('BROWSER_SAMPLE_INTERVAL', 15))
+
+# A browser must be unowned for this long before it is killed (covers the hand-off between threads)
+UNOWNED_GRACE = 2 * SAMPLE_INTERVAL
+
+BROWSER_PROCESS_NAMES = ('chrome', 'chromedriver', 'chromium', 'chromium-browse', 'headless_shell')
+
+# Only Chrome started by TrademarkScraper uses these profile directories
+USER_DATA_DIR_PATTERN = re.compile(r'--user-data-dir=(/tmp/chrome_user_data_[0-9a-f_]+)')
+# chrome_user_data_<owner pid>_<id> - other gunicorn workers and scraper workers share /tmp
+USER_DATA_DIR_OWNER = re.compile(r'^chrome_user_data_(\d+)_[0-9a-f]+$')
+
+PROC_DIR = '/proc'
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def read_process(pid):
+    """Return {pid, ppid, name, state, rss, cpu_ticks} from /proc, or None if the process is gone"""
+    try:
+        with open(f'{PROC_DIR}/{pid}/stat') as f:
+            stat = f.read()
+        with open(f'{PROC_DIR}/{pid}/statm') as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    # comm is in parentheses and may itself contain spaces or parentheses
+    name = stat[stat.index('(') + 1:stat.rindex(')')]
+    fields = stat[stat.rindex(')') + 2:].split()
+    return {
+        'pid': pid,
+        'ppid': int(fields[1]),
+        'name': name,
+        'state': fields[0],
+        'rss': rss_pages * PAGE_SIZE,
+        'cpu_ticks': int(fields[11]) + int(fields[12])
+    }
+
+
+def read_cmdline(pid):
+    try:
+        with open(f'{PROC_DIR}/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def list_processes():
+    """Snapshot of every process as {pid: process}"""
+    processes = {}
+    for entry in os.listdir(PROC_DIR):
+        if entry.isdigit():
+            process = read_process(int(entry))
+            if process:
+                processes[process['pid']] = process
+    return processes
+
+
+def descendants(root_pid, processes):
+    """PIDs of root_pid and everything below it in a process snapshot"""
+    children = {}
+    for process in processes.values():
+        children.setdefault(process['ppid'], []).append(process['pid'])
+
+    tree = []
+    stack = [root_pid] if root_pid in processes else []
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def is_browser_process(process):
+    return process['name'].lower().startswith(BROWSER_PROCESS_NAMES)
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def kill_pids(pids):
+    """SIGKILL each pid and reap the ones that are our own children"""
+    killed = 0
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            continue
+    time.sleep(0.1)
+    reap_zombies(pids)
+    return killed
+
+
+def reap_zombies(pids=None):
+    """Collect the exit status of dead browser processes that are our children
+
+    Only browser processes are waited on - other children (e.g. the logo hashing pool) reap their own.
+    """
+    reaped = 0
+    processes = list_processes()
+    for pid in pids if pids is not None else processes:
+        process = processes.get(pid)
+        if not process or process['ppid'] != os.getpid() or process['state'] != 'Z' \
+                or not is_browser_process(process):
+            continue
+        try:
+            if os.waitpid(pid, os.WNOHANG)[0]:
+                reaped += 1
+        except ChildProcessError:
+            continue
+    return reaped
+
+
+class BrowserSupervisor:
+    def __init__(self, max_rss_mb=MAX_RSS_MB, max_age=MAX_AGE, interval=SAMPLE_INTERVAL):
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.max_age = max_age
+        self.interval = interval
+        self.enabled = os.path.isdir(PROC_DIR) and hasattr(os, 'waitpid')
+        self.browsers = {}      # id(scraper) -> browser record
+        self.owner_check = None
+        self.killed = {'rss': 0, 'age': 0, 'unowned': 0, 'leftover': 0, 'orphan_processes': 0}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def set_owner_check(self, owner_check):
+        """owner_check() returns the ids of scrapers still held by a session"""
+        self.owner_check = owner_check
+
+    def register(self, scraper, managed=False):
+        """Start tracking the driver a scraper has just launched
+
+        Managed browsers (shared by the browser pool) are retired by their owner, so only the
+        RSS limit applies to them. The age limit is checked by the scraper itself (see expired).
+        """
+        process = getattr(getattr(scraper.driver, 'service', None), 'process', None)
+        if process is None:
+            return    # remote driver - nothing local to supervise
+        with self.lock:
+            self.browsers[id(scraper)] = {
+                'scraper': scraper,
+                'driver_pid': process.pid,
+                'pids': {process.pid},
+                'user_data_dir': scraper.user_data_dir,
+                'launched': time.time(),
+                'managed': managed,
+                'unowned_since': None,
+                'rss': 0,
+                'cpu_percent': 0.0,
+                'cpu_ticks': None,
+                'sampled': None
+            }
+        self.start()
+
+    def release(self, scraper):
+        """Stop tracking a scraper after cleanup, killing anything driver.quit() left behind"""
+        with self.lock:
+            browser = self.browsers.pop(id(scraper), None)
+        if browser is None or not self.enabled:
+            return
+        processes = list_processes()
+        leftover = [pid for pid in self._tree(browser, processes) if processes[pid]['state'] != 'Z']
+        if leftover:
+            print(f"Killing {len(leftover)} leftover browser processes of driver {browser['driver_pid']}")
+            with self.lock:
+                self.killed['leftover'] += 1
+            kill_pids(leftover)
+
+    def _tree(self, browser, processes):
+        """Live PIDs of a browser: the driver's current tree plus anything seen in it before"""
+        driver = processes.get(browser['driver_pid'])
+        pids = set(descendants(driver['pid'], processes)) if driver and is_browser_process(driver) else set()
+        # Processes re-parented after their parent died are still ours
+        pids.update(pid for pid in browser['pids'] if pid in processes and is_browser_process(processes[pid]))
+        for pid in list(pids):
+            pids.update(descendants(pid, processes))
+        return pids
+
+    def sample(self):
+        """Refresh the PID tree, RSS and CPU of every tracked browser"""
+        if not self.enabled:
+            return
+        processes = list_processes()
+        now = time.time()
+        with self.lock:
+            for browser in self.browsers.values():
+                pids = self._tree(browser, processes)
+                browser['pids'] = pids
+                browser['rss'] = sum(processes[pid]['rss'] for pid in pids)
+                cpu_ticks = sum(processes[pid]['cpu_ticks'] for pid in pids)
+                if browser['cpu_ticks'] is not None and now > browser['sampled']:
+                    delta = max(0, cpu_ticks - browser['cpu_ticks']) / CLOCK_TICKS
+                    browser['cpu_percent'] = round(100.0 * delta / (now - browser['sampled']), 1)
+                browser['cpu_ticks'] = cpu_ticks
+                browser['sampled'] = now
+
+    def expired(self, scraper):
+        """True if a scraper's browser is over the age limit - counted as an age kill
+
+        Asked by the scraper before it reuses a parked browser, on the thread that owns it: killing
+        an old browser from here could cut a crawl or bulk lookup off in the middle of a search.
+        """
+        with self.lock:
+            browser = self.browsers.get(id(scraper))
+            if browser is None or browser['managed'] or time.time() - browser['launched'] <= self.max_age:
+                return False
+            self.killed['age'] += 1
+            return True
+
+    def enforce(self):
+        """Kill browsers over the RSS limit, or unowned for longer than the grace period"""
+        owned = None
+        if self.owner_check:
+            try:
+                owned = self.owner_check()
+            except Exception as e:
+                print(f"Browser owner check error: {e}")
+
+        now = time.time()
+        doomed = []
+        with self.lock:
+            for key, browser in self.browsers.items():
+                reason = None
+                if browser['rss'] > self.max_rss:
+                    reason = 'rss'
+                elif browser['managed']:
+                    pass
+                elif owned is not None and key not in owned:
+                    browser['unowned_since'] = browser['unowned_since'] or now
+                    if now - browser['unowned_since'] > UNOWNED_GRACE:
+                        reason = 'unowned'
+                else:
+                    browser['unowned_since'] = None
+                if reason:
+                    doomed.append((reason, browser))
+                    self.killed[reason] += 1
+
+        for reason, browser in doomed:
+            print(f"Killing browser (driver pid {browser['driver_pid']}, "
+                  f"{browser['rss'] / 1048576:.0f} MB, {now - browser['launched']:.0f}s old): {reason}")
+            scraper = browser['scraper']
+            # cleanup() quits the driver and, via release(), kills whatever survives the quit
+            try:
+                scraper.cleanup()
+            except Exception as e:
+                print(f"Supervisor cleanup error: {e}")
+            with self.lock:
+                still_tracked = self.browsers.pop(id(scraper), None)
+            if still_tracked:
+                kill_pids(self._tree(still_tracked, list_processes()))
+        return len(doomed)
+
+    def reap_orphans(self):
+        """Kill our Chrome/ChromeDriver processes whose owning worker is gone, and their profile dirs"""
+        if not self.enabled:
+            return 0
+        processes = list_processes()
+        with self.lock:
+            tracked = set().union(*(browser['pids'] for browser in self.browsers.values()))
+        orphans = set()
+        for process in processes.values():
+            if not is_browser_process(process) or process['pid'] in tracked or process['ppid'] == os.getpid():
+                continue
+            # A browser tree whose worker died is re-parented to init (or the container's PID 1)
+            if process['ppid'] != 1 and process['ppid'] in processes:
+                continue
+            # Only trees running one of our profiles: a ChromeDriver's own command line has no
+            # profile, so its Chrome children decide - other software's browsers are left alone
+            tree = descendants(process['pid'], processes)
+            if any(USER_DATA_DIR_PATTERN.search(read_cmdline(pid)) for pid in tree):
+                orphans.update(tree)
+
+        if orphans:
+            print(f"Reaping {len(orphans)} orphaned browser processes")
+            kill_pids(orphans)
+            with self.lock:
+                self.killed['orphan_processes'] += len(orphans)
+
+        # Profile directories not used by any remaining browser, owned by this process or a dead one
+        in_use = set()
+        for process in list_processes().values():
+            if is_browser_process(process):
+                in_use.update(USER_DATA_DIR_PATTERN.findall(read_cmdline(process['pid'])))
+        with self.lock:
+            in_use.update(browser['user_data_dir'] for browser in self.browsers.values())
+        for name in os.listdir('/tmp'):
+            path = os.path.join('/tmp', name)
+            owner = USER_DATA_DIR_OWNER.match(name)
+            if not owner or path in in_use:
+                continue
+            owner_pid = int(owner.group(1))
+            if owner_pid == os.getpid():
+                # Our own browser may be starting - its Chrome is not on the process list yet
+                try:
+                    if time.time() - os.path.getmtime(path) < UNOWNED_GRACE:
+                        continue
+                except OSError:
+                    continue
+            elif pid_alive(owner_pid):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+        return len(orphans)
+
+    def start(self):
+        """Start the sampling thread (once per process); orphans are reaped when it starts
+
+        Called when the web app serves its first request and when a scraper worker starts, as well as
+        on every browser launch.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+
+            def run():
+                try:
+                    self.reap_orphans()
+                except Exception as e:
+                    print(f"Orphan reaping error: {e}")
+                while True:
+                    try:
+                        self.sample()
+                        self.enforce()
+                        reap_zombies()
+                    except Exception as e:
+                        print(f"Browser supervisor error: {e}")
+                    time.sleep(self.interval)
+
+            self.thread = threading.Thread(target=run, name='browser-supervisor')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def snapshot(self):
+        """Per-browser resource usage and kill counters"""
+        now = time.time()
+        with self.lock:
+            browsers = [{
+                'driver_pid': browser['driver_pid'],
+                'processes': len(browser['pids']),
+                'rss_mb': round(browser['rss'] / 1048576, 1),
+                'cpu_percent': browser['cpu_percent'],
+                'age_seconds': int(now - browser['launched']),
+                'owned': browser['unowned_since'] is None,
+                'shared': browser['managed']
+            } for browser in self.browsers.values()]
+            return {
+                'enabled': self.enabled,
+                'browsers': browsers,
+                'total_rss_mb': round(sum(browser['rss_mb'] for browser in browsers), 1),
+                'limits': {'max_rss_mb': self.max_rss // 1048576, 'max_age_seconds': self.max_age},
+                'killed': dict(self.killed)
+            }
+
+
+# One supervisor per process, shared by every session's scraper
+browser_supervisor = BrowserSupervisor()
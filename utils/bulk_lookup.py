@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk status lookup by application number
+Numbers refreshed in the corpus within the freshness window are answered from it. The rest are
+searched on the registry by application number, spread over several browsers, and every row found
+is written back to the corpus. CAPTCHAs go to a queue a person answers, as in the prefix crawl.
+"""
+
+import os
+import re
+import time
+import queue
+import threading
+from datetime import datetime, timedelta
+
+from utils.registry import ScraperError, CaptchaError, NoResultsError, CircuitOpenError
+from utils.scraper import APPLICATION_SEARCH
+from utils.crawler import CrawlStopped, ask_captcha, CAPTCHA_ATTEMPTS
+
+# Numbers refreshed within this many hours are not looked up again
+FRESH_HOURS = float(os.environ.get('BULK_LOOKUP_FRESH_HOURS', 24))
+MAX_ATTEMPTS = 3            # Failed lookups of one number before it is reported as an error
+
+STATUS_COLUMNS = ['Application_Number', 'Status', 'Wordmark', 'Class', 'Proprietor', 'Checked_At', 'Source']
+
+APPLICATION_NUMBER_PATTERN = re.compile(r'^\d{4,10}$')
+
+
+def read_application_numbers(lines):
+    """Distinct application numbers, in input order, from text or CSV lines (first column)"""
+    numbers = []
+    seen = set()
+    for line in lines:
+        number = re.sub(r'\s+', '', line.split(',')[0]).strip('"\'')
+        if APPLICATION_NUMBER_PATTERN.match(number) and number not in seen:
+            seen.add(number)
+            numbers.append(number)
+    return numbers
+
+
+class BulkLookup:
+    def __init__(self, corpus, scraper_factory, browsers=2, fresh_hours=FRESH_HOURS):
+        self.corpus = corpus
+        self.scraper_factory = scraper_factory
+        self.browsers = browsers
+        self.fresh_hours = fresh_hours
+        self.numbers = []
+        self.rows = {}                      # application number -> status row
+        self.pending = queue.Queue()
+        self.captchas = queue.Queue()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.stats = {'fresh': 0, 'looked_up': 0, 'not_found': 0, 'failed': 0, 'wrong_captchas': 0}
+        self.started = None
+
+    def plan(self, numbers):
+        """Answer fresh numbers from the corpus and queue the rest; returns how many need the registry"""
+        self.numbers = list(numbers)
+        cutoff = (datetime.now() - timedelta(hours=self.fresh_hours)).strftime("%Y-%m-%d %H:%M:%S")
+        known = self.corpus.get_records(self.numbers)
+        for number in self.numbers:
+            record = known.get(number)
+            if record and record['Last_Refreshed'] >= cutoff:
+                self._record(number, record, record['Last_Refreshed'], 'corpus')
+                self.stats['fresh'] += 1
+            else:
+                self.pending.put((number, 0))
+        return self.pending.qsize()
+
+    def _record(self, number, record, checked_at, source):
+        row = {column: (record or {}).get(column, '') for column in STATUS_COLUMNS}
+        row.update({'Application_Number': number, 'Checked_At': checked_at, 'Source': source})
+        with self.lock:
+            self.rows[number] = row
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def start(self):
+        self.started = time.time()
+        for number in range(min(self.browsers, self.pending.qsize())):
+            thread = threading.Thread(target=self._browser_loop, name=f'lookup-browser-{number + 1}')
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def running(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def stop(self):
+        self.stopping.set()
+        while True:
+            try:
+                self.captchas.get_nowait().answer(None)
+            except queue.Empty:
+                break
+
+    def _browser_loop(self):
+        scraper = None
+        try:
+            while not self.stopping.is_set():
+                try:
+                    number, failures = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                scraper = scraper or self.scraper_factory()
+                try:
+                    self._lookup(scraper, number)
+                except CrawlStopped:
+                    break
+                except CircuitOpenError as e:
+                    # The registry is down - wait for the breaker instead of burning attempts
+                    self.pending.put((number, failures))
+                    print(f"{e} - pausing")
+                    self.stopping.wait(30)
+                except Exception as e:
+                    print(f"Lookup of {number} failed: {e}")
+                    scraper.cleanup()
+                    scraper = None
+                    if failures + 1 < MAX_ATTEMPTS:
+                        self.pending.put((number, failures + 1))
+                    else:
+                        self._count('failed')
+                        self._record(number, None, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), f'error: {e}')
+        finally:
+            if scraper:
+                scraper.cleanup()
+
+    def _lookup(self, scraper, number):
+        for _ in range(CAPTCHA_ATTEMPTS):
+            captcha_data = scraper.initialize_browser(number, search_type=APPLICATION_SEARCH)
+            answer = ask_captcha(self.captchas, self.stopping, f'application {number}', captcha_data)
+            try:
+                scraper.submit_search(answer)
+            except CaptchaError:
+                self._count('wrong_captchas')
+                scraper.park()
+                continue
+            except NoResultsError:
+                scraper.park()
+                results = []
+            else:
+                results = scraper.extract_results(keep_alive=True)
+                scraper.search_results = []
+
+            checked_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.corpus.upsert_results(results, checked_at)
+            match = next((result for result in results if result.get('Application_Number') == number), None)
+            self._count('looked_up')
+            if match is None:
+                self._count('not_found')
+            self._record(number, match, checked_at, 'registry' if match else 'not found')
+            return
+        raise ScraperError(f"CAPTCHA answered wrongly {CAPTCHA_ATTEMPTS} times")
+
+    def table(self):
+        """Status rows in input order - numbers never reached are marked as skipped"""
+        with self.lock:
+            return [self.rows.get(number) or {**{column: '' for column in STATUS_COLUMNS},
+                                              'Application_Number': number, 'Source': 'skipped'}
+                    for number in self.numbers]
+
+    def snapshot(self):
+        elapsed = time.time() - self.started if self.started else 0
+        with self.lock:
+            stats = dict(self.stats)
+        stats['seconds'] = round(elapsed, 1)
+        stats['lookups_per_minute'] = round(stats['looked_up'] * 60 / elapsed, 1) if elapsed else 0
+        return stats
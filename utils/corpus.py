@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent local corpus of scraped trademark records
+Rows are upserted by Application_Number into SQLite with an FTS5 index on Wordmark and Proprietor
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_CORPUS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'trademark_corpus.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trademarks (
+    id INTEGER PRIMARY KEY,
+    application_number TEXT NOT NULL UNIQUE,
+    wordmark TEXT NOT NULL DEFAULT '',
+    proprietor TEXT NOT NULL DEFAULT '',
+    class TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    has_image INTEGER NOT NULL DEFAULT 0,
+    first_seen TEXT NOT NULL,
+    last_refreshed TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_trademarks_class ON trademarks(class);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS trademarks_fts USING fts5(
+    wordmark, proprietor,
+    content='trademarks', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TABLE IF NOT EXISTS logo_hashes (
+    image_sha TEXT PRIMARY KEY,
+    ahash TEXT NOT NULL,
+    dhash TEXT NOT NULL,
+    phash TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS logo_marks (
+    application_number TEXT PRIMARY KEY,
+    image_sha TEXT NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trademarks_ai AFTER INSERT ON trademarks BEGIN
+    INSERT INTO trademarks_fts(rowid, wordmark, proprietor)
+    VALUES (new.id, new.wordmark, new.proprietor);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trademarks_ad AFTER DELETE ON trademarks BEGIN
+    INSERT INTO trademarks_fts(trademarks_fts, rowid, wordmark, proprietor)
+    VALUES ('delete', old.id, old.wordmark, old.proprietor);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trademarks_au AFTER UPDATE OF wordmark, proprietor ON trademarks BEGIN
+    INSERT INTO trademarks_fts(trademarks_fts, rowid, wordmark, proprietor)
+    VALUES ('delete', old.id, old.wordmark, old.proprietor);
+    INSERT INTO trademarks_fts(rowid, wordmark, proprietor)
+    VALUES (new.id, new.wordmark, new.proprietor);
+END;
+"""
+
+UPSERT_SQL = """
+INSERT INTO trademarks (application_number, wordmark, proprietor, class, status,
+                        has_image, first_seen, last_refreshed)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(application_number) DO UPDATE SET
+    wordmark = excluded.wordmark,
+    proprietor = excluded.proprietor,
+    class = excluded.class,
+    status = excluded.status,
+    has_image = excluded.has_image,
+    last_refreshed = excluded.last_refreshed
+"""
+
+SEARCH_FIELDS = {'all': None, 'wordmark': 'wordmark', 'proprietor': 'proprietor'}
+
+
+def build_match_query(text, field=None):
+    """Turn free text into an FTS5 prefix query, e.g. 'tata steel' -> '"tata"* AND "steel"*'"""
+    tokens = re.findall(r'\w+', text, flags=re.UNICODE)
+    if not tokens:
+        return None
+    terms = ' AND '.join(f'"{token}"*' for token in tokens)
+    return f'{field} : ({terms})' if field else terms
+
+
+class SQLiteStore:
+    """Base for stores kept in the local SQLite database"""
+    schema = ''
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get('CORPUS_DB_PATH', DEFAULT_CORPUS_PATH)
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+
+        if self.db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._connect().executescript(self.schema)
+
+    def _connect(self):
+        """One connection per thread and process; WAL lets readers run alongside the writer"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            # Connections must not cross a fork (gunicorn preload_app)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+
+class TrademarkCorpus(SQLiteStore):
+    schema = SCHEMA
+
+    def upsert_results(self, search_results, refreshed_at=None):
+        """Insert or refresh scraped rows keyed by Application_Number"""
+        refreshed_at = refreshed_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(
+            result['Application_Number'],
+            result.get('Wordmark', '') or '',
+            result.get('Proprietor', '') or '',
+            result.get('Class', '') or '',
+            result.get('Status', '') or '',
+            1 if result.get('Image_Data') else 0,
+            refreshed_at,
+            refreshed_at
+        ) for result in search_results if result.get('Application_Number')]
+
+        if not rows:
+            return 0
+
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.executemany(UPSERT_SQL, rows)
+        return len(rows)
+
+    def search(self, text, field='all', trademark_class=None, limit=50, offset=0):
+        """Full-text search over Wordmark/Proprietor, best matches first"""
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"Unknown search field: {field}")
+
+        match_query = build_match_query(text, SEARCH_FIELDS[field])
+        if not match_query:
+            return []
+
+        sql = """
+            SELECT t.application_number, t.wordmark, t.proprietor, t.class, t.status,
+                   t.has_image, t.first_seen, t.last_refreshed
+            FROM trademarks_fts
+            JOIN trademarks t ON t.id = trademarks_fts.rowid
+            WHERE trademarks_fts MATCH ?
+        """
+        params = [match_query]
+        if trademark_class:
+            sql += " AND t.class = ?"
+            params.append(trademark_class)
+        sql += " ORDER BY bm25(trademarks_fts) LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        return [{
+            'Application_Number': row['application_number'],
+            'Wordmark': row['wordmark'],
+            'Proprietor': row['proprietor'],
+            'Class': row['class'],
+            'Status': row['status'],
+            'has_image': bool(row['has_image']),
+            'First_Seen': row['first_seen'],
+            'Last_Refreshed': row['last_refreshed']
+        } for row in self._connect().execute(sql, params)]
+
+    def get_records(self, application_numbers):
+        """Return {application_number: record} for the numbers already in the corpus"""
+        application_numbers = list(application_numbers)
+        found = {}
+        conn = self._connect()
+        for start in range(0, len(application_numbers), 500):
+            chunk = application_numbers[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(
+                    f"SELECT application_number, wordmark, proprietor, class, status, last_refreshed "
+                    f"FROM trademarks WHERE application_number IN ({placeholders})", chunk):
+                found[row['application_number']] = {
+                    'Application_Number': row['application_number'],
+                    'Wordmark': row['wordmark'],
+                    'Proprietor': row['proprietor'],
+                    'Class': row['class'],
+                    'Status': row['status'],
+                    'Last_Refreshed': row['last_refreshed']
+                }
+        return found
+
+    def iter_marks(self, batch_size=10000):
+        """Yield (application_number, wordmark, class) for every record"""
+        cursor = self._connect().execute(
+            "SELECT application_number, wordmark, class FROM trademarks ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row['application_number'], row['wordmark'], row['class']
+
+    def get_logo_hashes(self, image_shas):
+        """Return {image_sha: (ahash, dhash, phash)} for hashes already computed"""
+        image_shas = list(image_shas)
+        found = {}
+        conn = self._connect()
+        for start in range(0, len(image_shas), 500):
+            chunk = image_shas[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(
+                    f"SELECT image_sha, ahash, dhash, phash FROM logo_hashes WHERE image_sha IN ({placeholders})",
+                    chunk):
+                found[row['image_sha']] = (int(row['ahash'], 16), int(row['dhash'], 16), int(row['phash'], 16))
+        return found
+
+    def upsert_logos(self, logo_hashes, logo_marks):
+        """Store perceptual hashes by image hash and link application numbers to them"""
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO logo_hashes (image_sha, ahash, dhash, phash) VALUES (?, ?, ?, ?)",
+                [(image_sha, f'{a:016x}', f'{d:016x}', f'{p:016x}')
+                 for image_sha, (a, d, p) in logo_hashes.items()])
+            conn.executemany(
+                "INSERT OR REPLACE INTO logo_marks (application_number, image_sha) VALUES (?, ?)",
+                list(logo_marks.items()))
+
+    def iter_logos(self, batch_size=10000):
+        """Yield (application_number, ahash, dhash, phash) for every stored logo"""
+        cursor = self._connect().execute("""
+            SELECT m.application_number, h.ahash, h.dhash, h.phash
+            FROM logo_marks m JOIN logo_hashes h ON h.image_sha = m.image_sha
+        """)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield (row['application_number'], int(row['ahash'], 16),
+                       int(row['dhash'], 16), int(row['phash'], 16))
+
+    def count(self):
+        """Number of records in the corpus"""
+        return self._connect().execute("SELECT COUNT(*) FROM trademarks").fetchone()[0]
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Resumable prefix crawl of the registry into the local corpus
+Sweeps "Start With" searches over wordmark prefixes and classes with the scraper's own form logic.
+Every prefix/class pair is a row in crawl_prefixes, so an interrupted crawl resumes where it stopped,
+and a prefix whose results were cut off at the registry's limit is split into longer prefixes.
+CAPTCHAs are put on a queue for a person to answer (see crawl_registry.py)
+"""
+
+import os
+import re
+import time
+import queue
+import base64
+import string
+import threading
+
+from utils.corpus import SQLiteStore
+from utils.registry import ScraperError, CaptchaError, NoResultsError, CircuitOpenError
+
+ALPHABET = string.ascii_uppercase + string.digits
+MAX_ATTEMPTS = 3            # Failed searches of one prefix before it is given up
+CAPTCHA_ATTEMPTS = 3        # Wrong CAPTCHA answers for one search before it counts as a failure
+MAX_PREFIX_LENGTH = 8       # Prefixes are not split beyond this length
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_prefixes (
+    prefix TEXT NOT NULL,
+    class TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    results INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (prefix, class)
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_prefixes_status ON crawl_prefixes(status);
+"""
+
+
+def seed_prefixes(length, alphabet=ALPHABET):
+    """Every prefix of exactly `length` characters: A..Z for 1, AA..ZZ for 2"""
+    prefixes = ['']
+    for _ in range(length):
+        prefixes = [prefix + char for prefix in prefixes for char in alphabet]
+    return prefixes
+
+
+def parse_classes(spec):
+    """'1-45' or '9,35,42' (or '' for all classes in one search) -> list of class strings"""
+    if not spec:
+        return ['']
+    classes = []
+    for part in spec.split(','):
+        if '-' in part:
+            start, end = part.split('-', 1)
+            classes.extend(str(number) for number in range(int(start), int(end) + 1))
+        elif part.strip():
+            classes.append(str(int(part)))
+    return classes
+
+
+class CrawlState(SQLiteStore):
+    """Checkpoint of the crawl: one row per prefix/class with pending, running, done, split or failed"""
+    schema = SCHEMA
+
+    def seed(self, prefixes, classes):
+        now = time.time()
+        conn = self._connect()
+        with self.write_lock, conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO crawl_prefixes (prefix, class, updated) VALUES (?, ?, ?)",
+                [(prefix, trademark_class, now) for prefix in prefixes for trademark_class in classes])
+        return cursor.rowcount
+
+    def resume(self):
+        """Put back searches that were running when the last crawl stopped"""
+        conn = self._connect()
+        with self.write_lock, conn:
+            return conn.execute("UPDATE crawl_prefixes SET status = 'pending' WHERE status = 'running'").rowcount
+
+    def claim(self):
+        """Next pending prefix/class, shortest prefixes first, or None"""
+        conn = self._connect()
+        with self.write_lock, conn:
+            row = conn.execute("SELECT prefix, class FROM crawl_prefixes WHERE status = 'pending' "
+                               "ORDER BY length(prefix), prefix, CAST(class AS INTEGER) LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE crawl_prefixes SET status = 'running', attempts = attempts + 1, updated = ? "
+                         "WHERE prefix = ? AND class = ?", (time.time(), row['prefix'], row['class']))
+        return row['prefix'], row['class']
+
+    def _set(self, prefix, trademark_class, **fields):
+        assignments = ', '.join(f'{field} = ?' for field in fields)
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute(f"UPDATE crawl_prefixes SET {assignments}, updated = ? WHERE prefix = ? AND class = ?",
+                         list(fields.values()) + [time.time(), prefix, trademark_class])
+
+    def finish(self, prefix, trademark_class, results):
+        self._set(prefix, trademark_class, status='done', results=results, error=None)
+
+    def split(self, prefix, trademark_class, results, alphabet=ALPHABET):
+        """Record a capped prefix and queue its one-character-longer children"""
+        self._set(prefix, trademark_class, status='split', results=results, error=None)
+        self.seed([prefix + char for char in alphabet], [trademark_class])
+
+    def fail(self, prefix, trademark_class, error, max_attempts=MAX_ATTEMPTS):
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute("UPDATE crawl_prefixes SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                         "error = ?, updated = ? WHERE prefix = ? AND class = ?",
+                         (max_attempts, error, time.time(), prefix, trademark_class))
+
+    def release(self, prefix, trademark_class):
+        """Hand an unfinished search back without counting it as an attempt"""
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute("UPDATE crawl_prefixes SET status = 'pending', attempts = attempts - 1 "
+                         "WHERE prefix = ? AND class = ? AND status = 'running'", (prefix, trademark_class))
+
+    def progress(self):
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) AS prefixes, COALESCE(SUM(results), 0) AS results "
+            "FROM crawl_prefixes GROUP BY status").fetchall()
+        summary = {status: 0 for status in ('pending', 'running', 'done', 'split', 'failed')}
+        summary.update({row['status']: row['prefixes'] for row in rows})
+        summary['rows_seen'] = sum(row['results'] for row in rows)
+        return summary
+
+
+class CaptchaRequest:
+    """A CAPTCHA waiting for a person - answer() wakes the browser thread that asked"""
+
+    def __init__(self, label, image):
+        self.label = label
+        self.image = image
+        self.answer_text = None
+        self.answered = threading.Event()
+
+    def answer(self, text):
+        self.answer_text = text
+        self.answered.set()
+
+
+class CrawlStopped(Exception):
+    pass
+
+
+def ask_captcha(captchas, stopping, label, captcha_data):
+    """Queue a base64 CAPTCHA for a person and wait for the answer; raises CrawlStopped when stopping"""
+    request = CaptchaRequest(label, base64.b64decode(captcha_data))
+    captchas.put(request)
+    while not request.answered.wait(1):
+        if stopping.is_set():
+            raise CrawlStopped()
+    if not request.answer_text:
+        raise CrawlStopped()
+    return request.answer_text
+
+
+def solve_captchas(job, captcha_dir):
+    """Ask in the terminal for each CAPTCHA a crawl or lookup job queues; an empty answer stops the job"""
+    os.makedirs(captcha_dir, exist_ok=True)
+    while job.running():
+        try:
+            request = job.captchas.get(timeout=1)
+        except queue.Empty:
+            continue
+        path = os.path.join(captcha_dir, f"{re.sub(r'[^A-Za-z0-9]+', '_', request.label).strip('_')}.png")
+        with open(path, 'wb') as f:
+            f.write(request.image)
+        answer = input(f"CAPTCHA for {request.label} ({path}, {job.captchas.qsize()} more waiting, "
+                       f"empty to stop): ").strip()
+        if not answer:
+            request.answer(None)
+            job.stop()
+            break
+        request.answer(answer)
+
+
+class RegistryCrawler:
+    def __init__(self, state, corpus, scraper_factory, browsers=1, result_cap=0,
+                 alphabet=ALPHABET, max_prefix_length=MAX_PREFIX_LENGTH):
+        self.state = state
+        self.corpus = corpus
+        self.scraper_factory = scraper_factory
+        self.browsers = browsers
+        self.result_cap = result_cap
+        self.alphabet = alphabet
+        self.max_prefix_length = max_prefix_length
+        self.captchas = queue.Queue()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.stats = {'searches': 0, 'rows': 0, 'splits': 0, 'wrong_captchas': 0, 'failures': 0}
+        self.stats_lock = threading.Lock()
+        self.started = None
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def start(self):
+        """Start one thread per browser; CAPTCHAs then arrive on self.captchas"""
+        self.started = time.time()
+        resumed = self.state.resume()
+        if resumed:
+            print(f"Resuming {resumed} interrupted search(es)")
+        for number in range(self.browsers):
+            thread = threading.Thread(target=self._browser_loop, name=f'crawl-browser-{number + 1}')
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def running(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def stop(self):
+        """Stop after the current searches; unanswered CAPTCHAs are handed back as pending"""
+        self.stopping.set()
+        while True:
+            try:
+                self.captchas.get_nowait().answer(None)
+            except queue.Empty:
+                break
+
+    def _browser_loop(self):
+        scraper = None
+        try:
+            while not self.stopping.is_set():
+                task = self.state.claim()
+                if task is None:
+                    # Another browser may still split a prefix into new work
+                    if self.state.progress()['running']:
+                        self.stopping.wait(2)
+                        continue
+                    break
+
+                prefix, trademark_class = task
+                scraper = scraper or self.scraper_factory()
+                try:
+                    self._crawl(scraper, prefix, trademark_class)
+                except CrawlStopped:
+                    self.state.release(prefix, trademark_class)
+                except CircuitOpenError as e:
+                    # The registry is down - wait for the breaker instead of burning attempts
+                    self.state.release(prefix, trademark_class)
+                    print(f"{e} - pausing")
+                    self.stopping.wait(30)
+                except Exception as e:
+                    self._count('failures')
+                    self.state.fail(prefix, trademark_class, str(e))
+                    print(f"Search '{prefix}' class {trademark_class or 'all'} failed: {e}")
+                    scraper.cleanup()
+                    scraper = None
+        finally:
+            if scraper:
+                scraper.cleanup()
+
+    def _crawl(self, scraper, prefix, trademark_class):
+        for _ in range(CAPTCHA_ATTEMPTS):
+            captcha_data = scraper.initialize_browser(prefix, trademark_class, 'Start With')
+            answer = ask_captcha(self.captchas, self.stopping,
+                                 f"'{prefix}' class {trademark_class or 'all'}", captcha_data)
+            try:
+                scraper.submit_search(answer)
+            except CaptchaError:
+                self._count('wrong_captchas')
+                scraper.park()
+                continue
+            except NoResultsError:
+                scraper.park()
+                self._count('searches')
+                self.state.finish(prefix, trademark_class, 0)
+                return
+
+            results = scraper.extract_results(keep_alive=True)
+            scraper.search_results = []
+            self.corpus.upsert_results(results)
+            self._count('searches')
+            self._count('rows', len(results))
+
+            capped = scraper.more_available or (self.result_cap and len(results) >= self.result_cap)
+            if capped and len(prefix) < self.max_prefix_length:
+                self._count('splits')
+                self.state.split(prefix, trademark_class, len(results), self.alphabet)
+                print(f"'{prefix}' class {trademark_class or 'all'}: {len(results)} rows, capped - split")
+            else:
+                self.state.finish(prefix, trademark_class, len(results))
+                print(f"'{prefix}' class {trademark_class or 'all'}: {len(results)} rows")
+            return
+        raise ScraperError(f"CAPTCHA answered wrongly {CAPTCHA_ATTEMPTS} times")
+
+    def snapshot(self):
+        elapsed = time.time() - self.started if self.started else 0
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['searches_per_hour'] = round(stats['searches'] * 3600 / elapsed, 1) if elapsed else 0
+        stats.update(self.state.progress())
+        return stats
@@ -50,7 +50,8 @@ class ExcelGenerator:
         # EXACT same headers as desktop version
         headers = [
             'S.No', 'Application Number', 'Wordmark', 'Proprietor', 
-            'Class', 'Status', 'Image', 'Search Parameters'
+            'Class', 'Status', 'Image', 'Search Parameters', 'Similarity',
+            'Similar Logos'
         ]
         
         # Add headers - SAME formatting as desktop
@@ -62,7 +63,7 @@ class ExcelGenerator:
             cell.border = header_border
         
         # EXACT same column widths as desktop version
-        column_widths = [8, 20, 25, 30, 8, 15, 25, 30]
+        column_widths = [8, 20, 25, 30, 8, 15, 25, 30, 12, 25]
         for col, width in enumerate(column_widths, 1):
             ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = width
         
@@ -82,7 +83,9 @@ class ExcelGenerator:
                 result.get('Class', ''),
                 result.get('Status', ''),
                 '',  # Image column will be filled with actual image
-                self._format_search_params(result)
+                self._format_search_params(result),
+                result.get('Similarity_Score', ''),  # Phonetic/fuzzy score vs searched wordmark
+                result.get('Similar_Logos', '')  # Near-duplicate logos by perceptual hash
             ]
             
             # Add text data
@@ -99,7 +102,7 @@ class ExcelGenerator:
         self._add_summary_section(ws, search_results)
         
         # SAME auto-filter as desktop version
-        ws.auto_filter.ref = f"A1:H{len(search_results) + 1}"
+        ws.auto_filter.ref = f"A1:J{len(search_results) + 1}"
         
         # Save to BytesIO for web download - equivalent to desktop file save
         excel_buffer = BytesIO()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Background Excel export jobs with an on-disk cache
+Workbooks are generated once per results version and served from disk afterwards
+Building a workbook is CPU-bound Python (openpyxl, Pillow), so it runs in a process pool and
+never competes with request threads for the GIL
+"""
+
+import os
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils import profiler
+from utils.result_store import SpilledResults
+
+# Text fields that make up a result row (Image_Data is hashed separately as bytes)
+RESULT_FIELDS = ('Application_Number', 'Wordmark', 'Proprietor', 'Class', 'Status',
+                 'Search_Wordmark', 'Search_Class', 'Search_Filter', 'Search_Date', 'Similarity_Score',
+                 'Similar_Logos')
+
+
+def results_version(search_results):
+    """Return a stable hash identifying the content of a result set"""
+    digest = hashlib.sha256()
+    for result in search_results:
+        for field in RESULT_FIELDS:
+            digest.update(str(result.get(field, '')).encode('utf-8'))
+            digest.update(b'\x1f')
+        image_data = result.get('Image_Data')
+        if image_data:
+            digest.update(image_data)
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def build_workbook(search_results, path, job_id, profile=False):
+    """Generate a workbook and atomically move it into the cache - runs in a pool process"""
+    from utils.excel_generator import ExcelGenerator
+
+    def build():
+        excel_file = ExcelGenerator().generate_excel(search_results)
+        tmp_path = f"{path}.{job_id}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(excel_file.getbuffer())
+        os.replace(tmp_path, path)
+
+    # Profiled when submitted from a profiled search, or by random sampling
+    profiler.wrap(build, 'excel_export', profile)()
+
+
+class ExportCache:
+    def __init__(self, cache_dir=None, max_workers=None, ttl=None):
+        self.cache_dir = cache_dir or os.environ.get(
+            'EXPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'trademark_exports'))
+        self.ttl = ttl if ttl is not None else int(os.environ.get('EXPORT_CACHE_TTL', 3600))
+        self.max_workers = max_workers or int(os.environ.get('EXPORT_WORKERS', 1))
+        self.pool = None        # started on the first export
+        self.jobs = {}          # job_id -> job dict
+        self.versions = {}      # results version -> job_id
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, version):
+        """Location of the cached workbook for a results version"""
+        return os.path.join(self.cache_dir, f"{version}.xlsx")
+
+    def submit(self, search_results, version=None):
+        """Queue an export for these results, reusing any job for the same version"""
+        version = version or results_version(search_results)
+        path = self.path_for(version)
+        with self.lock:
+            job_id = self.versions.get(version)
+            if job_id and self.jobs[job_id]['status'] in ('pending', 'running'):
+                return job_id
+            if job_id and self.jobs[job_id]['status'] == 'ready' and self._touch(path):
+                return job_id
+
+            job_id = str(uuid.uuid4())
+            job = {
+                'job_id': job_id,
+                'version': version,
+                'status': 'ready' if self._touch(path) else 'pending',
+                'path': path,
+                'error': None,
+                'created': time.time()
+            }
+            self.jobs[job_id] = job
+            self.versions[version] = job_id
+
+        if job['status'] == 'pending':
+            # Spilled results are sent as their path and read from disk by the job; in-memory lists are copied
+            rows = search_results if isinstance(search_results, SpilledResults) else list(search_results)
+            self._start(job_id, rows, path)
+        return job_id
+
+    def _start(self, job_id, search_results, path):
+        """Hand a job to the pool, replacing a pool broken by a crashed worker process"""
+        for _ in range(2):
+            with self.lock:
+                if self.pool is None:
+                    # spawn: the web process is multi-threaded, so forking it is unsafe
+                    self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+                pool = self.pool
+            try:
+                future = pool.submit(build_workbook, search_results, path, job_id, profiler.should_profile())
+                break
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+        else:
+            self._finish(job_id, None, Exception("Excel export workers are unavailable"))
+            return
+
+        with self.lock:
+            self.jobs[job_id]['status'] = 'running'
+        future.add_done_callback(lambda done: self._finish(job_id, pool, done.exception()))
+
+    def _discard_pool(self, pool):
+        with self.lock:
+            if self.pool is pool:
+                self.pool = None
+        pool.shutdown(wait=False)
+
+    def _touch(self, path):
+        """Mark a cached workbook as used now so prune() keeps it as long as the job; False if it is gone"""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def get_job(self, job_id):
+        """Return a copy of the job dict, or None if unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_cached_path(self, version):
+        """Return the cached workbook path if it has already been generated"""
+        path = self.path_for(version)
+        return path if os.path.exists(path) else None
+
+    def _finish(self, job_id, pool, error):
+        """Record a job's outcome - called on the pool's result thread"""
+        if isinstance(error, BrokenProcessPool):
+            self._discard_pool(pool)
+        if error:
+            print(f"Excel export job {job_id} failed: {error}")
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job:
+                job['status'] = 'error' if error else 'ready'
+                job['error'] = str(error) if error else None
+
+    def prune(self):
+        """Drop jobs and cached files older than the TTL"""
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job['created'] < cutoff and job['status'] in ('ready', 'error')]
+            for job_id in expired:
+                job = self.jobs.pop(job_id)
+                if self.versions.get(job['version']) == job_id:
+                    del self.versions[job['version']]
+
+        try:
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+        except OSError as e:
+            print(f"Export cache prune error: {e}")
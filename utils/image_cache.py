@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-sized logo variants for the results table
+Each variant is rendered lazily, at most once per image hash, and kept on disk
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+from io import BytesIO
+
+# Variant name -> bounding box (None keeps the original size)
+IMAGE_SIZES = {
+    'thumb': (100, 50),   # Same box as the Excel image column
+    'full': None
+}
+
+IMAGE_FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp')
+}
+
+
+def image_hash(image_data):
+    """Content hash used to key cached variants"""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def build_image_index(search_results):
+    """Map Application_Number -> (image hash, image bytes) for rows that have a logo"""
+    index = {}
+    for result in search_results:
+        image_data = result.get('Image_Data')
+        app_num = result.get('Application_Number')
+        if image_data and app_num:
+            index[app_num] = (image_hash(image_data), image_data)
+    return index
+
+
+class ImageVariantCache:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.environ.get(
+            'IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'trademark_images'))
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, digest, size, image_format):
+        """Location of a cached variant"""
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}_{size}.{image_format}")
+
+    def get_variant(self, image_data, size='thumb', image_format='png', digest=None):
+        """Return the path of the requested variant, rendering it on first use"""
+        if size not in IMAGE_SIZES:
+            raise ValueError(f"Unknown image size: {size}")
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format: {image_format}")
+
+        digest = digest or image_hash(image_data)
+        path = self.path_for(digest, size, image_format)
+        if os.path.exists(path):
+            return path
+
+        # One lock per variant so concurrent requests render it only once
+        key = (digest, size, image_format)
+        with self.locks_lock:
+            lock = self.locks.setdefault(key, threading.Lock())
+
+        try:
+            with lock:
+                if not os.path.exists(path):
+                    self._render(image_data, size, image_format, path)
+        finally:
+            with self.locks_lock:
+                self.locks.pop(key, None)
+
+        return path
+
+    def _render(self, image_data, size, image_format, path):
+        """Resize and encode one variant, then atomically move it into place"""
+        from PIL import Image as PILImage
+
+        pil_image = PILImage.open(BytesIO(image_data))
+        box = IMAGE_SIZES[size]
+        if box:
+            pil_image.thumbnail(box, PILImage.Resampling.LANCZOS)
+
+        if pil_image.mode not in ('RGB', 'RGBA'):
+            pil_image = pil_image.convert('RGBA')
+
+        pil_format = IMAGE_FORMATS[image_format][0]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            if pil_format == 'WEBP':
+                pil_image.save(f, format=pil_format, quality=85, method=4)
+            else:
+                pil_image.save(f, format=pil_format, optimize=True)
+        os.replace(tmp_path, path)
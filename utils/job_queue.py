@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Durable search job queue shared by the web processes and the scraper workers (scraper_worker.py)
+Searches and their start/submit jobs live in SQLite, so any web process can answer a user's polls
+and searches survive web worker restarts. The browser for a search stays in the scraper worker
+that started it, so the CAPTCHA submit job is addressed to that worker.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+
+from utils.corpus import SQLiteStore
+
+DEFAULT_QUEUE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'job_queue.db')
+
+# A worker that has not sent a heartbeat for this long is considered dead
+WORKER_STALE_AFTER = int(os.environ.get('SCRAPER_WORKER_STALE_AFTER', 30))
+JOB_MAX_ATTEMPTS = 3
+
+ACTIVE_STATUSES = ('queued', 'initializing', 'captcha_ready', 'searching')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    error_type TEXT,
+    error_message TEXT,
+    captcha BLOB,
+    captcha_version TEXT,
+    worker_id TEXT,
+    results_path TEXT,
+    results_count INTEGER,
+    results_version TEXT,
+    image_index TEXT,
+    watch_run TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_searches_session ON searches(session_id, created);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    search_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    worker_id TEXT,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, id);
+
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    capacity INTEGER NOT NULL,
+    active INTEGER NOT NULL DEFAULT 0,
+    started REAL NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+# Search columns a worker may publish
+SEARCH_FIELDS = ('status', 'progress', 'message', 'error_type', 'error_message', 'captcha', 'captcha_version',
+                 'worker_id', 'results_path', 'results_count', 'results_version', 'image_index', 'watch_run')
+
+
+class JobQueue(SQLiteStore):
+    schema = SCHEMA
+
+    def __init__(self, db_path=None):
+        super().__init__(db_path or os.environ.get('JOB_QUEUE_DB_PATH', DEFAULT_QUEUE_PATH))
+
+    def _write(self, func):
+        """Run func(conn) in an immediate transaction - serialised across processes by SQLite"""
+        conn = self._connect()
+        with self.write_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(conn)
+                conn.execute('COMMIT')
+                return result
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    # Web side
+
+    def create_search(self, session_id, params):
+        """Queue a new search for a session, cancelling the session's previous one"""
+        search_id = uuid.uuid4().hex
+        now = time.time()
+
+        def write(conn):
+            conn.execute(f"UPDATE searches SET status = 'cancelled', updated = ? WHERE session_id = ? "
+                         f"AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                         (now, session_id) + ACTIVE_STATUSES)
+            conn.execute("INSERT INTO searches (id, session_id, params, status, message, created, updated) "
+                         "VALUES (?, ?, ?, 'queued', 'Waiting for a scraper worker...', ?, ?)",
+                         (search_id, session_id, json.dumps(params), now, now))
+            conn.execute("INSERT INTO jobs (search_id, kind, created) VALUES (?, 'start', ?)", (search_id, now))
+        self._write(write)
+        return search_id
+
+    def submit_captcha(self, search_id, captcha):
+        """Queue the CAPTCHA answer for the worker holding the search's browser; False if not awaiting one"""
+        now = time.time()
+
+        def write(conn):
+            row = conn.execute("SELECT worker_id FROM searches WHERE id = ? AND status = 'captcha_ready'",
+                               (search_id,)).fetchone()
+            if not row:
+                return False
+            conn.execute("UPDATE searches SET status = 'searching', progress = 0, message = 'Starting search...', "
+                         "updated = ? WHERE id = ?", (now, search_id))
+            conn.execute("INSERT INTO jobs (search_id, kind, payload, worker_id, created) VALUES (?, 'submit', ?, ?, ?)",
+                         (search_id, json.dumps({'captcha': captcha}), row['worker_id'], now))
+            return True
+        return self._write(write)
+
+    def cancel_session(self, session_id):
+        """Cancel a session's searches when it resets - a worker holding the browser closes it"""
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute("UPDATE searches SET status = 'cancelled', updated = ? WHERE session_id = ? "
+                         "AND status != 'cancelled'", (time.time(), session_id))
+
+    def latest_search(self, session_id):
+        """Status columns of a session's latest search - CAPTCHA and results are read with get_search()"""
+        row = self._connect().execute(
+            "SELECT id, status, progress, message, error_type, error_message, captcha_version, updated "
+            "FROM searches WHERE session_id = ? ORDER BY created DESC LIMIT 1", (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_search(self, search_id):
+        row = self._connect().execute("SELECT * FROM searches WHERE id = ?", (search_id,)).fetchone()
+        return self._search(row)
+
+    @staticmethod
+    def _search(row):
+        if row is None:
+            return None
+        search = dict(row)
+        search['params'] = json.loads(search['params'])
+        for field in ('image_index', 'watch_run'):
+            search[field] = json.loads(search[field]) if search[field] else None
+        return search
+
+    # Worker side
+
+    def claim(self, worker_id, accept_new=True):
+        """Take the oldest job addressed to this worker, or an unaddressed start job if there is capacity"""
+        def write(conn):
+            sql = "SELECT * FROM jobs WHERE state = 'queued' AND (worker_id = ?"
+            if accept_new:
+                sql += " OR worker_id IS NULL"
+            row = conn.execute(sql + ") ORDER BY id LIMIT 1", (worker_id,)).fetchone()
+            if not row:
+                return None
+            conn.execute("UPDATE jobs SET state = 'running', worker_id = ?, attempts = attempts + 1 WHERE id = ?",
+                         (worker_id, row['id']))
+            if row['kind'] == 'start':
+                conn.execute("UPDATE searches SET worker_id = ?, status = 'initializing', "
+                             "message = 'Initializing browser...', updated = ? WHERE id = ? AND status = 'queued'",
+                             (worker_id, time.time(), row['search_id']))
+            job = dict(row, worker_id=worker_id, state='running', attempts=row['attempts'] + 1)
+            job['payload'] = json.loads(job['payload'])
+            return job
+        return self._write(write)
+
+    def finish_job(self, job_id, state='done'):
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute("UPDATE jobs SET state = ? WHERE id = ?", (state, job_id))
+
+    def update_search(self, search_id, **fields):
+        """Publish a search's status, progress, CAPTCHA or results - a cancelled search stays cancelled"""
+        unknown = set(fields) - set(SEARCH_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown search fields: {', '.join(sorted(unknown))}")
+        for field in ('image_index', 'watch_run'):
+            if field in fields and fields[field] is not None:
+                fields[field] = json.dumps(fields[field])
+
+        assignments = ', '.join(f'{field} = ?' for field in fields)
+        conn = self._connect()
+        with self.write_lock, conn:
+            cursor = conn.execute(f"UPDATE searches SET {assignments}, updated = ? WHERE id = ? AND status != 'cancelled'",
+                                  list(fields.values()) + [time.time(), search_id])
+        return cursor.rowcount > 0
+
+    def search_statuses(self, search_ids):
+        """{search_id: status} - lets a worker notice searches cancelled while it holds their browser"""
+        search_ids = list(search_ids)
+        if not search_ids:
+            return {}
+        rows = self._connect().execute(
+            f"SELECT id, status FROM searches WHERE id IN ({','.join('?' * len(search_ids))})", search_ids)
+        return {row['id']: row['status'] for row in rows}
+
+    def heartbeat(self, worker_id, capacity, active):
+        now = time.time()
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute("""
+                INSERT INTO workers (id, host, pid, capacity, active, started, heartbeat) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET capacity = excluded.capacity, active = excluded.active,
+                                              heartbeat = excluded.heartbeat
+            """, (worker_id, socket.gethostname(), os.getpid(), capacity, active, now, now))
+
+    def retire(self, worker_id):
+        """Deregister a stopping worker, handing its jobs and searches to recover()"""
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute("UPDATE workers SET heartbeat = 0 WHERE id = ?", (worker_id,))
+        self.recover()
+
+    def recover(self, stale_after=WORKER_STALE_AFTER):
+        """Requeue start jobs of dead workers and fail the searches whose browser died with them"""
+        cutoff = time.time() - stale_after
+
+        def write(conn):
+            dead = [row['id'] for row in conn.execute("SELECT id FROM workers WHERE heartbeat < ?", (cutoff,))]
+            if not dead:
+                return 0
+            marks = ','.join('?' * len(dead))
+            # A start job can simply run again elsewhere; a submit needs the browser that died
+            conn.execute(f"UPDATE jobs SET state = 'queued', worker_id = NULL WHERE state = 'running' "
+                         f"AND kind = 'start' AND attempts < ? AND worker_id IN ({marks})", [JOB_MAX_ATTEMPTS] + dead)
+            conn.execute(f"UPDATE searches SET status = 'queued', worker_id = NULL, message = 'Waiting for a scraper worker...', "
+                         f"updated = ? WHERE status = 'initializing' AND worker_id IN ({marks}) "
+                         f"AND id IN (SELECT search_id FROM jobs WHERE state = 'queued' AND kind = 'start')",
+                         [time.time()] + dead)
+            conn.execute(f"UPDATE jobs SET state = 'failed' WHERE state IN ('queued', 'running') "
+                         f"AND worker_id IN ({marks})", dead)
+            failed = conn.execute(
+                f"UPDATE searches SET status = 'error', error_type = 'worker_lost', "
+                f"error_message = 'The scraper worker running this search stopped - please search again', "
+                f"updated = ? WHERE status IN ('initializing', 'captcha_ready', 'searching') AND worker_id IN ({marks})",
+                [time.time()] + dead).rowcount
+            conn.execute(f"DELETE FROM workers WHERE id IN ({marks})", dead)
+            print(f"Recovered from {len(dead)} dead scraper worker(s), {failed} search(es) lost")
+            return len(dead)
+        return self._write(write)
+
+    def prune(self, max_age):
+        """Delete finished searches and jobs older than max_age; returns the result files to remove"""
+        cutoff = time.time() - max_age
+
+        def write(conn):
+            paths = [row['results_path'] for row in conn.execute(
+                "SELECT results_path FROM searches WHERE updated < ? AND results_path IS NOT NULL", (cutoff,))]
+            conn.execute("DELETE FROM jobs WHERE search_id IN (SELECT id FROM searches WHERE updated < ?)", (cutoff,))
+            conn.execute("DELETE FROM searches WHERE updated < ?", (cutoff,))
+            return paths
+        return self._write(write)
+
+    def snapshot(self):
+        """Queue depth and live workers"""
+        conn = self._connect()
+        jobs = {row['state']: row['count'] for row in conn.execute(
+            "SELECT state, COUNT(*) AS count FROM jobs WHERE state IN ('queued', 'running') GROUP BY state")}
+        cutoff = time.time() - WORKER_STALE_AFTER
+        workers = [dict(row) for row in conn.execute(
+            "SELECT id, host, pid, capacity, active, heartbeat FROM workers WHERE heartbeat >= ?", (cutoff,))]
+        return {
+            'queued_jobs': jobs.get('queued', 0),
+            'running_jobs': jobs.get('running', 0),
+            'workers': len(workers),
+            'capacity': sum(worker['capacity'] for worker in workers),
+            'active_browsers': sum(worker['active'] for worker in workers)
+        }
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Perceptual-hash similarity for trademark logos (device marks)
+aHash/dHash/pHash are computed once per image and pHashes are kept in a BK-tree
+so near-duplicates within a Hamming radius are found without a full scan
+"""
+
+import os
+import hashlib
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_RADIUS = int(os.environ.get('LOGO_HASH_RADIUS', 8))
+
+# Below this many images hashing runs inline - process start-up would cost more
+PARALLEL_THRESHOLD = 64
+
+
+def _dct_matrix(size):
+    """Orthonormal DCT-II basis matrix"""
+    matrix = np.zeros((size, size))
+    for k in range(size):
+        scale = np.sqrt(1.0 / size) if k == 0 else np.sqrt(2.0 / size)
+        for n in range(size):
+            matrix[k, n] = scale * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    return matrix
+
+
+DCT_32 = _dct_matrix(32)
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def compute_hashes(image_data):
+    """Return (ahash, dhash, phash) as 64-bit ints for an encoded image"""
+    from PIL import Image as PILImage
+
+    pil_image = PILImage.open(BytesIO(image_data))
+    if pil_image.mode in ('RGBA', 'LA', 'P'):
+        # Flatten transparent logos onto white, as they are displayed
+        pil_image = pil_image.convert('RGBA')
+        background = PILImage.new('RGBA', pil_image.size, (255, 255, 255, 255))
+        pil_image = PILImage.alpha_composite(background, pil_image)
+    gray = pil_image.convert('L')
+
+    small = np.asarray(gray.resize((8, 8), PILImage.Resampling.LANCZOS), dtype=np.float64)
+    ahash = _bits_to_int(small > small.mean())
+
+    wide = np.asarray(gray.resize((9, 8), PILImage.Resampling.LANCZOS), dtype=np.float64)
+    dhash = _bits_to_int(wide[:, 1:] > wide[:, :-1])
+
+    pixels = np.asarray(gray.resize((32, 32), PILImage.Resampling.LANCZOS), dtype=np.float64)
+    low_freq = (DCT_32 @ pixels @ DCT_32.T)[:8, :8]
+    phash = _bits_to_int(low_freq > np.median(low_freq.flatten()[1:]))
+
+    return ahash, dhash, phash
+
+
+def _hash_one(image_data):
+    try:
+        return compute_hashes(image_data)
+    except Exception as e:
+        print(f"Logo hash error: {e}")
+        return None
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes using Hamming distance"""
+
+    def __init__(self):
+        self.root = None    # [hash, [ids], {distance: child}]
+        self.size = 0
+
+    def add(self, value, item_id):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item_id], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item_id], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """Yield (distance, item_id) for every entry within radius of value"""
+        if self.root is None:
+            return
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                for item_id in node[1]:
+                    yield distance, item_id
+            # Triangle inequality: only children in [d - r, d + r] can match
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+
+
+class LogoIndex:
+    def __init__(self, corpus, max_workers=None):
+        self.corpus = corpus
+        self.max_workers = max_workers or int(os.environ.get('LOGO_HASH_WORKERS', os.cpu_count() or 1))
+        self.tree = BKTree()
+        self.hashes = {}    # application_number -> (ahash, dhash, phash)
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        self.loaded = False
+
+    def _load(self):
+        """Populate the BK-tree from hashes already stored in the corpus"""
+        with self.lock:
+            if self.loaded:
+                return
+            for app_num, ahash, dhash, phash in self.corpus.iter_logos():
+                self._index(app_num, (ahash, dhash, phash))
+            self.loaded = True
+
+    def _index(self, app_num, hashes):
+        previous = self.hashes.get(app_num)
+        self.hashes[app_num] = hashes
+        if previous is None or previous[2] != hashes[2]:
+            # Stale tree entries are filtered against self.hashes on lookup
+            self.tree.add(hashes[2], app_num)
+
+    def _hash_batch(self, images):
+        """Hash a list of image bytes, spreading large batches across cores"""
+        if len(images) < PARALLEL_THRESHOLD or self.max_workers <= 1:
+            return [_hash_one(image_data) for image_data in images]
+
+        with self.pool_lock:
+            if self.pool is None:
+                # spawn: the web process is multi-threaded, so forking it is unsafe
+                self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        chunksize = max(1, len(images) // (self.max_workers * 4))
+        return list(self.pool.map(_hash_one, images, chunksize=chunksize))
+
+    def add_results(self, search_results):
+        """Hash new logos (once per image) and add them to the index and corpus"""
+        self._load()
+
+        logo_marks = {}
+        for result in search_results:
+            if result.get('Image_Data') and result.get('Application_Number'):
+                logo_marks[result['Application_Number']] = hashlib.sha256(result['Image_Data']).hexdigest()
+        if not logo_marks:
+            return
+
+        known = self.corpus.get_logo_hashes(set(logo_marks.values()))
+        pending = {}
+        for result in search_results:
+            image_sha = logo_marks.get(result.get('Application_Number'))
+            if image_sha and image_sha not in known and image_sha not in pending:
+                pending[image_sha] = result['Image_Data']
+
+        new_hashes = {}
+        if pending:
+            for image_sha, hashes in zip(pending, self._hash_batch(list(pending.values()))):
+                if hashes:
+                    new_hashes[image_sha] = hashes
+        known.update(new_hashes)
+
+        linked = {app_num: image_sha for app_num, image_sha in logo_marks.items() if image_sha in known}
+        self.corpus.upsert_logos(new_hashes, linked)
+
+        with self.lock:
+            for app_num, image_sha in linked.items():
+                self._index(app_num, known[image_sha])
+
+    def find_similar(self, application_number, radius=DEFAULT_RADIUS, limit=50):
+        """Logos within radius (pHash Hamming distance) of the given mark's logo"""
+        self._load()
+        with self.lock:
+            hashes = self.hashes.get(application_number)
+            if hashes is None:
+                return None
+            matches = []
+            seen = set()
+            for distance, app_num in self.tree.search(hashes[2], radius):
+                current = self.hashes.get(app_num)
+                if app_num == application_number or app_num in seen or current is None:
+                    continue
+                if hamming(current[2], hashes[2]) != distance:
+                    continue    # stale entry from an earlier logo
+                seen.add(app_num)
+                matches.append({
+                    'Application_Number': app_num,
+                    'phash_distance': distance,
+                    'ahash_distance': hamming(current[0], hashes[0]),
+                    'dhash_distance': hamming(current[1], hashes[1])
+                })
+
+        matches.sort(key=lambda match: (match['phash_distance'], match['dhash_distance']))
+        return matches[:limit]
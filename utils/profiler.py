@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in sampling profiler for requests and background jobs
+A sampler thread snapshots the profiled thread's stack every few milliseconds and the samples are
+written as collapsed stacks (for flamegraph.pl / speedscope) plus a self-contained SVG flamegraph
+Nothing is installed or sampled unless PROFILING_ENABLED is set or PROFILE_SAMPLE_RATE > 0
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import tempfile
+import threading
+import zlib
+from collections import Counter
+from html import escape
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'trademark_profiles'))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_HEADER = 'X-Profile'
+
+# True when any profiling can happen in this process - hooks are only installed if so
+ACTIVE = PROFILING_ENABLED or PROFILE_SAMPLE_RATE > 0
+
+# Profiles running on each thread, so jobs started from a profiled thread are profiled too
+_current = threading.local()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a helper thread until stopped"""
+
+    def __init__(self, name, thread_id=None, interval=PROFILE_INTERVAL):
+        self.name = name
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.sampler = None
+        self.started = None
+        self.elapsed = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.sampler = threading.Thread(target=self._sample, name=f'profiler-{self.name}')
+        self.sampler.daemon = True
+        self.sampler.start()
+        return self
+
+    def _sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        if self.sampler:
+            self.sampler.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self.samples
+
+    def write(self, profile_dir=None):
+        """Write <name>.folded and <name>.svg to the profile directory; returns the base path"""
+        profile_dir = profile_dir or PROFILE_DIR
+        os.makedirs(profile_dir, exist_ok=True)
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in self.name)
+        base = os.path.join(profile_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_{safe_name}_{uuid.uuid4().hex[:8]}")
+
+        with open(f'{base}.folded', 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        with open(f'{base}.svg', 'w', encoding='utf-8') as f:
+            f.write(render_flamegraph(self.samples, f'{self.name} - {self.elapsed * 1000:.0f} ms, '
+                                                    f'{sum(self.samples.values())} samples'))
+        print(f"Profile written: {base}.svg ({self.elapsed * 1000:.0f} ms)")
+        return base
+
+
+def render_flamegraph(samples, title, width=1200, row_height=16):
+    """Minimal SVG flamegraph (root at the bottom) from collapsed stacks"""
+    root = {'children': {}, 'count': 0}
+    for stack, count in samples.items():
+        node = root
+        node['count'] += count
+        for frame in stack.split(';'):
+            node = node['children'].setdefault(frame, {'children': {}, 'count': 0})
+            node['count'] += count
+
+    rects = []
+
+    def layout(node, label, x, depth):
+        rects.append((label, x, depth, node['count']))
+        for child_label, child in sorted(node['children'].items()):
+            layout(child, child_label, x, depth + 1)
+            x += child['count']
+
+    layout(root, 'all', 0, 0)
+    total = max(root['count'], 1)
+    max_depth = max(depth for _, _, depth, _ in rects)
+    height = (max_depth + 1) * row_height + 40
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'font-family="Verdana" font-size="11">',
+             f'<text x="{width / 2}" y="18" text-anchor="middle" font-size="14">{escape(title)}</text>']
+    for label, x, depth, count in rects:
+        rect_width = count / total * width
+        if rect_width < 0.5:
+            continue
+        left = x / total * width
+        top = height - (depth + 1) * row_height
+        hue = zlib.crc32(label.encode('utf-8')) % 60
+        tooltip = escape(f'{label} - {count} samples ({count / total:.1%})')
+        parts.append(f'<g><title>{tooltip}</title>'
+                     f'<rect x="{left:.1f}" y="{top}" width="{rect_width:.1f}" height="{row_height - 1}" '
+                     f'fill="hsl({hue}, 85%, 60%)"/>')
+        max_chars = int(rect_width / 7)
+        if max_chars > 3:
+            text = label if len(label) <= max_chars else label[:max_chars - 2] + '..'
+            parts.append(f'<text x="{left + 3:.1f}" y="{top + row_height - 4}">{escape(text)}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def sampled():
+    """Random sampling decision for requests and jobs (PROFILE_SAMPLE_RATE)"""
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def is_profiling():
+    """True if the current thread is being profiled"""
+    return bool(getattr(_current, 'profile', None))
+
+
+def should_profile(headers=None):
+    """Profile this request/job? Header (when PROFILING_ENABLED), random sampling, or a profiled parent"""
+    if not ACTIVE:
+        return False
+    if PROFILING_ENABLED and headers is not None:
+        value = headers.get(PROFILE_HEADER)
+        if value and (not PROFILE_TOKEN or value == PROFILE_TOKEN):
+            return True
+    return is_profiling() or sampled()
+
+
+def wrap(func, name, enabled):
+    """Return func, or a wrapper that profiles each call of it on whatever thread it runs"""
+    if not enabled:
+        return func
+
+    def profiled(*args, **kwargs):
+        profiler = SamplingProfiler(name).start()
+        _current.profile = profiler
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.profile = None
+            profiler.stop()
+            try:
+                profiler.write()
+            except OSError as e:
+                print(f"Profile write error: {e}")
+    return profiled
+
+
+def install(app):
+    """Profile Flask requests selected by should_profile(); a no-op unless profiling is active"""
+    if not ACTIVE:
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def start_request_profile():
+        if should_profile(request.headers):
+            g.profiler = SamplingProfiler(f'{request.method}_{request.path}').start()
+            _current.profile = g.profiler
+
+    def finish():
+        profiler = g.pop('profiler', None)
+        if not profiler:
+            return None
+        _current.profile = None
+        profiler.stop()
+        try:
+            return os.path.basename(profiler.write())
+        except OSError as e:
+            print(f"Profile write error: {e}")
+
+    @app.after_request
+    def stop_request_profile(response):
+        profile_id = finish()
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def stop_failed_request_profile(error=None):
+        finish()    # after_request is skipped when the view raised
+
+    print(f"Profiling enabled (header: {PROFILING_ENABLED}, sample rate: {PROFILE_SAMPLE_RATE}) -> {PROFILE_DIR}")
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Registry resilience primitives - classified errors, retries, a shared circuit breaker and
+an outbound rate limiter shared by every thread and gunicorn worker
+Kept free of Selenium so the web tier can use them without loading the browser stack
+"""
+
+import os
+import re
+import time
+import random
+import struct
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Fail-fast timeouts (seconds) - a healthy registry answers well within these
+PAGE_LOAD_TIMEOUT = int(os.environ.get('REGISTRY_PAGE_TIMEOUT', 15))
+RESULT_TIMEOUT = int(os.environ.get('REGISTRY_RESULT_TIMEOUT', 20))
+POLL_INTERVAL = 0.25
+
+# Bounded retries with jittered exponential backoff for transient failures
+RETRY_ATTEMPTS = int(os.environ.get('REGISTRY_RETRIES', 3))
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 8.0
+
+# Outbound pacing: sustained requests per second and burst, shared by all workers on this host
+RATE_LIMIT = float(os.environ.get('REGISTRY_RATE_LIMIT', 2.0))
+RATE_BURST = float(os.environ.get('REGISTRY_RATE_BURST', 5))
+RATE_MAX_WAIT = float(os.environ.get('REGISTRY_RATE_MAX_WAIT', 60))
+RATE_STATE_FILE = os.environ.get('REGISTRY_RATE_FILE', os.path.join(tempfile.gettempdir(), 'trademark_registry_rate'))
+
+# Page text that identifies each outcome of a search postback
+CAPTCHA_ERROR_PATTERN = re.compile(r'(invalid|incorrect|wrong|enter (the )?valid)\W+(security )?(code|captcha)'
+                                   r'|captcha\W+(is )?(invalid|incorrect|wrong|does not match)', re.IGNORECASE)
+NO_RESULTS_PATTERN = re.compile(r'no (record|data|result|match)s?( found)?', re.IGNORECASE)
+SITE_DOWN_PATTERN = re.compile(r'service (temporarily )?unavailable|bad gateway|gateway time-?out'
+                               r"|server error in '/' application|runtime error|site can.t be reached"
+                               r'|err_(connection|name|timed|internet)', re.IGNORECASE)
+
+
+class ScraperError(Exception):
+    """Base class for classified registry failures"""
+    error_type = 'error'
+
+
+class CaptchaError(ScraperError):
+    """The registry rejected the CAPTCHA text"""
+    error_type = 'captcha'
+
+
+class NoResultsError(ScraperError):
+    """The search ran but matched nothing"""
+    error_type = 'no_results'
+
+
+class RegistryUnavailableError(ScraperError):
+    """The registry is slow, down or returning error pages"""
+    error_type = 'site_down'
+
+
+class CircuitOpenError(RegistryUnavailableError):
+    """Rejected without trying because the registry is known to be unhealthy"""
+    error_type = 'circuit_open'
+
+
+class RateLimitedError(ScraperError):
+    """Too many searches queued for the registry - the wait would be too long"""
+    error_type = 'rate_limited'
+
+
+class CircuitBreaker:
+    """Shared across sessions: opens after repeated site-down failures, probes again after a cool-down"""
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or int(os.environ.get('REGISTRY_FAILURE_THRESHOLD', 5))
+        self.reset_timeout = reset_timeout or int(os.environ.get('REGISTRY_RESET_TIMEOUT', 60))
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead (one probe at a time when half-open)"""
+        with self.lock:
+            state = self._state()
+            if state == 'closed':
+                return
+            if state == 'half_open' and not self.probing:
+                self.probing = True
+                return
+            retry_in = max(0, int(self.reset_timeout - (time.time() - self.opened_at)))
+            raise CircuitOpenError(f"Trademark registry appears to be down - please retry in {retry_in or 'a few'} seconds")
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release_probe(self):
+        """Let another call probe after one that ended without a verdict"""
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    print(f"Circuit breaker opened after {self.failures} registry failures")
+                self.opened_at = time.time()
+            self.probing = False
+
+    def snapshot(self):
+        with self.lock:
+            return {'state': self._state(), 'failures': self.failures}
+
+
+# One breaker per process, shared by every session's scraper
+registry_breaker = CircuitBreaker()
+
+
+class TokenBucket:
+    """Token bucket over a small state file, so every thread and gunicorn worker draws from one budget
+
+    Callers reserve a token under an exclusive flock and, if the bucket is empty, sleep until their
+    token is due - the balance goes negative, which queues concurrent callers in arrival order.
+    Without fcntl (Windows) the bucket is shared by the threads of this process only.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, path=RATE_STATE_FILE, max_wait=RATE_MAX_WAIT):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.path = path
+        self.max_wait = max_wait
+        self.enabled = rate > 0
+        self.shared = fcntl is not None
+        self.fd = None
+        self.fd_pid = None
+        self.tokens = self.burst    # In-process state when the file cannot be shared
+        self.updated = time.time()
+        self.lock = threading.Lock()
+        self.stats = {'granted': 0, 'delayed': 0, 'rejected': 0, 'waiting': 0,
+                      'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'by_kind': {}}
+
+    def _state_fd(self):
+        # flock is per open file, and a descriptor inherited across fork would share it
+        if self.fd is None or self.fd_pid != os.getpid():
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self.fd_pid = os.getpid()
+        return self.fd
+
+    def _reserve(self, now):
+        """Take a token, returning the seconds until it may be used, or None if that is over max_wait"""
+        with self.lock:
+            if not self.shared:
+                tokens, updated = self.tokens, self.updated
+                self.tokens, self.updated, wait = self._take(tokens, updated, now)
+                return wait
+
+            fd = self._state_fd()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, 16, 0)
+                tokens, updated = struct.unpack('<dd', data) if len(data) == 16 else (self.burst, now)
+                tokens, updated, wait = self._take(tokens, updated, now)
+                if wait is not None:
+                    os.pwrite(fd, struct.pack('<dd', tokens, updated), 0)
+                return wait
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _take(self, tokens, updated, now):
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+        wait = max(0.0, (1 - tokens) / self.rate)
+        if wait > self.max_wait:
+            return tokens, now, None
+        return tokens - 1, now, wait
+
+    def acquire(self, kind='request'):
+        """Block until the next registry request may be sent; returns the seconds waited"""
+        if not self.enabled:
+            return 0.0
+        wait = self._reserve(time.time())
+        if wait is None:
+            with self.lock:
+                self.stats['rejected'] += 1
+            raise RateLimitedError("Too many searches are queued for the trademark registry - please try again shortly")
+
+        if wait > 0:
+            with self.lock:
+                self.stats['waiting'] += 1
+            try:
+                time.sleep(wait)
+            finally:
+                with self.lock:
+                    self.stats['waiting'] -= 1
+
+        with self.lock:
+            self.stats['granted'] += 1
+            self.stats['by_kind'][kind] = self.stats['by_kind'].get(kind, 0) + 1
+            if wait > 0:
+                self.stats['delayed'] += 1
+                self.stats['wait_seconds'] += wait
+                self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], wait)
+        return wait
+
+    def snapshot(self):
+        """Configuration and this worker's queueing metrics"""
+        with self.lock:
+            stats = dict(self.stats, by_kind=dict(self.stats['by_kind']))
+        granted = stats['granted']
+        stats['avg_wait_ms'] = round(1000 * stats['wait_seconds'] / granted, 1) if granted else 0.0
+        stats['max_wait_ms'] = round(1000 * stats.pop('max_wait_seconds'), 1)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 2)
+        return dict(stats, enabled=self.enabled, shared_across_workers=self.shared,
+                    rate_per_second=self.rate, burst=self.burst, max_wait_seconds=self.max_wait)
+
+
+# One bucket per host: every session's scraper in every worker paces its page loads and postbacks here
+registry_limiter = TokenBucket()
+
+
+def retry_with_backoff(func, attempts=None, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """Call func, retrying RegistryUnavailableError with full-jitter exponential backoff"""
+    attempts = attempts or RETRY_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except CircuitOpenError:
+            raise
+        except RegistryUnavailableError as e:
+            if attempt == attempts:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+            print(f"Registry attempt {attempt}/{attempts} failed ({e}) - retrying in {delay:.1f}s")
+            time.sleep(delay)
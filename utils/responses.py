@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Response layer: fast JSON serialization and gzip/brotli compression of large payloads
+orjson and brotli are optional - without them the stdlib encoder and gzip are used
+"""
+
+import os
+import gzip
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are not worth the CPU (and often grow when compressed)
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when it is installed
+
+    Keys are not sorted and output is compact. Values orjson cannot handle natively
+    fall back to Flask's own default() (dates, decimals, UUIDs, dataclasses).
+    """
+    sort_keys = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # Straight to bytes - no str round trip
+        body = orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def choose_encoding(accept_encodings):
+    """Best supported Content-Encoding for a request's Accept-Encoding, or None"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response, accept_encodings):
+    """Compress a buffered response in place if it is large, compressible and the client accepts it"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 206, 304) or 'Content-Encoding' in response.headers):
+        return response
+    if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if not encoding:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def install(app):
+    """Use the fast JSON provider and compress large responses"""
+    from flask import request
+
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def compress_large_responses(response):
+        return compress_response(response, request.accept_encodings)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Per-session on-disk store for large result sets
+Result lists over RESULT_SPILL_MB, or older than RESULT_SPILL_AGE, are moved out of worker memory
+into a SQLite file; SpilledResults reads them back in batches and behaves like the list it replaced
+"""
+
+import os
+import uuid
+import pickle
+import shutil
+import socket
+import sqlite3
+import tempfile
+from contextlib import closing
+
+RESULT_STORE_DIR = os.environ.get('RESULT_STORE_DIR', os.path.join(tempfile.gettempdir(), 'trademark_results'))
+# Estimated in-memory size above which a finished result set is spilled (0 spills every result set)
+RESULT_SPILL_MB = float(os.environ.get('RESULT_SPILL_MB', 8))
+# Seconds a finished result set may stay in memory before it is spilled regardless of size
+RESULT_SPILL_AGE = int(os.environ.get('RESULT_SPILL_AGE', 300))
+
+BATCH_SIZE = 500
+ROW_OVERHEAD = 1024  # Rough per-row cost of the dict and its strings, on top of the logo bytes
+
+SCHEMA = """
+CREATE TABLE rows (
+    idx INTEGER PRIMARY KEY,
+    application_number TEXT,
+    row BLOB NOT NULL,
+    image BLOB
+);
+CREATE INDEX idx_rows_application_number ON rows(application_number);
+"""
+
+
+def estimate_size(search_results):
+    """Approximate resident bytes of a result list - dominated by the logo images"""
+    return sum(len(result.get('Image_Data') or b'') + ROW_OVERHEAD for result in search_results)
+
+
+def should_spill(search_results, completed_at, now):
+    """True for in-memory results that are too big or have been kept too long"""
+    if isinstance(search_results, SpilledResults) or not search_results:
+        return False
+    if estimate_size(search_results) >= RESULT_SPILL_MB * 1024 * 1024:
+        return True
+    return completed_at is not None and now - completed_at > RESULT_SPILL_AGE
+
+
+def _process_dir():
+    # One directory per worker process, so a restarted worker can clear a dead one's files. The host is
+    # part of the name: RESULT_STORE_DIR may be shared storage, where another host's pids mean nothing
+    return os.path.join(RESULT_STORE_DIR, f'{socket.gethostname()}-{os.getpid()}')
+
+
+class SpilledResults:
+    """Read-only, list-like view of a result set stored on disk
+
+    Rows come back as fresh dicts, so nothing read from here is kept resident. Every read opens its
+    own short-lived connection, which keeps the object safe to share between request and export threads.
+    """
+
+    def __init__(self, path, count, owned=True):
+        self.path = path
+        self.count = count
+        self.owned = owned      # False for stores published through the job queue, which prunes them
+
+    @classmethod
+    def create(cls, search_results, directory=None):
+        """Write a result list to a new store file"""
+        directory = directory or _process_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{uuid.uuid4().hex}.db')
+
+        count = 0
+        with closing(sqlite3.connect(path)) as conn:
+            conn.execute('PRAGMA journal_mode=OFF')
+            conn.executescript(SCHEMA)
+            with conn:
+                for idx, result in enumerate(search_results):
+                    row = {key: value for key, value in result.items() if key != 'Image_Data'}
+                    conn.execute(
+                        "INSERT INTO rows (idx, application_number, row, image) VALUES (?, ?, ?, ?)",
+                        (idx, result.get('Application_Number'),
+                         pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL), result.get('Image_Data')))
+                    count += 1
+        return cls(path, count)
+
+    def _connect(self):
+        if not os.path.exists(self.path):
+            raise Exception("Search results have expired - please run the search again")
+        return closing(sqlite3.connect(f'file:{self.path}?mode=ro', uri=True))
+
+    @staticmethod
+    def _to_result(record):
+        result = pickle.loads(record[0])
+        result['Image_Data'] = record[1]
+        return result
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __iter__(self):
+        with self._connect() as conn:
+            for start in range(0, self.count, BATCH_SIZE):
+                records = conn.execute(
+                    "SELECT row, image FROM rows WHERE idx >= ? AND idx < ? ORDER BY idx",
+                    (start, start + BATCH_SIZE)).fetchall()
+                for record in records:
+                    yield self._to_result(record)
+
+    def iter_without_images(self):
+        """(row without Image_Data, whether it has a logo) pairs - the logo blobs are never read"""
+        with self._connect() as conn:
+            for start in range(0, self.count, BATCH_SIZE):
+                records = conn.execute(
+                    "SELECT row, image IS NOT NULL FROM rows WHERE idx >= ? AND idx < ? ORDER BY idx",
+                    (start, start + BATCH_SIZE)).fetchall()
+                for record in records:
+                    yield pickle.loads(record[0]), bool(record[1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('result index out of range')
+        with self._connect() as conn:
+            record = conn.execute("SELECT row, image FROM rows WHERE idx = ?", (index,)).fetchone()
+        return self._to_result(record)
+
+    def get_image(self, application_number):
+        """Logo bytes for one row, or None"""
+        with self._connect() as conn:
+            record = conn.execute("SELECT image FROM rows WHERE application_number = ? AND image IS NOT NULL",
+                                  (application_number,)).fetchone()
+        return record[0] if record else None
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def discard_results(search_results):
+    """Delete the store behind a result set that is being replaced or expired"""
+    if isinstance(search_results, SpilledResults) and search_results.owned:
+        search_results.delete()
+
+
+def prune_dead_stores():
+    """Remove store directories left behind by worker processes of this host that no longer exist"""
+    try:
+        names = os.listdir(RESULT_STORE_DIR)
+    except FileNotFoundError:
+        return
+    prefix = f'{socket.gethostname()}-'
+    for name in names:
+        pid = name[len(prefix):]
+        if not name.startswith(prefix) or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            shutil.rmtree(os.path.join(RESULT_STORE_DIR, name), ignore_errors=True)
+        except PermissionError:
+            pass
@@ -4,164 +4,430 @@ Selenium scraper for Indian Trademark Registry
 Maintains exact same functionality and element IDs as desktop version
 """
 
+import os
 import time
 import base64
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException, WebDriverException,
+                                        NoAlertPresentException)
 from selenium.webdriver.chrome.service import Service as ChromeService
 
+from utils.registry import (PAGE_LOAD_TIMEOUT, RESULT_TIMEOUT, POLL_INTERVAL, CAPTCHA_ERROR_PATTERN,
+                            NO_RESULTS_PATTERN, SITE_DOWN_PATTERN, ScraperError, CaptchaError, NoResultsError,
+                            RegistryUnavailableError, registry_breaker, registry_limiter,
+                            retry_with_backoff)
+from utils.browser_supervisor import browser_supervisor
+from utils.browser_pool import browser_pool
+from utils.browser_grid import browser_grid
+
+SEARCH_URL = "https://tmrsearch.ipindia.gov.in/tmrpublicsearch/frmmain.aspx"
+
+# Capture each page of the grid as soon as it loads and parse it while the next page is fetched
+# (false restores the desktop version's load-everything-then-extract order)
+PIPELINED_PAGINATION = os.environ.get('PIPELINED_PAGINATION', 'true').lower() == 'true'
+MAX_LOAD_MORE = 5  # SAME number of "Load More..." clicks as desktop version
+
+# Rows of the results grid after the first `arguments[0]` rows, read in one round trip:
+# [wordmark, proprietor, application number, class, status, logo src] - SAME span ids as desktop version
+CAPTURE_ROWS_SCRIPT = """
+var grid = document.getElementById('ContentPlaceHolder1_MGVSearchResult');
+if (!grid) { return null; }
+var rows = grid.getElementsByTagName('tr');
+var captured = [];
+function spanText(cell, id) {
+    var span = cell.querySelector("span[id*='" + id + "']");
+    return span ? span.innerText.trim() : '';
+}
+for (var i = arguments[0] + 1; i < rows.length; i++) {
+    var cells = rows[i].getElementsByTagName('td');
+    if (cells.length < 3) { captured.push(null); continue; }
+    var image = cells[2].getElementsByTagName('img')[0];
+    captured.push([spanText(cells[1], 'lblsimiliarmark'), spanText(cells[1], 'LblVProprietorName'),
+                   spanText(cells[1], 'lblapplicationnumber'), spanText(cells[1], 'lblsearchclass'),
+                   spanText(cells[1], 'Label6'), image ? image.src : null]);
+}
+return captured;
+"""
+# Search types of ContentPlaceHolder1_DDLSearchType. The application number option is found by its
+# label unless REGISTRY_APPLICATION_SEARCH_TYPE gives its value
+WORDMARK_SEARCH = 'WM'
+APPLICATION_SEARCH = 'application'
+APPLICATION_SEARCH_TYPE = os.environ.get('REGISTRY_APPLICATION_SEARCH_TYPE', '')
+
+COUNT_ROWS_SCRIPT = """
+var grid = document.getElementById('ContentPlaceHolder1_MGVSearchResult');
+return grid ? grid.getElementsByTagName('tr').length - 1 : -1;
+"""
+
+
+def classify_page(driver):
+    """Inspect the page (and any JS alert) after a postback: returns 'results', 'captcha', 'no_results', 'site_down' or None"""
+    try:
+        alert = driver.switch_to.alert
+        text = alert.text
+        alert.accept()
+        if CAPTCHA_ERROR_PATTERN.search(text):
+            return 'captcha'
+        if NO_RESULTS_PATTERN.search(text):
+            return 'no_results'
+    except NoAlertPresentException:
+        pass
+
+    if driver.find_elements(By.ID, "ContentPlaceHolder1_MGVSearchResult"):
+        return 'results'
+
+    text = driver.execute_script("return document.body ? document.body.innerText : '';") or ''
+    if CAPTCHA_ERROR_PATTERN.search(text):
+        return 'captcha'
+    if SITE_DOWN_PATTERN.search(text) or SITE_DOWN_PATTERN.search(driver.title or ''):
+        return 'site_down'
+    if NO_RESULTS_PATTERN.search(text):
+        return 'no_results'
+    return None
+
+
+def parse_rows(captured):
+    """Turn rows read by CAPTURE_ROWS_SCRIPT into result dicts, decoding the logos"""
+    results = []
+    search_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for row in captured:
+        if row is None:
+            continue
+        wordmark, proprietor, app_num, class_text, status, image_src = row
+        result = {
+            "Wordmark": wordmark,
+            "Proprietor": proprietor,
+            "Application_Number": app_num,
+            "Class": class_text,
+            "Status": status,
+            "Image_Data": None
+        }
+        if image_src and image_src.startswith("data:image"):
+            try:
+                result["Image_Data"] = base64.b64decode(image_src.split(",")[1])
+            except Exception as e:
+                print(f"Error decoding logo of {app_num}: {e}")
+        result["Search_Date"] = search_date
+        results.append(result)
+    return results
+
+
+def new_user_data_dir():
+    """Unique Chrome profile directory, so concurrent browsers never share one
+    The owning process id is part of the name - the supervisor only reaps profiles of dead owners"""
+    import tempfile
+    import uuid
+    
+    unique_id = f"{os.getpid()}_{str(uuid.uuid4())[:8]}"
+    if os.name == 'nt':  # Windows
+        return os.path.join(tempfile.gettempdir(), f"chrome_user_data_{unique_id}")
+    return f"/tmp/chrome_user_data_{unique_id}"  # Linux/Mac
+
+
+def chrome_options(user_data_dir=None, page_load_strategy=None, headless=None):
+    """Chrome options - SAME as desktop version - shared by local and remote (grid) browsers
+    
+    headless=None decides from this machine's environment; remote browsers pass it explicitly.
+    """
+    options = Options()
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+        print(f"Chrome will use user data dir: {user_data_dir}")
+    if page_load_strategy:
+        options.page_load_strategy = page_load_strategy
+    
+    # For headless deployment (auto-enabled for Railway/container environments)
+    if headless is None:
+        is_railway = os.environ.get('RAILWAY_ENVIRONMENT', False)
+        is_production = os.environ.get('PRODUCTION', 'false').lower() == 'true'
+        force_headless = os.environ.get('HEADLESS', 'false').lower() == 'true'
+        headless = bool(is_railway or is_production or force_headless or os.path.exists('/.dockerenv'))
+    
+    if headless:
+        print("Enabling headless mode")
+        # Essential headless options
+        options.add_argument("--headless=new")  # Use new headless mode
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        
+        # Performance optimizations for faster startup
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-plugins")
+        options.add_argument("--disable-default-apps")
+        options.add_argument("--disable-background-timer-throttling")
+        options.add_argument("--disable-backgrounding-occluded-windows")
+        options.add_argument("--disable-renderer-backgrounding")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-features=TranslateUI,BlinkGenPropertyTrees,VizDisplayCompositor")
+        options.add_argument("--disable-web-security")
+        options.add_argument("--ignore-certificate-errors")
+        options.add_argument("--ignore-ssl-errors")
+        options.add_argument("--disable-logging")
+        options.add_argument("--silent")
+        
+        # Memory optimizations
+        options.add_argument("--memory-pressure-off")
+        options.add_argument("--max_old_space_size=4096")
+        
+        # Skip remote debugging port - not needed for scraping
+    
+    return options
+
+
+def launch_chrome(user_data_dir, page_load_strategy=None):
+    """Start Chrome with the desktop version's options and return the driver"""
+    # Setup Chrome - SAME options as desktop version
+    options = chrome_options(user_data_dir, page_load_strategy)
+    
+    # Use system-installed ChromeDriver only
+    print("Starting ChromeDriver initialization...")
+    
+    # Check if running in container/production environment
+    is_container = os.path.exists('/.dockerenv') or os.environ.get('RAILWAY_ENVIRONMENT', False)
+    
+    try:
+        if is_container:
+            # Use system chromedriver (installed in Dockerfile)
+            service = ChromeService("/usr/bin/chromedriver")
+            service.start_error_message = "ChromeDriver failed to start"
+            print("Container environment detected - using system ChromeDriver...")
+            driver = webdriver.Chrome(service=service, options=options)
+            print("SUCCESS: Using system ChromeDriver")
+        else:
+            # Local development - let Chrome find its own driver
+            print("Local environment - using Chrome's built-in driver...")
+            driver = webdriver.Chrome(options=options)
+            print("SUCCESS: Using Chrome's built-in driver")
+    except Exception as e:
+        print(f"Primary driver initialization failed: {e}")
+        try:
+            # Fallback: try the opposite approach
+            if is_container:
+                print("Fallback: trying Chrome's built-in driver...")
+                driver = webdriver.Chrome(options=options)
+            else:
+                print("Fallback: trying system ChromeDriver...")
+                service = ChromeService("/usr/bin/chromedriver")
+                driver = webdriver.Chrome(service=service, options=options)
+            print("SUCCESS: Using fallback driver")
+        except Exception as e2:
+            print(f"All driver attempts failed: {e2}")
+            raise Exception(f"ChromeDriver initialization failed: {e} | {e2}")
+    
+    print("ChromeDriver initialized successfully")
+    return driver
+
+
 class TrademarkScraper:
     def __init__(self):
         self.driver = None
         self.wait = None
         self.search_results = []
         self.user_data_dir = None
+        self.captcha_src = None
+        self.parked_at = None   # Set while the browser is kept open between searches (see park)
+        self.reused = False     # Whether the last initialize_browser() reused a parked browser
+        self.more_available = False  # "Load More..." was still offered after the last page extract_results loads
     
-    def initialize_browser(self, wordmark, trademark_class, filter_type):
-        """Initialize browser and navigate to search page - EXACT same logic as desktop version"""
-        try:
-            # Setup Chrome - SAME options as desktop version
-            options = Options()
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-            
-            # Import required modules
-            import os
-            import tempfile
-            import uuid
-            
-            # Always create unique user data directory to prevent conflicts
-            unique_id = str(uuid.uuid4())[:8]
-            if os.name == 'nt':  # Windows
-                self.user_data_dir = os.path.join(tempfile.gettempdir(), f"chrome_user_data_{unique_id}")
-            else:  # Linux/Mac
-                self.user_data_dir = f"/tmp/chrome_user_data_{unique_id}"
-            options.add_argument(f"--user-data-dir={self.user_data_dir}")
-            print(f"Chrome will use user data dir: {self.user_data_dir}")
-            
-            # For headless deployment (auto-enabled for Railway/container environments)
-            is_railway = os.environ.get('RAILWAY_ENVIRONMENT', False)
-            is_production = os.environ.get('PRODUCTION', 'false').lower() == 'true'
-            force_headless = os.environ.get('HEADLESS', 'false').lower() == 'true'
-            
-            if is_railway or is_production or force_headless or os.path.exists('/.dockerenv'):
-                print("Production/Container environment detected - enabling headless mode")
-                # Essential headless options
-                options.add_argument("--headless=new")  # Use new headless mode
-                options.add_argument("--no-sandbox")
-                options.add_argument("--disable-dev-shm-usage")
-                options.add_argument("--disable-gpu")
-                
-                # Performance optimizations for faster startup
-                options.add_argument("--disable-extensions")
-                options.add_argument("--disable-plugins")
-                options.add_argument("--disable-default-apps")
-                options.add_argument("--disable-background-timer-throttling")
-                options.add_argument("--disable-backgrounding-occluded-windows")
-                options.add_argument("--disable-renderer-backgrounding")
-                options.add_argument("--disable-background-networking")
-                options.add_argument("--disable-features=TranslateUI,BlinkGenPropertyTrees,VizDisplayCompositor")
-                options.add_argument("--disable-web-security")
-                options.add_argument("--ignore-certificate-errors")
-                options.add_argument("--ignore-ssl-errors")
-                options.add_argument("--disable-logging")
-                options.add_argument("--silent")
-                
-                # Memory optimizations
-                options.add_argument("--memory-pressure-off")
-                options.add_argument("--max_old_space_size=4096")
-                
-                # Skip remote debugging port - not needed for scraping
-            
-            # Use system-installed ChromeDriver only
-            print("Starting ChromeDriver initialization...")
-            
-            # Check if running in container/production environment
-            is_container = os.path.exists('/.dockerenv') or os.environ.get('RAILWAY_ENVIRONMENT', False)
-            
+    def initialize_browser(self, wordmark=None, trademark_class='', filter_type='Contains', search_type=WORDMARK_SEARCH):
+        """Initialize browser and navigate to search page - EXACT same logic as desktop version
+        
+        Without a wordmark the browser is prepared speculatively: the page is loaded and the
+        CAPTCHA captured, and the search fields are filled later with fill_form().
+        A browser parked after the previous search is reused if it is still healthy and not past
+        BROWSER_MAX_AGE.
+        With search_type=APPLICATION_SEARCH, wordmark is the application number to look up.
+        """
+        if self.parked_at is not None and browser_supervisor.expired(self):
+            print("Parked browser is older than BROWSER_MAX_AGE, launching a new one")
+            self.cleanup()
+        if self.parked_at is not None:
             try:
-                if is_container:
-                    # Use system chromedriver (installed in Dockerfile)
-                    service = ChromeService("/usr/bin/chromedriver")
-                    service.start_error_message = "ChromeDriver failed to start"
-                    print("Container environment detected - using system ChromeDriver...")
-                    self.driver = webdriver.Chrome(service=service, options=options)
-                    print("SUCCESS: Using system ChromeDriver")
-                else:
-                    # Local development - let Chrome find its own driver
-                    print("Local environment - using Chrome's built-in driver...")
-                    self.driver = webdriver.Chrome(options=options)
-                    print("SUCCESS: Using Chrome's built-in driver")
+                captcha_data = self._reuse_browser(wordmark, trademark_class, filter_type, search_type)
+                self.reused = True
+                return captcha_data
             except Exception as e:
-                print(f"Primary driver initialization failed: {e}")
-                try:
-                    # Fallback: try the opposite approach
-                    if is_container:
-                        print("Fallback: trying Chrome's built-in driver...")
-                        self.driver = webdriver.Chrome(options=options)
-                    else:
-                        print("Fallback: trying system ChromeDriver...")
-                        service = ChromeService("/usr/bin/chromedriver")
-                        self.driver = webdriver.Chrome(service=service, options=options)
-                    print("SUCCESS: Using fallback driver")
-                except Exception as e2:
-                    print(f"All driver attempts failed: {e2}")
-                    raise Exception(f"ChromeDriver initialization failed: {e} | {e2}")
-            
-            print("ChromeDriver initialized successfully")
-            self.wait = WebDriverWait(self.driver, 20)
+                print(f"Parked browser unusable, launching a new one: {e}")
+                self.cleanup()
+        
+        self.reused = False
+        try:
+            if browser_grid.enabled:
+                # A browser leased from the least-loaded remote WebDriver endpoint
+                self.driver = browser_grid.lease()
+            elif browser_pool.enabled:
+                # An isolated browser context (own cookies and ASP.NET session) in a shared Chrome
+                self.driver = browser_pool.open_context()
+            else:
+                # Setup Chrome - SAME options as desktop version, in a profile of our own
+                self.user_data_dir = new_user_data_dir()
+                self.driver = launch_chrome(self.user_data_dir)
+                browser_supervisor.register(self)
+            self.wait = WebDriverWait(self.driver, RESULT_TIMEOUT)
             
-            # Navigate to website - SAME URL as desktop version
-            self.driver.get("https://tmrsearch.ipindia.gov.in/tmrpublicsearch/frmmain.aspx")
-            time.sleep(3)
+            # Navigate to website - SAME URL as desktop version, fail fast and retry if the registry is down
+            self.driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+            retry_with_backoff(self._load_search_page)
             
             # Fill search form - EXACT same element IDs as desktop version
+            self._fill_search(wordmark, trademark_class, filter_type, search_type)
             
-            # Select search type - SAME element ID
-            search_type = Select(self.driver.find_element(By.ID, "ContentPlaceHolder1_DDLSearchType"))
-            search_type.select_by_value("WM")
-            time.sleep(0.5)
-            
-            # Select filter - SAME logic as desktop version
-            filter_map = {"Start With": "0", "Contains": "1", "Match With": "2"}
-            filter_select = Select(self.driver.find_element(By.ID, "ContentPlaceHolder1_DDLFilter"))
-            filter_select.select_by_value(filter_map[filter_type])
-            time.sleep(0.5)
-            
-            # Enter wordmark - SAME element ID
-            wordmark_input = self.driver.find_element(By.ID, "ContentPlaceHolder1_TBWordmark")
-            wordmark_input.clear()
-            wordmark_input.send_keys(wordmark)
-            time.sleep(0.5)
-            
-            # Enter class - SAME element ID
-            class_input = self.driver.find_element(By.ID, "ContentPlaceHolder1_TBClass")
-            class_input.clear()
-            class_input.send_keys(trademark_class)
-            time.sleep(0.5)
-            
-            # Get CAPTCHA image - SAME element ID as desktop version
-            captcha_element = self.driver.find_element(By.ID, "ContentPlaceHolder1_ImageCaptcha")
-            
-            # Take screenshot of CAPTCHA - SAME method as desktop version
-            captcha_screenshot = captcha_element.screenshot_as_png
-            
-            # Convert to base64 for web display
-            captcha_base64 = base64.b64encode(captcha_screenshot).decode('utf-8')
-            
-            return captcha_base64
+            return self.capture_captcha()
             
+        except ScraperError:
+            self.cleanup()
+            raise
         except Exception as e:
             self.cleanup()
             raise Exception(f"Browser initialization error: {str(e)}")
     
+    def _reuse_browser(self, wordmark, trademark_class, filter_type, search_type=WORDMARK_SEARCH):
+        """Start the next search in a parked browser - the search form is already loaded"""
+        self.parked_at = None
+        if not self.is_healthy():
+            raise Exception("browser is not responding or the search form is gone")
+        
+        self._fill_search(wordmark, trademark_class, filter_type, search_type)
+        
+        return self.capture_captcha()
+    
+    def _fill_search(self, wordmark, trademark_class, filter_type, search_type):
+        # Select search type - SAME element ID
+        search_type_select = Select(self.driver.find_element(By.ID, "ContentPlaceHolder1_DDLSearchType"))
+        if search_type == APPLICATION_SEARCH:
+            value = APPLICATION_SEARCH_TYPE or next(
+                (option.get_attribute("value") for option in search_type_select.options
+                 if 'application' in option.text.lower()), None)
+            if not value:
+                raise ScraperError("The registry search form offers no application number search")
+            search_type_select.select_by_value(value)
+        else:
+            search_type_select.select_by_value(search_type)
+        time.sleep(0.5)
+        
+        if wordmark is None:
+            return
+        if search_type == APPLICATION_SEARCH:
+            # The number goes in the form's search text box - class and filter do not apply
+            number_input = self.driver.find_element(By.ID, "ContentPlaceHolder1_TBWordmark")
+            number_input.clear()
+            number_input.send_keys(wordmark)
+            time.sleep(0.5)
+        else:
+            self._fill_fields(wordmark, trademark_class, filter_type)
+    
+    def is_healthy(self):
+        """True if the driver still answers and the search form is on the page"""
+        if self.driver is None:
+            return False
+        try:
+            return bool(self.driver.find_elements(By.ID, "ContentPlaceHolder1_DDLSearchType"))
+        except Exception:
+            return False
+    
+    def park(self):
+        """Keep the browser for the session's next search: back to a fresh search form, results dropped
+        
+        Returns False (and closes the browser) if the search page could not be reloaded.
+        """
+        self.search_results = []
+        if self.driver is None:
+            return False
+        try:
+            self._load_search_page()
+            self.parked_at = time.time()
+            return True
+        except Exception as e:
+            print(f"Could not keep browser for reuse: {e}")
+            self.cleanup()
+            return False
+    
+    def _fill_fields(self, wordmark, trademark_class, filter_type):
+        # Select filter - SAME logic as desktop version
+        filter_map = {"Start With": "0", "Contains": "1", "Match With": "2"}
+        filter_select = Select(self.driver.find_element(By.ID, "ContentPlaceHolder1_DDLFilter"))
+        filter_select.select_by_value(filter_map[filter_type])
+        time.sleep(0.5)
+        
+        # Enter wordmark - SAME element ID
+        wordmark_input = self.driver.find_element(By.ID, "ContentPlaceHolder1_TBWordmark")
+        wordmark_input.clear()
+        wordmark_input.send_keys(wordmark)
+        time.sleep(0.5)
+        
+        # Enter class - SAME element ID
+        class_input = self.driver.find_element(By.ID, "ContentPlaceHolder1_TBClass")
+        class_input.clear()
+        class_input.send_keys(trademark_class)
+        time.sleep(0.5)
+    
+    def capture_captcha(self):
+        """Screenshot the CAPTCHA as base64 PNG and remember which image it was"""
+        # Get CAPTCHA image - SAME element ID as desktop version
+        captcha_element = self.driver.find_element(By.ID, "ContentPlaceHolder1_ImageCaptcha")
+        self.captcha_src = captcha_element.get_attribute("src")
+        
+        # Take screenshot of CAPTCHA - SAME method as desktop version
+        captcha_screenshot = captcha_element.screenshot_as_png
+        
+        # Convert to base64 for web display
+        return base64.b64encode(captcha_screenshot).decode('utf-8')
+    
+    def fill_form(self, wordmark, trademark_class, filter_type):
+        """Fill the search fields of a speculatively prepared browser
+        
+        Returns a fresh CAPTCHA (base64) if filling the form regenerated it, otherwise None.
+        """
+        try:
+            self._fill_fields(wordmark, trademark_class, filter_type)
+            captcha_element = self.driver.find_element(By.ID, "ContentPlaceHolder1_ImageCaptcha")
+            if captcha_element.get_attribute("src") != self.captcha_src:
+                return self.capture_captcha()
+            return None
+        except Exception as e:
+            raise Exception(f"Form fill error: {str(e)}")
+    
+    def _load_search_page(self):
+        """Open the search form, classifying failures so they can be retried or reported"""
+        registry_breaker.before_call()
+        try:
+            registry_limiter.acquire('page_load')
+        except ScraperError:
+            registry_breaker.release_probe()
+            raise
+        try:
+            self.driver.get(SEARCH_URL)
+            WebDriverWait(self.driver, PAGE_LOAD_TIMEOUT, poll_frequency=POLL_INTERVAL).until(
+                EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_DDLSearchType")))
+        except TimeoutException:
+            registry_breaker.record_failure()
+            raise RegistryUnavailableError("Trademark registry did not load the search page in time")
+        except WebDriverException as e:
+            if 'net::ERR_' in str(e) or self._safe_classify() == 'site_down':
+                registry_breaker.record_failure()
+                raise RegistryUnavailableError(f"Trademark registry is unreachable: {str(e).splitlines()[0]}")
+            registry_breaker.release_probe()
+            raise
+        registry_breaker.record_success()
+    
+    def _safe_classify(self):
+        try:
+            return classify_page(self.driver)
+        except Exception:
+            return None
+    
     def submit_search(self, captcha_text):
         """Submit search with CAPTCHA - EXACT same logic as desktop version"""
         try:
@@ -173,132 +439,208 @@ class TrademarkScraper:
             
             # Click search button - SAME element ID and method
             search_button = self.driver.find_element(By.ID, "ContentPlaceHolder1_BtnSearch")
+            registry_limiter.acquire('search')
             self.driver.execute_script("arguments[0].click();", search_button)
             
-            # Wait for results - SAME logic
-            time.sleep(3)
-            
-            # Check if we got results - SAME element ID
+            # Wait for the first positive outcome instead of a fixed sleep - SAME results grid ID
             try:
-                self.wait.until(EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_MGVSearchResult")))
-                return True
+                outcome = WebDriverWait(self.driver, RESULT_TIMEOUT, poll_frequency=POLL_INTERVAL,
+                                        ignored_exceptions=[WebDriverException]).until(classify_page)
             except TimeoutException:
-                raise Exception("No results found or wrong CAPTCHA. Please try again.")
+                registry_breaker.record_failure()
+                raise RegistryUnavailableError("Trademark registry did not respond to the search in time. Please try again.")
+            
+            if outcome == 'results':
+                registry_breaker.record_success()
+                return True
+            if outcome == 'site_down':
+                registry_breaker.record_failure()
+                raise RegistryUnavailableError("Trademark registry returned an error page. Please try again later.")
+            
+            registry_breaker.record_success()
+            if outcome == 'captcha':
+                raise CaptchaError("Wrong CAPTCHA. Please try again.")
+            raise NoResultsError("No results found for this search.")
                 
+        except ScraperError:
+            raise
         except Exception as e:
             raise Exception(f"Search submission error: {str(e)}")
     
-    def extract_results(self, progress_callback=None):
-        """Extract trademark results - EXACT same logic as desktop version"""
+    def extract_results(self, progress_callback=None, keep_alive=False):
+        """Extract trademark results - EXACT same logic as desktop version
+        
+        With keep_alive the browser is parked for the next search instead of being closed.
+        """
         try:
-            self.search_results = []
-            
-            # Try to load more results - SAME logic as desktop version
-            for i in range(5):  # Try 5 times to load more
-                try:
-                    load_more = self.driver.find_element(By.LINK_TEXT, "Load More...")
-                    if load_more.is_displayed():
-                        self.driver.execute_script("arguments[0].scrollIntoView(true);", load_more)
-                        time.sleep(1)
-                        self.driver.execute_script("arguments[0].click();", load_more)
-                        time.sleep(2)
-                        if progress_callback:
-                            progress_callback(i, 5, f"Loading more results ({i+1}/5)...")
-                except:
+            if PIPELINED_PAGINATION:
+                return self._extract_pipelined(progress_callback)
+            return self._extract_sequential(progress_callback)
+        except Exception as e:
+            raise Exception(f"Results extraction error: {str(e)}")
+        finally:
+            if keep_alive:
+                self.park()
+            else:
+                self.cleanup()
+    
+    def _extract_pipelined(self, progress_callback=None):
+        """Read each page's new rows in one call, parse them on a worker thread while the next page loads"""
+        self.search_results = []
+        self.more_available = False
+        pages = []
+        captured = 0
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='row-parser') as parser:
+            for page in range(MAX_LOAD_MORE + 1):
+                rows = self.driver.execute_script(CAPTURE_ROWS_SCRIPT, captured)
+                if rows is None:
+                    raise Exception("Results grid not found")
+                captured += len(rows)
+                pages.append(parser.submit(parse_rows, rows))
+                if progress_callback:
+                    progress_callback(page + 1, MAX_LOAD_MORE + 1, f"Loaded {captured} results...")
+                if page == MAX_LOAD_MORE:
+                    self.more_available = self._load_more_link() is not None
+                    break
+                if not self._load_more(captured):
                     break
             
-            # Get results grid - SAME element ID
-            grid = self.driver.find_element(By.ID, "ContentPlaceHolder1_MGVSearchResult")
-            rows = grid.find_elements(By.TAG_NAME, "tr")[1:]  # Skip header
-            
-            total_rows = len(rows)
-            if progress_callback:
-                progress_callback(0, total_rows, f"Processing {total_rows} results...")
-            
-            for idx, row in enumerate(rows):
-                try:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    if len(cells) >= 3:
-                        result = {}
-                        
-                        # Extract text data - EXACT same XPath selectors as desktop version
-                        text_cell = cells[1]
-                        
-                        # Wordmark - SAME XPath
-                        try:
-                            wordmark = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'lblsimiliarmark')]").text
-                            result["Wordmark"] = wordmark
-                        except:
-                            result["Wordmark"] = ""
-                        
-                        # Proprietor - SAME XPath
-                        try:
-                            proprietor = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'LblVProprietorName')]").text
-                            result["Proprietor"] = proprietor
-                        except:
-                            result["Proprietor"] = ""
-                        
-                        # Application Number - SAME XPath
-                        try:
-                            app_num = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'lblapplicationnumber')]").text
-                            result["Application_Number"] = app_num
-                        except:
-                            result["Application_Number"] = ""
-                        
-                        # Class - SAME XPath
-                        try:
-                            class_text = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'lblsearchclass')]").text
-                            result["Class"] = class_text
-                        except:
-                            result["Class"] = ""
-                        
-                        # Status - SAME XPath
-                        try:
-                            status = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'Label6')]").text
-                            result["Status"] = status
-                        except:
-                            result["Status"] = ""
+            for page in pages:
+                self.search_results.extend(page.result())
+        
+        if progress_callback:
+            total_rows = len(self.search_results)
+            progress_callback(total_rows, total_rows or 1, f"Processed {total_rows}/{total_rows} results")
+        return self.search_results
+    
+    def _load_more(self, row_count):
+        """Click "Load More..." and wait until the grid has more than row_count rows; False when there is no more"""
+        link = self._load_more_link()
+        if link is None:
+            return False
+        registry_limiter.acquire('load_more')
+        self.driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", link)
+        try:
+            WebDriverWait(self.driver, RESULT_TIMEOUT, poll_frequency=POLL_INTERVAL,
+                          ignored_exceptions=[WebDriverException]).until(
+                lambda driver: driver.execute_script(COUNT_ROWS_SCRIPT) > row_count)
+            return True
+        except TimeoutException:
+            print(f"No more rows appeared after Load More - keeping {row_count} results")
+            return False
+    
+    def _load_more_link(self):
+        links = self.driver.find_elements(By.LINK_TEXT, "Load More...")
+        return links[0] if links and links[0].is_displayed() else None
+    
+    def _extract_sequential(self, progress_callback=None):
+        """Desktop version's extraction: every "Load More..." click first, then the whole grid row by row"""
+        self.search_results = []
+        
+        # Try to load more results - SAME logic as desktop version
+        for i in range(MAX_LOAD_MORE):  # Try 5 times to load more
+            try:
+                load_more = self.driver.find_element(By.LINK_TEXT, "Load More...")
+                if load_more.is_displayed():
+                    self.driver.execute_script("arguments[0].scrollIntoView(true);", load_more)
+                    time.sleep(1)
+                    registry_limiter.acquire('load_more')
+                    self.driver.execute_script("arguments[0].click();", load_more)
+                    time.sleep(2)
+                    if progress_callback:
+                        progress_callback(i, MAX_LOAD_MORE, f"Loading more results ({i+1}/{MAX_LOAD_MORE})...")
+            except:
+                break
+        self.more_available = self._load_more_link() is not None
+        
+        # Get results grid - SAME element ID
+        grid = self.driver.find_element(By.ID, "ContentPlaceHolder1_MGVSearchResult")
+        rows = grid.find_elements(By.TAG_NAME, "tr")[1:]  # Skip header
+        
+        total_rows = len(rows)
+        if progress_callback:
+            progress_callback(0, total_rows, f"Processing {total_rows} results...")
+        
+        for idx, row in enumerate(rows):
+            try:
+                cells = row.find_elements(By.TAG_NAME, "td")
+                if len(cells) >= 3:
+                    result = {}
+                    
+                    # Extract text data - EXACT same XPath selectors as desktop version
+                    text_cell = cells[1]
+                    
+                    # Wordmark - SAME XPath
+                    try:
+                        wordmark = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'lblsimiliarmark')]").text
+                        result["Wordmark"] = wordmark
+                    except:
+                        result["Wordmark"] = ""
+                    
+                    # Proprietor - SAME XPath
+                    try:
+                        proprietor = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'LblVProprietorName')]").text
+                        result["Proprietor"] = proprietor
+                    except:
+                        result["Proprietor"] = ""
+                    
+                    # Application Number - SAME XPath
+                    try:
+                        app_num = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'lblapplicationnumber')]").text
+                        result["Application_Number"] = app_num
+                    except:
+                        result["Application_Number"] = ""
+                    
+                    # Class - SAME XPath
+                    try:
+                        class_text = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'lblsearchclass')]").text
+                        result["Class"] = class_text
+                    except:
+                        result["Class"] = ""
+                    
+                    # Status - SAME XPath
+                    try:
+                        status = text_cell.find_element(By.XPATH, ".//span[contains(@id, 'Label6')]").text
+                        result["Status"] = status
+                    except:
+                        result["Status"] = ""
+                    
+                    # Extract image - EXACT same logic as desktop version
+                    try:
+                        image_cell = cells[2]
+                        image_elem = image_cell.find_element(By.TAG_NAME, "img")
+                        image_src = image_elem.get_attribute("src")
                         
-                        # Extract image - EXACT same logic as desktop version
-                        try:
-                            image_cell = cells[2]
-                            image_elem = image_cell.find_element(By.TAG_NAME, "img")
-                            image_src = image_elem.get_attribute("src")
+                        if image_src and image_src.startswith("data:image"):
+                            # Extract base64 data - SAME method
+                            image_data = image_src.split(",")[1]
+                            image_bytes = base64.b64decode(image_data)
                             
-                            if image_src and image_src.startswith("data:image"):
-                                # Extract base64 data - SAME method
-                                image_data = image_src.split(",")[1]
-                                image_bytes = base64.b64decode(image_data)
-                                
-                                # Store image bytes directly in the result - SAME as desktop
-                                result["Image_Data"] = image_bytes
-                            else:
-                                result["Image_Data"] = None
-                        except:
+                            # Store image bytes directly in the result - SAME as desktop
+                            result["Image_Data"] = image_bytes
+                        else:
                             result["Image_Data"] = None
-                        
-                        # Add search metadata - SAME as desktop version
-                        result["Search_Date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        
-                        self.search_results.append(result)
-                        
-                        # Progress callback
-                        if progress_callback:
-                            progress_callback(idx + 1, total_rows, f"Processed {idx + 1}/{total_rows} results")
-                        
-                except Exception as e:
-                    print(f"Error extracting row {idx}: {str(e)}")
-                    continue
-            
-            return self.search_results
-            
-        except Exception as e:
-            raise Exception(f"Results extraction error: {str(e)}")
-        finally:
-            self.cleanup()
+                    except:
+                        result["Image_Data"] = None
+                    
+                    # Add search metadata - SAME as desktop version
+                    result["Search_Date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    
+                    self.search_results.append(result)
+                    
+                    # Progress callback
+                    if progress_callback:
+                        progress_callback(idx + 1, total_rows, f"Processed {idx + 1}/{total_rows} results")
+                    
+            except Exception as e:
+                print(f"Error extracting row {idx}: {str(e)}")
+                continue
+        
+        return self.search_results
     
     def cleanup(self):
         """Clean up browser resources"""
+        self.parked_at = None
         try:
             if self.driver:
                 self.driver.quit()
@@ -317,4 +659,7 @@ class TrademarkScraper:
                         print(f"Could not remove user data dir: {e}")
                 self.user_data_dir = None
         except Exception as e:
-            print(f"Cleanup error: {e}")
\ No newline at end of file
+            print(f"Cleanup error: {e}")
+        finally:
+            # Kill any Chrome/ChromeDriver processes that quit() left behind
+            browser_supervisor.release(self)
\ No newline at end of file
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Running a search once its CAPTCHA is answered
+Shared by the web app's search threads (SEARCH_EXECUTION=inline) and scraper_worker.py (queue), so a
+worker does not have to import the Flask app. Extracted rows are tagged and ranked, added to the
+corpus and its indexes, diffed for watch searches and spilled to disk when large.
+The scraper backend is chosen here too, for the app, the worker and the command-line crawlers.
+"""
+
+import os
+import time
+import base64
+import hashlib
+import threading
+
+from utils.registry import NoResultsError
+from utils.export_cache import results_version
+from utils.image_cache import build_image_index
+from utils.result_store import SpilledResults, should_spill
+
+
+def create_scraper(backend=None):
+    """Scraper for the given or configured SCRAPER_BACKEND - Selenium is only imported for the real one"""
+    backend = (backend or os.environ.get('SCRAPER_BACKEND', 'selenium')).lower()
+    if backend == 'stub':
+        from utils.stub_scraper import StubScraper
+        return StubScraper()
+    from utils.scraper import TrademarkScraper
+    return TrademarkScraper()
+
+
+def decode_captcha(captcha_data):
+    """PNG bytes of a base64 CAPTCHA and the version used in its URL"""
+    image = base64.b64decode(captcha_data)
+    return image, hashlib.sha256(image).hexdigest()[:16]
+
+
+def spill_results(results, image_index, directory=None):
+    """Move a result set to disk - the image index keeps the hashes, logo bytes are read back on demand"""
+    spilled = SpilledResults.create(results, directory)
+    return spilled, {app_num: (digest, None) for app_num, (digest, _) in image_index.items()}
+
+
+class SearchRunner:
+    def __init__(self, corpus, watch_store, export_cache=None):
+        self.corpus = corpus
+        self.watch_store = watch_store
+        self.export_cache = export_cache    # Excel exports are pre-generated only where they are served
+        self._similarity_index = None
+        self._logo_index = None
+        self.index_lock = threading.Lock()
+
+    def similarity_index(self):
+        """Corpus similarity index, created (and NumPy imported) on first use"""
+        with self.index_lock:
+            if self._similarity_index is None:
+                from utils.similarity import CorpusSimilarityIndex
+                self._similarity_index = CorpusSimilarityIndex(self.corpus)
+            return self._similarity_index
+
+    def logo_index(self):
+        """Perceptual-hash logo index, created on first use"""
+        with self.index_lock:
+            if self._logo_index is None:
+                from utils.logo_hash import LogoIndex
+                self._logo_index = LogoIndex(self.corpus)
+            return self._logo_index
+
+    def process_results(self, results, search_params, store_dir=None):
+        """Enrich freshly extracted rows and return the session fields that describe them"""
+        # Tag rows with the search that produced them and rank by similarity to it
+        for result in results:
+            result['Search_Wordmark'] = search_params.get('wordmark', '')
+            result['Search_Class'] = search_params.get('class', '')
+            result['Search_Filter'] = search_params.get('filter', '')
+        from utils.similarity import score_results
+        score_results(results, search_params.get('wordmark', ''))
+
+        try:
+            self.corpus.upsert_results(results)
+            self.similarity_index().add_results(results)
+        except Exception as e:
+            print(f"Corpus update error: {e}")
+
+        # Near-duplicate logos from everything seen so far
+        try:
+            logo_index = self.logo_index()
+            logo_index.add_results(results)
+            for result in results:
+                if result.get('Image_Data'):
+                    similar = logo_index.find_similar(result.get('Application_Number'), limit=5) or []
+                    result['Similar_Logos'] = ', '.join(match['Application_Number'] for match in similar)
+        except Exception as e:
+            print(f"Logo index error: {e}")
+
+        # Saved watch searches record a diff against their previous run
+        watch_run = None
+        if search_params.get('watch_id'):
+            try:
+                watch_run = self.watch_store.record_run(search_params['watch_id'], results)
+                watch_run['watch_id'] = search_params['watch_id']
+            except Exception as e:
+                print(f"Watch run error: {e}")
+
+        # Results are immutable from here on - pre-generate the Excel export
+        version = results_version(results)
+        image_index = build_image_index(results)
+
+        # Large result sets go straight to disk instead of staying in the worker's heap;
+        # a scraper worker always writes them to the shared store_dir for the web tier to read
+        if store_dir is not None and results:
+            results, image_index = spill_results(results, image_index, store_dir)
+        elif should_spill(results, None, time.time()):
+            results, image_index = spill_results(results, image_index)
+
+        export_job_id = self.export_cache.submit(results, version) if results and self.export_cache else None
+
+        return {
+            'search_results': results,
+            'image_index': image_index,
+            'results_completed_at': time.time(),
+            'results_version': version,
+            'export_job_id': export_job_id,
+            'watch_run': watch_run
+        }
+
+    def execute_search(self, scraper, search_params, captcha, report_progress, keep_alive=False, store_dir=None,
+                       release_scraper=None):
+        """Submit the CAPTCHA, extract every page and process the rows
+        release_scraper(scraper, reusable) takes the browser back after an empty result (default: close it)"""
+        # Submit search - an empty result is a completed search, not an error
+        try:
+            scraper.submit_search(captcha)
+            has_results = True
+        except NoResultsError:
+            if release_scraper:
+                release_scraper(scraper, reusable=keep_alive)
+            else:
+                scraper.cleanup()
+            has_results = False
+
+        report_progress(20, 'Extracting results...')
+
+        # Extract results with progress updates
+        def progress_callback(current, total, message):
+            report_progress(20 + int((current / total) * 70), message)  # 20% to 90%
+
+        results = scraper.extract_results(progress_callback, keep_alive=keep_alive) if has_results else []
+        # The caller owns the rows from here - the scraper must not pin them in memory
+        scraper.search_results = []
+
+        return self.process_results(results, search_params, store_dir)
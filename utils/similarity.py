@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Phonetic and fuzzy similarity ranking of trademarks
+Marks are indexed once as n-gram and phonetic-key bit signatures; queries are scored
+against every mark with NumPy, and the best candidates are re-ranked by edit distance
+"""
+
+import re
+import zlib
+import itertools
+import threading
+import numpy as np
+
+# Score weights - must add up to 1
+NGRAM_WEIGHT = 0.4
+PHONETIC_WEIGHT = 0.35
+EDIT_WEIGHT = 0.25
+
+NGRAM_BITS = 256
+PHONETIC_BITS = 128
+
+# Candidates re-ranked by exact edit distance after the vectorized pass
+SHORTLIST_SIZE = 2000
+
+# Characters that are easily confused visually (0/O, 1/I, 5/S, 8/B)
+VISUAL_FOLD = str.maketrans('0158', 'OISB')
+
+# Applied in order - spelling variants that sound the same
+PHONETIC_RULES = [
+    (re.compile(r'^(KN|GN|PN|WR|PS)'), lambda m: m.group(1)[1]),
+    (re.compile(r'PH'), 'F'),
+    (re.compile(r'CK'), 'K'),
+    (re.compile(r'QU'), 'KW'),
+    (re.compile(r'Q'), 'K'),
+    (re.compile(r'X'), 'KS'),
+    (re.compile(r'SCH'), 'SK'),
+    (re.compile(r'CH|SH'), 'X'),
+    (re.compile(r'C(?=[EIY])'), 'S'),
+    (re.compile(r'C'), 'K'),
+    (re.compile(r'G(?=[EIY])'), 'J'),
+    (re.compile(r'GH'), 'G'),
+    (re.compile(r'DG'), 'J'),
+    (re.compile(r'TH'), 'T'),
+    (re.compile(r'Z'), 'S'),
+    (re.compile(r'W'), 'V'),
+    (re.compile(r'Y'), 'I'),
+]
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(words):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int32)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+def normalize_mark(mark):
+    """Uppercase and keep letters/digits only"""
+    return re.sub(r'[^A-Z0-9]', '', (mark or '').upper())
+
+
+def phonetic_key(mark):
+    """Sound-alike key, e.g. phonetic_key('QUICK') == phonetic_key('KWIK')"""
+    key = normalize_mark(mark).translate(VISUAL_FOLD)
+    if not key:
+        return ''
+    for pattern, replacement in PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+
+    # Keep the first letter, drop later vowels, collapse repeated sounds
+    head, tail = key[0], re.sub(r'[AEIOUH]', '', key[1:])
+    key = head + tail
+    return re.sub(r'(.)\1+', r'\1', key)
+
+
+def _signature(text, sizes, bits):
+    """Hash the padded n-grams of text into a bit signature (tuple of 64-bit words)"""
+    mask = 0
+    padded = f'^{text}$'
+    for size in sizes:
+        for i in range(len(padded) - size + 1):
+            mask |= 1 << (zlib.crc32(padded[i:i + size].encode('utf-8')) % bits)
+    return tuple((mask >> shift) & 0xFFFFFFFFFFFFFFFF for shift in range(0, bits, 64))
+
+
+def ngram_signature(mark):
+    return _signature(normalize_mark(mark).translate(VISUAL_FOLD), (2, 3), NGRAM_BITS)
+
+
+def phonetic_signature(mark):
+    return _signature(phonetic_key(mark), (1, 2), PHONETIC_BITS)
+
+
+def edit_similarity(a, b):
+    """1 - normalized Levenshtein distance on visually folded marks"""
+    a = normalize_mark(a).translate(VISUAL_FOLD)
+    b = normalize_mark(b).translate(VISUAL_FOLD)
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return 1.0 - previous[-1] / max(len(a), len(b))
+
+
+def _jaccard(signatures, query_signature):
+    """Estimated Jaccard similarity of every signature row against the query"""
+    query_signature = np.array(query_signature, dtype=np.uint64)
+    intersection = _popcount(signatures & query_signature)
+    union = _popcount(signatures | query_signature)
+    return np.divide(intersection, union, out=np.zeros(len(signatures), dtype=np.float32),
+                     where=union > 0)
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.ids = []
+        self.marks = []
+        self.classes = np.zeros(0, dtype=np.int16)
+        self.ngram_sigs = np.zeros((0, NGRAM_BITS // 64), dtype=np.uint64)
+        self.phonetic_sigs = np.zeros((0, PHONETIC_BITS // 64), dtype=np.uint64)
+        self.positions = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, entries):
+        """Index (id, mark, class) tuples; an existing id is re-indexed in place"""
+        new_ids, new_marks, new_classes, new_ngrams, new_phonetics = [], [], [], [], []
+        with self.lock:
+            for entry_id, mark, trademark_class in entries:
+                mark = mark or ''
+                class_number = int(trademark_class) if str(trademark_class).strip().isdigit() else -1
+                ngram_sig = ngram_signature(mark)
+                phonetic_sig = phonetic_signature(mark)
+
+                position = self.positions.get(entry_id)
+                if position is not None:
+                    self.marks[position] = mark
+                    self.classes[position] = class_number
+                    self.ngram_sigs[position] = ngram_sig
+                    self.phonetic_sigs[position] = phonetic_sig
+                    continue
+
+                self.positions[entry_id] = len(self.ids) + len(new_ids)
+                new_ids.append(entry_id)
+                new_marks.append(mark)
+                new_classes.append(class_number)
+                new_ngrams.append(ngram_sig)
+                new_phonetics.append(phonetic_sig)
+
+            if new_ids:
+                self.ids.extend(new_ids)
+                self.marks.extend(new_marks)
+                self.classes = np.concatenate([self.classes, np.array(new_classes, dtype=np.int16)])
+                self.ngram_sigs = np.vstack([self.ngram_sigs, np.array(new_ngrams, dtype=np.uint64)])
+                self.phonetic_sigs = np.vstack([self.phonetic_sigs, np.array(new_phonetics, dtype=np.uint64)])
+
+    def score_all(self, query):
+        """Vectorized n-gram/phonetic score of every indexed mark (0-1)"""
+        with self.lock:
+            ngram = _jaccard(self.ngram_sigs, ngram_signature(query))
+            phonetic = _jaccard(self.phonetic_sigs, phonetic_signature(query))
+        return (NGRAM_WEIGHT * ngram + PHONETIC_WEIGHT * phonetic) / (NGRAM_WEIGHT + PHONETIC_WEIGHT), ngram, phonetic
+
+    def rank(self, query, limit=50, trademark_class=None, min_score=0.0):
+        """Top matches for query as dicts with id, mark and component scores (0-100)"""
+        with self.lock:
+            if not self.ids:
+                return []
+            coarse, ngram, phonetic = self.score_all(query)
+
+            if trademark_class is not None and str(trademark_class).strip().isdigit():
+                coarse = np.where(self.classes == int(trademark_class), coarse, -1.0)
+
+            shortlist_size = min(len(coarse), max(SHORTLIST_SIZE, limit * 10))
+            shortlist = np.argpartition(-coarse, shortlist_size - 1)[:shortlist_size]
+            shortlist = shortlist[coarse[shortlist] >= 0]
+            candidates = [(int(i), self.ids[i], self.marks[i]) for i in shortlist]
+
+        ranked = []
+        for position, entry_id, mark in candidates:
+            edit = edit_similarity(query, mark)
+            score = (NGRAM_WEIGHT * float(ngram[position]) + PHONETIC_WEIGHT * float(phonetic[position])
+                     + EDIT_WEIGHT * edit)
+            if score * 100 >= min_score:
+                ranked.append({
+                    'id': entry_id,
+                    'mark': mark,
+                    'score': round(score * 100, 1),
+                    'ngram_score': round(float(ngram[position]) * 100, 1),
+                    'phonetic_score': round(float(phonetic[position]) * 100, 1),
+                    'edit_score': round(edit * 100, 1)
+                })
+
+        ranked.sort(key=lambda match: match['score'], reverse=True)
+        return ranked[:limit]
+
+
+def score_results(search_results, query):
+    """Add a Similarity_Score (0-100) to each result row against the searched wordmark"""
+    if not query:
+        return search_results
+
+    query_ngram = ngram_signature(query)
+    query_phonetic = phonetic_signature(query)
+    if search_results:
+        ngram = _jaccard(np.array([ngram_signature(r.get('Wordmark', '')) for r in search_results],
+                                  dtype=np.uint64), query_ngram)
+        phonetic = _jaccard(np.array([phonetic_signature(r.get('Wordmark', '')) for r in search_results],
+                                     dtype=np.uint64), query_phonetic)
+    for idx, result in enumerate(search_results):
+        edit = edit_similarity(query, result.get('Wordmark', ''))
+        score = NGRAM_WEIGHT * float(ngram[idx]) + PHONETIC_WEIGHT * float(phonetic[idx]) + EDIT_WEIGHT * edit
+        result['Similarity_Score'] = round(score * 100, 1)
+    return search_results
+
+
+class CorpusSimilarityIndex:
+    """SimilarityIndex over every Wordmark in the local corpus, built in the background on first use"""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.index = SimilarityIndex()
+        self.state = 'empty'    # empty -> building -> ready (or error)
+        self.error = None
+        self.lock = threading.Lock()
+
+    def ensure_built(self):
+        """Start building the index if needed; returns True once it is ready"""
+        with self.lock:
+            if self.state in ('empty', 'error'):
+                self.state = 'building'
+                thread = threading.Thread(target=self._build, name='similarity-index')
+                thread.daemon = True
+                thread.start()
+            return self.state == 'ready'
+
+    def _build(self):
+        try:
+            # Add in batches so searches can index their rows while the build runs
+            marks = self.corpus.iter_marks()
+            while True:
+                batch = list(itertools.islice(marks, 10000))
+                if not batch:
+                    break
+                self.index.add(batch)
+            with self.lock:
+                self.state = 'ready'
+            print(f"Similarity index built with {len(self.index)} marks")
+        except Exception as e:
+            print(f"Similarity index build error: {e}")
+            with self.lock:
+                self.state = 'error'
+                self.error = str(e)
+
+    def add_results(self, search_results):
+        """Index freshly scraped rows (no-op until the index has been requested)"""
+        with self.lock:
+            if self.state == 'empty':
+                return
+        self.index.add((r['Application_Number'], r.get('Wordmark', ''), r.get('Class', ''))
+                       for r in search_results if r.get('Application_Number'))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight registry for identical concurrent searches
+The first session to start a search leads it: it gets the browser and solves the CAPTCHA. Sessions
+that start the same search (same normalized wordmark, class and filter) while it is in flight
+follow it and receive the leader's rows, shared read-only, instead of scraping the grid again.
+"""
+
+import os
+import re
+import time
+import threading
+
+# A flight whose leader has not finished after this many seconds takes no followers and fails those it has
+FLIGHT_MAX_AGE = int(os.environ.get('SINGLE_FLIGHT_MAX_AGE', 900))
+
+
+def flight_key(search_params):
+    """Normalized identity of a search, or None for searches that must run on their own"""
+    if search_params.get('watch_id'):
+        return None  # A watch run records its own diff
+    wordmark = re.sub(r'\s+', ' ', search_params.get('wordmark', '')).strip().upper()
+    trademark_class = search_params.get('class', '').strip().lstrip('0')
+    return (wordmark, trademark_class, search_params.get('filter', 'Contains'))
+
+
+class SearchFlights:
+    def __init__(self, max_age=FLIGHT_MAX_AGE):
+        self.max_age = max_age
+        self.flights = {}       # key -> {'leader', 'followers', 'started'}
+        self.lock = threading.Lock()
+        self.stats = {'led': 0, 'joined': 0, 'scrapes_saved': 0}
+
+    def join(self, key, session_id):
+        """Follow the flight for key and return its leader's session id, or None if there is none to join"""
+        with self.lock:
+            flight = self.flights.get(key)
+            if not flight or flight['leader'] == session_id or time.time() - flight['started'] > self.max_age:
+                return None
+            flight['followers'].add(session_id)
+            self.stats['joined'] += 1
+            return flight['leader']
+
+    def lead(self, key, session_id):
+        """Start a flight for key led by session_id (replacing a stale one)"""
+        with self.lock:
+            self.flights[key] = {'leader': session_id, 'followers': set(), 'started': time.time()}
+            self.stats['led'] += 1
+
+    def leave(self, key, session_id):
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight:
+                flight['followers'].discard(session_id)
+
+    def land(self, key, leader_id, succeeded):
+        """End the leader's flight and return its followers"""
+        with self.lock:
+            flight = self.flights.get(key)
+            if not flight or flight['leader'] != leader_id:
+                return set()
+            del self.flights[key]
+            if succeeded:
+                self.stats['scrapes_saved'] += len(flight['followers'])
+            return flight['followers']
+
+    def overdue(self):
+        """(key, leader) of the flights older than max_age - their followers should stop waiting"""
+        cutoff = time.time() - self.max_age
+        with self.lock:
+            return [(key, flight['leader']) for key, flight in self.flights.items() if flight['started'] < cutoff]
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, in_flight=len(self.flights),
+                        following=sum(len(flight['followers']) for flight in self.flights.values()))
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Stub scraper backend for load tests and local development
+Same interface as TrademarkScraper, but no browser: each step sleeps for a realistic time and
+results are synthetic rows with small generated logos
+Selected with SCRAPER_BACKEND=stub
+"""
+
+import os
+import time
+import base64
+import random
+import hashlib
+import threading
+from io import BytesIO
+from datetime import datetime
+
+from utils.registry import CaptchaError, registry_limiter
+
+# Seconds per step - scale the whole flow with STUB_SCRAPER_LATENCY (0 for no waiting)
+STUB_LATENCY = float(os.environ.get('STUB_SCRAPER_LATENCY', 1.0))
+STUB_RESULTS = int(os.environ.get('STUB_SCRAPER_RESULTS', 50))
+STUB_CAPTCHA_FAILURE_RATE = float(os.environ.get('STUB_CAPTCHA_FAILURE_RATE', 0))
+
+# Relative durations of the real browser steps
+INIT_SECONDS = 3.0
+REUSE_SECONDS = 0.5
+SUBMIT_SECONDS = 2.0
+ROW_SECONDS = 0.02
+
+LOGO_VARIANTS = 32
+
+_logos = []
+_logos_lock = threading.Lock()
+
+
+def _sleep(seconds):
+    if STUB_LATENCY > 0:
+        time.sleep(seconds * STUB_LATENCY * random.uniform(0.8, 1.2))
+
+
+def _png(size, color, seed):
+    from PIL import Image as PILImage, ImageDraw
+
+    image = PILImage.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    rng = random.Random(seed)
+    for _ in range(5):
+        x, y = rng.randint(0, size[0] - 20), rng.randint(0, size[1] - 15)
+        draw.rectangle([x, y, x + 20, y + 15], fill=color)
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def stub_logos():
+    """A fixed set of distinct logo PNGs, generated once per process"""
+    with _logos_lock:
+        if not _logos:
+            for i in range(LOGO_VARIANTS):
+                _logos.append(_png((120, 60), ((i * 53) % 256, (i * 97) % 256, (i * 31) % 256), i))
+        return _logos
+
+
+class StubScraper:
+    def __init__(self):
+        self.driver = None
+        self.search_results = []
+        self.user_data_dir = None
+        self.captcha_src = None
+        self.search = None
+        self.search_type = 'WM'
+        self.parked_at = None
+        self.reused = False
+        self.more_available = False
+
+    def initialize_browser(self, wordmark=None, trademark_class='', filter_type='Contains', search_type='WM'):
+        self.reused = self.parked_at is not None
+        self.parked_at = None
+        if not self.reused:
+            # Paced like the real scraper's page load, so load tests exercise the shared rate limiter
+            registry_limiter.acquire('page_load')
+        _sleep(REUSE_SECONDS if self.reused else INIT_SECONDS)
+        self.search = (wordmark, trademark_class, filter_type) if wordmark is not None else None
+        self.search_type = search_type
+        return self.capture_captcha()
+
+    def capture_captcha(self):
+        self.captcha_src = f'stub-{random.getrandbits(32):08x}'
+        return base64.b64encode(_png((150, 40), (60, 60, 60), self.captcha_src)).decode('utf-8')
+
+    def fill_form(self, wordmark, trademark_class, filter_type):
+        self.search = (wordmark, trademark_class, filter_type)
+        return None
+
+    def submit_search(self, captcha_text):
+        registry_limiter.acquire('search')
+        _sleep(SUBMIT_SECONDS)
+        if STUB_CAPTCHA_FAILURE_RATE and random.random() < STUB_CAPTCHA_FAILURE_RATE:
+            raise CaptchaError("Invalid CAPTCHA - please try again")
+        return True
+
+    def is_healthy(self):
+        return True
+
+    def park(self):
+        self.search_results = []
+        self.parked_at = time.time()
+        return True
+
+    def extract_results(self, progress_callback=None, keep_alive=False):
+        try:
+            if self.search_type == 'application':
+                return self._application_results()
+            wordmark, trademark_class, _ = self.search or ('STUB', '', 'Contains')
+            # Deterministic per search, so repeated searches return the same rows
+            seed = int(hashlib.md5(f'{wordmark}|{trademark_class}'.encode('utf-8')).hexdigest()[:8], 16)
+            rng = random.Random(seed)
+            logos = stub_logos()
+
+            self.search_results = []
+            for idx in range(STUB_RESULTS):
+                _sleep(ROW_SECONDS)
+                self.search_results.append({
+                    'Application_Number': str(1000000 + (seed + idx * 7919) % 9000000),
+                    'Wordmark': f'{(wordmark or "STUB").upper()}{rng.choice(["", "X", " PLUS", "IFY", " PRO"])}',
+                    'Proprietor': f'STUB PROPRIETOR {rng.randint(1, 500)} PRIVATE LIMITED',
+                    'Class': trademark_class or str(rng.randint(1, 45)),
+                    'Status': rng.choice(['Registered', 'Objected', 'Opposed', 'Abandoned']),
+                    'Image_Data': logos[rng.randrange(len(logos))] if rng.random() < 0.8 else None,
+                    'Search_Date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                })
+                if progress_callback:
+                    progress_callback(idx + 1, STUB_RESULTS, f"Processed {idx + 1}/{STUB_RESULTS} results")
+            return self.search_results
+        finally:
+            if keep_alive:
+                self.park()
+            else:
+                self.cleanup()
+
+    def _application_results(self):
+        """The one row of an application number search; about 1 in 20 numbers is not found"""
+        number = self.search[0] if self.search else ''
+        rng = random.Random(number)
+        _sleep(ROW_SECONDS)
+        if rng.random() < 0.05:
+            self.search_results = []
+        else:
+            self.search_results = [{
+                'Application_Number': number,
+                'Wordmark': f'STUB MARK {number}',
+                'Proprietor': f'STUB PROPRIETOR {rng.randint(1, 500)} PRIVATE LIMITED',
+                'Class': str(rng.randint(1, 45)),
+                'Status': rng.choice(['Registered', 'Objected', 'Opposed', 'Abandoned', 'Formalities Chk Pass']),
+                'Image_Data': None,
+                'Search_Date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }]
+        return self.search_results
+
+    def cleanup(self):
+        """Nothing to release - there is no browser"""
+        self.parked_at = None
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Text-only exports for Trademark Search results
+CSV and JSONL are generated row by row for streaming; Parquet is columnar via pyarrow
+"""
+
+import csv
+import json
+import importlib.util
+from io import StringIO, BytesIO
+
+# Columns exported without images - same order as the results table
+TEXT_COLUMNS = ['Application_Number', 'Wordmark', 'Proprietor', 'Class', 'Status']
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+# pyarrow is in requirements.txt; a development install without it gets a 501 for Parquet
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+
+def iter_csv(search_results, columns=TEXT_COLUMNS):
+    """Yield the results as CSV, one encoded row at a time"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8')
+
+    for result in search_results:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow([result.get(column, '') for column in columns])
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(search_results, columns=TEXT_COLUMNS):
+    """Yield the results as JSON Lines, one encoded row at a time"""
+    for result in search_results:
+        row = {column: result.get(column, '') for column in columns}
+        yield (json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def generate_parquet(search_results, columns=TEXT_COLUMNS):
+    """Build a Parquet file of the results - requires pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet export requires pyarrow (pip install pyarrow)")
+
+    table = pa.table({
+        column: [str(result.get(column, '') or '') for result in search_results]
+        for column in columns
+    })
+
+    parquet_buffer = BytesIO()
+    pq.write_table(table, parquet_buffer, compression='snappy')
+    parquet_buffer.seek(0)
+
+    return parquet_buffer
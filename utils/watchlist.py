@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Saved watch searches with incremental diffs between runs
+Each run is compared with the previous snapshot by Application_Number and a compact row hash
+"""
+
+import json
+import hashlib
+from datetime import datetime
+
+from utils.corpus import SQLiteStore
+
+# Fields that define whether a row has changed between runs
+WATCH_FIELDS = ('Wordmark', 'Proprietor', 'Class', 'Status')
+
+# Columns of an exported diff
+DIFF_COLUMNS = ['Change', 'Application_Number', 'Wordmark', 'Proprietor', 'Class',
+                'Status', 'Previous_Status']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watch_searches (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    wordmark TEXT NOT NULL,
+    class TEXT NOT NULL DEFAULT '',
+    filter TEXT NOT NULL DEFAULT 'Contains',
+    created TEXT NOT NULL,
+    last_run TEXT
+);
+
+CREATE TABLE IF NOT EXISTS watch_snapshots (
+    watch_id INTEGER NOT NULL,
+    application_number TEXT NOT NULL,
+    row_hash BLOB NOT NULL,
+    wordmark TEXT NOT NULL DEFAULT '',
+    proprietor TEXT NOT NULL DEFAULT '',
+    class TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (watch_id, application_number)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS watch_runs (
+    id INTEGER PRIMARY KEY,
+    watch_id INTEGER NOT NULL,
+    run_at TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    new_count INTEGER NOT NULL,
+    removed_count INTEGER NOT NULL,
+    status_changed_count INTEGER NOT NULL,
+    changed_count INTEGER NOT NULL,
+    diff TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_watch_runs_watch ON watch_runs(watch_id, id);
+"""
+
+
+def row_hash(result):
+    """8-byte content hash of the fields a watch cares about"""
+    content = '\x1f'.join(str(result.get(field, '') or '') for field in WATCH_FIELDS)
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).digest()
+
+
+def diff_snapshots(previous, search_results):
+    """Compare a previous snapshot {app_num: row} with new results - O(n) via hash lookups
+
+    Returns lists of new, removed, status-changed and otherwise-changed rows.
+    """
+    diff = {'new': [], 'removed': [], 'status_changed': [], 'changed': []}
+    seen = set()
+
+    for result in search_results:
+        app_num = result.get('Application_Number')
+        if not app_num or app_num in seen:
+            continue
+        seen.add(app_num)
+
+        row = {field: result.get(field, '') or '' for field in WATCH_FIELDS}
+        row['Application_Number'] = app_num
+        old = previous.get(app_num)
+        if old is None:
+            diff['new'].append(row)
+        elif old['row_hash'] != row_hash(result):
+            row['Previous_Status'] = old['Status']
+            diff['status_changed' if old['Status'] != row['Status'] else 'changed'].append(row)
+
+    for app_num, old in previous.items():
+        if app_num not in seen:
+            diff['removed'].append({
+                'Application_Number': app_num,
+                'Wordmark': old['Wordmark'],
+                'Proprietor': old['Proprietor'],
+                'Class': old['Class'],
+                'Status': old['Status']
+            })
+
+    return diff
+
+
+def diff_rows(diff):
+    """Flatten a diff into export rows with a Change column"""
+    for change in ('new', 'removed', 'status_changed', 'changed'):
+        for row in diff.get(change, []):
+            yield dict(row, Change=change)
+
+
+class WatchStore(SQLiteStore):
+    schema = SCHEMA
+
+    def create(self, name, wordmark, trademark_class='', filter_type='Contains'):
+        """Save a search to re-run later; returns its id"""
+        conn = self._connect()
+        with self.write_lock, conn:
+            cursor = conn.execute(
+                "INSERT INTO watch_searches (name, wordmark, class, filter, created) VALUES (?, ?, ?, ?, ?)",
+                (name, wordmark, trademark_class, filter_type, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        return cursor.lastrowid
+
+    def get(self, watch_id):
+        row = self._connect().execute("SELECT * FROM watch_searches WHERE id = ?", (watch_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self):
+        """Saved searches with the counts from their latest run"""
+        rows = self._connect().execute("""
+            SELECT w.*, r.id AS last_run_id, r.total, r.new_count, r.removed_count,
+                   r.status_changed_count, r.changed_count
+            FROM watch_searches w
+            LEFT JOIN watch_runs r ON r.id = (SELECT MAX(id) FROM watch_runs WHERE watch_id = w.id)
+            ORDER BY w.id
+        """)
+        return [dict(row) for row in rows]
+
+    def delete(self, watch_id):
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute("DELETE FROM watch_snapshots WHERE watch_id = ?", (watch_id,))
+            conn.execute("DELETE FROM watch_runs WHERE watch_id = ?", (watch_id,))
+            deleted = conn.execute("DELETE FROM watch_searches WHERE id = ?", (watch_id,)).rowcount
+        return deleted > 0
+
+    def _load_snapshot(self, watch_id):
+        rows = self._connect().execute("""
+            SELECT application_number, row_hash, wordmark, proprietor, class, status
+            FROM watch_snapshots WHERE watch_id = ?
+        """, (watch_id,))
+        return {row['application_number']: {
+            'row_hash': bytes(row['row_hash']),
+            'Wordmark': row['wordmark'],
+            'Proprietor': row['proprietor'],
+            'Class': row['class'],
+            'Status': row['status']
+        } for row in rows}
+
+    def record_run(self, watch_id, search_results):
+        """Diff a fresh run against the last snapshot, store the diff and replace the snapshot"""
+        previous = self._load_snapshot(watch_id)
+        diff = diff_snapshots(previous, search_results)
+        run_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        snapshot = {}
+        for result in search_results:
+            app_num = result.get('Application_Number')
+            if app_num:
+                snapshot[app_num] = (watch_id, app_num, row_hash(result),
+                                     result.get('Wordmark', '') or '', result.get('Proprietor', '') or '',
+                                     result.get('Class', '') or '', result.get('Status', '') or '')
+
+        conn = self._connect()
+        with self.write_lock, conn:
+            conn.execute("DELETE FROM watch_snapshots WHERE watch_id = ?", (watch_id,))
+            conn.executemany("INSERT INTO watch_snapshots VALUES (?, ?, ?, ?, ?, ?, ?)", snapshot.values())
+            cursor = conn.execute("""
+                INSERT INTO watch_runs (watch_id, run_at, total, new_count, removed_count,
+                                        status_changed_count, changed_count, diff)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (watch_id, run_at, len(snapshot), len(diff['new']), len(diff['removed']),
+                  len(diff['status_changed']), len(diff['changed']), json.dumps(diff)))
+            conn.execute("UPDATE watch_searches SET last_run = ? WHERE id = ?", (run_at, watch_id))
+
+        return {
+            'run_id': cursor.lastrowid,
+            'run_at': run_at,
+            'first_run': not previous,
+            'total': len(snapshot),
+            'new': len(diff['new']),
+            'removed': len(diff['removed']),
+            'status_changed': len(diff['status_changed']),
+            'changed': len(diff['changed'])
+        }
+
+    def get_diff(self, watch_id, run_id=None):
+        """Stored diff of a run (latest by default), or None"""
+        if run_id:
+            row = self._connect().execute(
+                "SELECT * FROM watch_runs WHERE watch_id = ? AND id = ?", (watch_id, run_id)).fetchone()
+        else:
+            row = self._connect().execute(
+                "SELECT * FROM watch_runs WHERE watch_id = ? ORDER BY id DESC LIMIT 1", (watch_id,)).fetchone()
+        if not row:
+            return None
+        run = dict(row)
+        run['diff'] = json.loads(run['diff'])
+        return run